@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Benchmark quét tự động (monitor.auto_scan) trên DB theo dõi giả lập (SQLite): 1 worker so với nhiều worker
+có giới hạn số URL mỗi host và số tiến trình nuclei đồng thời. nuclei được thay bằng tiến trình giả lập
+(chờ cố định, ghi kết quả JSON ra file -o theo quy tắc cố định của url/CVE), email không được gửi thật.
+
+In tổng thời gian, số nuclei / số URL cùng host chạy đồng thời lớn nhất, thời điểm host cuối cùng bắt đầu
+được quét, và kiểm tra kết quả nuclei của mỗi URL không bị lẫn với URL khác.
+
+    python -m benchmark.bench_auto_scan --urls 60 --nuclei-ms 500 --workers 8 --per-host 2 --nuclei 4
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from flask import Flask
+
+import flaskr
+from benchmark.synthetic_nvd import VENDOR_PRODUCTS, make_cpe, make_cve_item, random_version
+from flaskr import db, mail, monitor
+from flaskr.function import cve_scan, mode_scan, nuclei_scan
+from flaskr.function.scan_scheduler import url_host
+from flaskr.model import URL, CVE, Tech, Tech_CVE, URL_Tech, Alerts, User
+
+YEARS = (2023, 2024)
+
+
+# Quy tắc cố định để biết trước nuclei "phát hiện" lỗ hổng nào trên url nào
+def is_vulnerable(url, cve):
+    return zlib.crc32(f"{url} {cve}".encode()) % 7 == 0
+
+
+class FakeNuclei:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.hosts = {}
+        self.max_per_host = 0
+        self.first_start = {}
+        self.start_time = time.perf_counter()
+
+    def run(self, args, **kwargs):
+        url = args[args.index("-u") + 1]
+        output_file = args[args.index("-o") + 1]
+        templates = args[args.index("-t") + 1].split(",")
+        host = url_host(url)
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.hosts[host] = self.hosts.get(host, 0) + 1
+            self.max_per_host = max(self.max_per_host, self.hosts[host])
+            self.first_start.setdefault(host, time.perf_counter() - self.start_time)
+        try:
+            time.sleep(self.seconds)
+            with open(output_file, "w") as f:
+                for template in templates:
+                    cve = Path(template).stem
+                    if is_vulnerable(url, cve):
+                        f.write(json.dumps({"template-id": cve, "host": url}) + "\n")
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.hosts[host] -= 1
+        return subprocess.CompletedProcess(args, 0, "", "")
+
+
+def run(app, workers, per_host, nuclei, nuclei_seconds):
+    # Mỗi lần chạy bắt đầu từ DB chưa có CVE / alert để cả hai lần làm cùng một lượng việc
+    with app.app_context():
+        for model in (Alerts, Tech_CVE, CVE):
+            model.query.delete()
+        db.session.commit()
+
+    fake = FakeNuclei(nuclei_seconds)
+    nuclei_scan.subprocess = SimpleNamespace(run=fake.run, CalledProcessError=subprocess.CalledProcessError)
+    nuclei_scan.NUCLEI_SEMAPHORE = threading.BoundedSemaphore(nuclei)
+    nuclei_scan.NUCLEI_MAX_CONCURRENT = nuclei
+    monitor.AUTO_SCAN_PER_HOST = per_host
+
+    mismatches = []
+    original = mode_scan.nuclei_scan
+
+    def checked_nuclei_scan(cves, url):
+        results = original(cves, url)
+        for cve in cves:
+            if (results[cve]["status"] == "Có tồn tại lỗ hổng") != is_vulnerable(url, cve):
+                mismatches.append((url, cve))
+        return results
+    mode_scan.nuclei_scan = checked_nuclei_scan
+
+    start = time.perf_counter()
+    try:
+        with app.app_context():
+            monitor.auto_scan(workers=workers)
+    finally:
+        mode_scan.nuclei_scan = original
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "max_nuclei": fake.max_active, "max_per_host": fake.max_per_host,
+            "last_host_start": max(fake.first_start.values(), default=0.0), "mismatches": len(mismatches)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--urls", type=int, default=200, help="Số URL đang theo dõi")
+    parser.add_argument("--hosts", type=int, default=20, help="Số host khác nhau")
+    parser.add_argument("--skew", type=float, default=0.4, help="Tỉ lệ URL thuộc host đầu tiên")
+    parser.add_argument("--per-year", type=int, default=300, help="Số CVE mỗi năm trong index")
+    parser.add_argument("--workers", type=int, default=8, help="AUTO_SCAN_WORKERS")
+    parser.add_argument("--per-host", type=int, default=2, help="AUTO_SCAN_PER_HOST")
+    parser.add_argument("--nuclei", type=int, default=4, help="NUCLEI_MAX_CONCURRENT")
+    parser.add_argument("--nuclei-ms", type=float, default=50, help="Thời gian giả lập của mỗi lần chạy nuclei (ms)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        cve_scan.CVE_DATA_DIR = tmp / "nvd_cve_data"
+        cve_scan.INDEX_DIR = cve_scan.CVE_DATA_DIR / "whoosh_indexing"
+        cve_scan.SEARCHER_POOL.index_root = cve_scan.INDEX_DIR
+        cve_scan.LOOKUP_TABLE_FILE = cve_scan.INDEX_DIR / "cpe_lookup.bin"
+        cve_scan.CVE_YEARS = list(YEARS)
+        cve_scan.CVE_LOOKUP_ENGINE = "whoosh"
+        items = [make_cve_item(year, seq, rng) for year in YEARS for seq in range(args.per_year)]
+        cve_scan.upsert_cve_items(items, rebuild_lookup=False)
+
+        # Template giả cho mọi CVE để CVE nào cũng được đưa cho nuclei
+        nuclei_scan.template_folder_path = tmp / "templates"
+        nuclei_scan.NUCLEI_LOCK_DIR = tmp / "nuclei_slots"
+        for year in YEARS:
+            (nuclei_scan.template_folder_path / str(year)).mkdir(parents=True)
+        for item in items:
+            cve = item["cve"]["CVE_data_meta"]["ID"]
+            (nuclei_scan.template_folder_path / cve.split("-")[1] / f"{cve}.yaml").touch()
+
+        # Dùng templates/ của flaskr để render email; MAIL_SUPPRESS_SEND để không gửi thật
+        app = Flask("flaskr", root_path=Path(flaskr.__file__).resolve().parent)
+        app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp / 'monitor.db'}",
+                          SQLALCHEMY_TRACK_MODIFICATIONS=False, MAIL_SUPPRESS_SEND=True,
+                          MAIL_DEFAULT_SENDER="bench@example.com")
+        db.init_app(app)
+        mail.init_app(app)
+        flaskr.socketio.init_app(app, async_mode="threading")
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(username="admin@example.com", password=""))
+            techs = {}
+            big_host = int(args.urls * args.skew)
+            for n in range(args.urls):
+                host = 0 if n < big_host else 1 + n % max(1, args.hosts - 1)
+                url = URL(url=f"https://host{host}.example/app{n}", status="online", monitoring_active=True)
+                db.session.add(url)
+                db.session.flush()
+                for vendor, product in rng.sample(VENDOR_PRODUCTS, 2):
+                    key = (vendor, product, random_version(rng))
+                    if key not in techs:
+                        techs[key] = Tech(tech=product, version=key[2], cpe=make_cpe(vendor, product))
+                        db.session.add(techs[key])
+                        db.session.flush()
+                    db.session.add(URL_Tech(url_id=url.id, tech_id=techs[key].id))
+            db.session.commit()
+
+        print(f"{args.urls} URL trên {args.hosts} host ({args.skew:.0%} URL ở host đầu tiên), {len(techs)} tech, "
+              f"nuclei giả lập {args.nuclei_ms:.0f} ms/lần")
+        results = {}
+        for name, workers, per_host, nuclei in (("1 worker", 1, 1, 1),
+                                                (f"{args.workers} worker", args.workers, args.per_host, args.nuclei)):
+            results[name] = run(app, workers, per_host, nuclei, args.nuclei_ms / 1000)
+
+        print(f"{'':<12} {'tổng (s)':>9} {'nuclei max':>11} {'cùng host max':>14} {'host cuối bắt đầu (s)':>22} {'sai lệch':>9}")
+        for name, result in results.items():
+            print(f"{name:<12} {result['seconds']:9.2f} {result['max_nuclei']:11d} {result['max_per_host']:14d} "
+                  f"{result['last_host_start']:22.2f} {result['mismatches']:9d}")
+        first, second = results.values()
+        print(f"nhanh hơn {first['seconds'] / second['seconds']:.1f}x")
+        cve_scan.SEARCHER_POOL.close_all()
+        if any(result["mismatches"] for result in results.values()) or \
+                second["max_nuclei"] > args.nuclei or second["max_per_host"] > args.per_host:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
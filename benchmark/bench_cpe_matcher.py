@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark độ chính xác top-1 và độ trễ p50/p99 của hai engine tìm CPE ("whoosh" và "fuzzy")
+trên bộ tên công nghệ Wappalyzer trong wappalyzer_corpus.json.
+
+Mặc định dùng feed CPE giả lập gồm các product cần tìm, các product dễ nhầm và product ngẫu nhiên.
+Dùng --real để chạy trên index CPE thật trong src/nvd_cpe_data (cần tải và index trước).
+
+    python -m benchmark.bench_cpe_matcher --noise 20000
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmark.synthetic_nvd import make_cpe, random_version
+from flaskr.function import cpe_scan
+
+CORPUS_FILE = Path(__file__).resolve().parent / "wappalyzer_corpus.json"
+
+# Các product có tên gần giống product cần tìm, giống các trường hợp dễ nhầm trong NVD
+DISTRACTORS = [
+    ("f5", "nginx"), ("igor_sysoev", "nginx"), ("nginx", "nginx_ui"), ("apache", "http_server_mod_proxy"),
+    ("apache", "tomcat_connectors"), ("apache", "struts"), ("php", "php-fpm"), ("phpmailer_project", "phpmailer"),
+    ("jquery", "jquery_mobile"), ("jquery_file_upload_project", "jquery_file_upload"), ("wordpress", "wordpress_mu"),
+    ("microsoft", "asp.net_core"), ("microsoft", ".net_framework"), ("microsoft", "internet_explorer"),
+    ("getbootstrap", "bootstrap-sass"), ("drupal", "drupal_commerce"), ("joomla", "joomla_extension"),
+    ("mysql", "mysql"), ("mariadb", "mariadb"), ("openssl", "openssl-fips"), ("vuejs", "vue-router"),
+    ("facebook", "react-native"), ("angular", "angular"), ("lodash", "lodash.merge"), ("python", "pillow"),
+    ("djangoproject", "django-rest-framework"), ("flask-cors_project", "flask-cors"), ("rubyonrails", "rails-html-sanitizer"),
+    ("expressjs", "express-fileupload"), ("nodejs", "node-fetch"), ("laravel", "framework"), ("magento", "magento_open_source"),
+    ("elastic", "logstash"), ("grafana", "loki"), ("jenkins", "git"), ("gitlab", "gitlab_runner"), ("tiny", "tinymce_plugin"),
+    ("ckeditor", "ckeditor5"), ("d3-color_project", "d3-color"), ("select2", "select2_plugin"), ("opencart", "opencart_module"),
+]
+
+
+def load_corpus():
+    with CORPUS_FILE.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Feed CPE giả lập: mỗi product có vài entry, product cần tìm luôn có version trong corpus
+def write_feed(path, corpus, noise, seed=0):
+    rng = random.Random(seed)
+    products = {}
+    for entry in corpus:
+        products.setdefault(tuple(entry["expected"].split(":", 1)), set()).add(entry["version"])
+    for vendor, product in DISTRACTORS:
+        products.setdefault((vendor, product), set())
+    syllables = ["ka", "lo", "mi", "tra", "zen", "pix", "dor", "vel", "qua", "sys", "net", "web", "soft", "cms", "lib"]
+    for _ in range(noise):
+        vendor = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 3)))
+        product = "_".join("".join(rng.choice(syllables) for _ in range(rng.randint(1, 3))) for _ in range(rng.randint(1, 2)))
+        products.setdefault((vendor, product), set())
+
+    matches = []
+    for (vendor, product), required in products.items():
+        for i in range(rng.randint(1, 4)):
+            versions = {random_version(rng) for _ in range(rng.randint(1, 6))}
+            # Product dễ nhầm đôi khi cũng có cùng version
+            if i == 0:
+                versions |= required
+            if rng.random() < 0.3:
+                versions |= {entry["version"] for entry in rng.sample(corpus, 3)}
+            matches.append({"cpe23Uri": make_cpe(vendor, product),
+                            "cpe_name": [{"cpe23Uri": make_cpe(vendor, product, version)} for version in sorted(versions)]})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"matches": matches}, f)
+    return len(products)
+
+
+def vendor_product(cpe):
+    parts = cpe.split(":")
+    return f"{parts[3]}:{parts[4]}"
+
+
+def run(engine, corpus, repeat):
+    correct = 0
+    timings = []
+    misses = []
+    for entry in corpus:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = cpe_scan.search_cpe(entry["name"], entry["version"], 1, engine=engine)
+            timings.append((time.perf_counter() - start) * 1000)
+        if results and vendor_product(results[0][1]) == entry["expected"]:
+            correct += 1
+        else:
+            misses.append((entry["name"], vendor_product(results[0][1]) if results else None))
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{engine:<7} top-1={correct}/{len(corpus)} ({correct / len(corpus):.0%})  "
+          f"p50={statistics.median(timings):7.3f} ms  p99={p99:7.3f} ms")
+    for name, got in misses:
+        print(f"        sai: {name!r} -> {got}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--noise", type=int, default=5000, help="Số product ngẫu nhiên thêm vào feed giả lập")
+    parser.add_argument("--repeat", type=int, default=5, help="Số lần tìm mỗi tên để đo độ trễ")
+    parser.add_argument("--real", action="store_true", help="Dùng index CPE thật thay vì feed giả lập")
+    args = parser.parse_args()
+    corpus = load_corpus()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.real:
+            cpe_scan.CPE_JSON_FILE = Path(tmp) / "nvdcpematch-1.0.json"
+            cpe_scan.INDEX_DIR = Path(tmp) / "whoosh_indexing"
+            cpe_scan.SEARCHER_POOL.index_root = cpe_scan.INDEX_DIR
+            count = write_feed(cpe_scan.CPE_JSON_FILE, corpus, args.noise)
+            print(f"Feed CPE giả lập: {count} vendor:product")
+            cpe_scan.indexing_cpe()
+
+        # Dựng index trigram trước để không tính vào độ trễ
+        start = time.perf_counter()
+        cpe_scan.search_cpe("warmup", "1.0", 1, engine="fuzzy")
+        print(f"Dựng index trigram: {time.perf_counter() - start:.2f} s\n")
+        for engine in ("whoosh", "fuzzy"):
+            run(engine, corpus, args.repeat)
+        cpe_scan.SEARCHER_POOL.close_all()
+
+
+if __name__ == "__main__":
+    main()
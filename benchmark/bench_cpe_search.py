@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark độ trễ search_cpe: mở index và parse query mỗi lần gọi (cách cũ) so với
+searcher dùng chung và cache query đã parse. Kiểm tra kết quả hai cách giống nhau.
+
+    python -m benchmark.bench_cpe_search --matches 20000 --lookups 500
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from whoosh import index, scoring
+from whoosh.qparser import QueryParser
+
+from benchmark.bench_cve_lookup import report
+from benchmark.synthetic_nvd import VENDOR_PRODUCTS, random_version, write_cpe_match_feed
+from flaskr.function import cpe_scan
+from flaskr.function.cpe_versions import CPEVersionDictionary
+from flaskr.function.index_pool import current_index_dir
+
+
+# Tìm kiếm theo cách cũ: open_dir và tạo QueryParser cho mỗi lần gọi (version lọc bằng từ điển version)
+def search_cpe_unpooled(input_product, input_version, limit, versions):
+    ix = index.open_dir(str(current_index_dir(cpe_scan.INDEX_DIR, cpe_scan.CPE_INDEX_NAME)))
+    q = QueryParser("vendor_product", schema=cpe_scan.schema).parse(input_product)
+    version_docs = versions.docs_with_version(input_version)
+    # filter rỗng bị Whoosh bỏ qua, version không có trong từ điển thì không có kết quả
+    if not version_docs:
+        return []
+    with ix.searcher(weighting=scoring.BM25F(k1=0.001)) as searcher:
+        hits = searcher.search(q, filter=version_docs, limit=limit)
+        return [(hit.score, hit["cpe"], input_version) for hit in hits]
+
+
+def measure(func, inputs, limit):
+    timings = []
+    results = []
+    for product, version in inputs:
+        start = time.perf_counter()
+        results.append(func(product, version, limit))
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=5000, help="Số phần tử matches của feed CPE giả lập")
+    parser.add_argument("--lookups", type=int, default=200, help="Số lần tìm kiếm")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # Các tech lặp lại nhiều lần giống như khi quét nhiều URL dùng cùng công nghệ
+    techs = [(product, random_version(rng)) for _, product in VENDOR_PRODUCTS for _ in range(3)]
+    inputs = [rng.choice(techs) for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cpe_scan.CPE_JSON_FILE = write_cpe_match_feed(tmp, args.matches)
+        cpe_scan.INDEX_DIR = Path(tmp) / "whoosh_indexing"
+        cpe_scan.SEARCHER_POOL.index_root = cpe_scan.INDEX_DIR
+        cpe_scan.indexing_cpe()
+
+        versions = CPEVersionDictionary(
+            current_index_dir(cpe_scan.INDEX_DIR, cpe_scan.CPE_INDEX_NAME) / cpe_scan.VERSION_DICT_NAME
+        )
+        unpooled, expected = measure(lambda *args: search_cpe_unpooled(*args, versions), inputs, 5)
+        pooled, results = measure(cpe_scan.search_cpe, inputs, 5)
+        cpe_scan.SEARCHER_POOL.close_all()
+        report("unpooled", unpooled)
+        report("pooled", pooled)
+        print(f"Kết quả giống nhau: {results == expected}")
+
+
+if __name__ == "__main__":
+    main()
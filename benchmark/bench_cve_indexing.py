@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark thời gian index toàn bộ feed CVE: tuần tự (cách cũ) so với chia các năm cho nhiều process,
+có hoặc không dùng writer nhiều process của Whoosh cho các năm lớn. Kiểm tra kết quả tìm kiếm giống nhau.
+
+    python -m benchmark.bench_cve_indexing --per-year 2000 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from whoosh import scoring
+
+from benchmark.synthetic_nvd import VENDOR_PRODUCTS, make_cpe, write_cve_feed
+from flaskr.function import cve_scan
+from flaskr.function.index_pool import SearcherPool
+
+YEARS = list(range(2002, 2026))
+
+
+def run(name, workers, writer_procs):
+    cve_scan.CVE_INDEX_WRITER_PROCS = writer_procs
+    start = time.perf_counter()
+    cve_scan.create_cve_index(YEARS, workers=workers)
+    seconds = time.perf_counter() - start
+    # Kết quả tìm kiếm dùng để so sánh giữa các chế độ
+    results = {cpe: sorted(row[0] for row in cve_scan.search_cve(cpe, 1000))
+               for cpe in (make_cpe(vendor, product) for vendor, product in VENDOR_PRODUCTS)}
+    return name, seconds, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-year", type=int, default=1000, help="Số CVE giả lập mỗi năm")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Số process index song song")
+    parser.add_argument("--writer-procs", type=int, default=2, help="Số process của writer Whoosh cho năm lớn")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        for i, year in enumerate(YEARS):
+            # Các năm gần đây lớn hơn, giống phân bố của NVD
+            write_cve_feed(data_dir, year, args.per_year * (1 + i // 6))
+        cve_scan.CVE_DATA_DIR = data_dir
+        cve_scan.INDEX_DIR = data_dir / "whoosh_indexing"
+        cve_scan.SEARCHER_POOL = SearcherPool(cve_scan.INDEX_DIR, scoring.BM25F)
+        # Chỉ các năm lớn nhất vượt ngưỡng dùng writer nhiều process
+        cve_scan.CVE_INDEX_MULTIPROC_MB = max(1, cve_scan.feed_size(YEARS[-1]) // (1024 * 1024) - 1)
+
+        runs = [
+            run("sequential", 1, 1),
+            run(f"parallel x{args.workers}", args.workers, 1),
+            run(f"parallel x{args.workers} +mp", args.workers, args.writer_procs),
+        ]
+        cve_scan.SEARCHER_POOL.close_all()
+        baseline = runs[0]
+        print()
+        for name, seconds, results in runs:
+            same = "giống" if results == baseline[2] else "KHÁC"
+            print(f"{name:<22} {seconds:8.2f} s  speedup={baseline[1] / seconds:5.2f}x  kết quả {same} tuần tự")
+
+
+if __name__ == "__main__":
+    main()
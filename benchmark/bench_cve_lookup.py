@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark độ trễ mỗi lần tra cứu CVE: mở index mỗi lần gọi (cách cũ), SearcherPool
+trên các index theo năm và index gộp một thư mục; create_cve_list qua Whoosh so với bảng tra cứu mmap
+(CVE_CACHE được xóa trước mỗi lần gọi), và create_cve_list khi trúng CVE_CACHE.
+
+    python -m benchmark.bench_cve_lookup --per-year 2000 --lookups 200
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from whoosh import index, scoring
+from whoosh.query import Term
+
+from benchmark.synthetic_nvd import VENDOR_PRODUCTS, make_cpe, write_cve_feed
+from flaskr.function import cve_scan
+from flaskr.function.index_pool import SearcherPool, current_index_dir
+
+YEARS = list(range(2002, 2026))
+
+
+# Tìm kiếm theo cách cũ: open_dir từng thư mục năm cho mỗi lần gọi
+def search_cve_unpooled(input_cpe, limit):
+    matched = []
+    query = Term("cpe_list", input_cpe.strip().lower())
+    for year in reversed(YEARS):
+        year_dir = current_index_dir(cve_scan.INDEX_DIR, str(year))
+        if not year_dir.exists():
+            continue
+        ix = index.open_dir(str(year_dir))
+        with ix.searcher(weighting=scoring.BM25F()) as searcher:
+            for hit in searcher.search(query, limit=limit):
+                matched.append((hit["cve_id"], hit["cpe_info"]))
+    return matched
+
+
+def measure(func, cpes, limit):
+    timings = []
+    for cpe in cpes:
+        start = time.perf_counter()
+        func(cpe, limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{name:<10} mean={statistics.mean(timings):8.3f} ms  p50={statistics.median(timings):8.3f} ms  p99={p99:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-year", type=int, default=500, help="Số CVE giả lập mỗi năm")
+    parser.add_argument("--lookups", type=int, default=100, help="Số lần tra cứu")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cve_scan.CVE_DATA_DIR = Path(tmp)
+        cve_scan.INDEX_DIR = Path(tmp) / "whoosh_indexing"
+        cve_scan.LOOKUP_TABLE_FILE = cve_scan.INDEX_DIR / "cpe_lookup.bin"
+        cve_scan.SEARCHER_POOL = SearcherPool(cve_scan.INDEX_DIR, scoring.BM25F)
+        for year in YEARS:
+            write_cve_feed(tmp, year, args.per_year)
+        cve_scan.create_cve_index(YEARS)
+
+        cpes = [make_cpe(*VENDOR_PRODUCTS[i % len(VENDOR_PRODUCTS)]) for i in range(args.lookups)]
+        report("unpooled", measure(search_cve_unpooled, cpes, args.limit))
+        report("pooled", measure(cve_scan.search_cve, cpes, args.limit))
+
+        cve_scan.create_unified_cve_index(YEARS)
+        report("unified", measure(cve_scan.search_cve, cpes, args.limit))
+
+        cve_scan.build_cve_lookup_table(YEARS)
+        for engine in ("whoosh", "table"):
+            # Xóa cache trước mỗi lần gọi để đo đúng engine, không phải kết quả đã lưu của CPE lặp lại
+            def lookup(cpe, limit):
+                cve_scan.CVE_CACHE.clear()
+                return cve_scan.create_cve_list(cpe, "3.4.5", limit, engine=engine)
+            report(f"list/{engine}", measure(lookup, cpes, args.limit))
+
+        # Trúng cache: mỗi CPE đã được tra một lần trước khi đo
+        cached = lambda cpe, limit: cve_scan.create_cve_list(cpe, "3.4.5", limit, engine="whoosh")
+        for cpe in set(cpes):
+            cached(cpe, args.limit)
+        report("list/cached", measure(cached, cpes, args.limit))
+        cve_scan.SEARCHER_POOL.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark bộ nhớ khi tải feed NVD: tải cả file .json.gz vào bộ nhớ rồi gzip.decompress (cách cũ)
+so với handle_data giải nén và tính SHA-256 theo từng chunk vào file tạm.
+Feed được phục vụ bởi server HTTP cục bộ, mỗi chế độ chạy trong một process con riêng để đo peak RSS.
+
+    python -m benchmark.bench_download_memory --matches 100000
+"""
+import argparse
+import gzip
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmark.bench_ingest_memory import peak_rss_mb
+
+MODES = ("buffered", "stream")
+
+
+# Chạy trong process con: tải feed CPE từ base_url theo chế độ được chọn rồi in kết quả dạng JSON
+def run_mode(mode, base_url, data_dir):
+    from flaskr.function import data_download
+
+    data_download.CPE_BASE_URL = base_url
+    data_download.CPE_DATA_DIR = Path(data_dir)
+    data_download.MANIFEST_FILE = Path(data_dir) / "feed_manifest.json"
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "buffered":
+        gz_url, meta_url = data_download.feed_urls("cpe")
+        gz_data = data_download.download_and_retry(gz_url)
+        uncompressed_data = gzip.decompress(gz_data)
+        expected = data_download.parse_meta(data_download.download_and_retry(meta_url))["sha256"]
+        ok = data_download.sha256_of_bytes(uncompressed_data).lower() == expected.lower()
+        with open(Path(data_dir) / "nvdcpematch-1.0.json", "wb") as f:
+            f.write(uncompressed_data)
+    else:
+        ok = data_download.handle_data("cpe") == data_download.UPDATED
+    print(json.dumps({"mode": mode, "ok": ok, "seconds": time.perf_counter() - start,
+                      "baseline_rss_mb": baseline, "peak_rss_mb": peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=100000, help="Số phần tử matches của feed CPE giả lập")
+    parser.add_argument("--run-mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args.run_mode, args.base_url, args.data_dir)
+        return
+
+    from benchmark.feed_server import serve_feeds
+    from benchmark.synthetic_nvd import write_cpe_match_feed, write_feed_archive
+
+    with tempfile.TemporaryDirectory() as tmp:
+        served = Path(tmp) / "served"
+        served.mkdir()
+        feed = write_cpe_match_feed(served, args.matches)
+        archive = write_feed_archive(feed)
+        print(f"Feed giả lập: {feed.stat().st_size / 1024 / 1024:.1f} MB JSON, "
+              f"{archive.stat().st_size / 1024 / 1024:.1f} MB gzip")
+        feed.unlink()
+        with serve_feeds(served) as base_url:
+            for mode in MODES:
+                data_dir = Path(tmp) / mode
+                data_dir.mkdir()
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmark.bench_download_memory", "--run-mode", mode,
+                     "--base-url", base_url, "--data-dir", str(data_dir)],
+                    capture_output=True, text=True, check=True,
+                    cwd=Path(__file__).resolve().parent.parent
+                ).stdout.strip().splitlines()[-1]
+                result = json.loads(output)
+                print(f"{mode:<9} peak RSS={result['peak_rss_mb']:8.1f} MB  "
+                      f"(baseline {result['baseline_rss_mb']:.1f} MB)  time={result['seconds']:.2f} s  "
+                      f"SHA256 khớp: {result['ok']}")
+
+
+if __name__ == "__main__":
+    main()
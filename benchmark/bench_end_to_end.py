@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Benchmark toàn bộ luồng cập nhật dữ liệu với feed NVD giả lập ở nhiều kích thước:
+tải feed từ server HTTP cục bộ (handle_data) -> index CVE (indexing_full_cve) -> index CPE (indexing_cpe)
+-> tra cứu (search_cpe, create_cve_list). Mỗi kích thước chạy trong một process con riêng để đo peak RSS.
+
+Kết quả gồm MB/s tải, document/s khi index, peak RSS sau mỗi bước, dung lượng index trên đĩa và
+p50/p99 của tra cứu, in dạng bảng và ghi ra JSON (--output) để so sánh giữa các lần chạy.
+
+    python -m benchmark.bench_end_to_end --sizes 1000,5000 --years 4 --cpe-matches 20000 --output e2e.json
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmark.bench_ingest_memory import peak_rss_mb
+
+
+def dir_size_mb(path: Path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file()) / 1024 / 1024
+
+
+def latency_stats(timings):
+    timings = sorted(timings)
+    return {"p50_ms": statistics.median(timings),
+            "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+            "mean_ms": statistics.mean(timings)}
+
+
+# Trỏ các module tải / index về base_url và thư mục work_dir
+def configure(base_url, work_dir, years):
+    from flaskr.function import cpe_scan, cve_scan, data_download
+
+    work_dir = Path(work_dir)
+    data_download.NVD_BASE_URL = data_download.CPE_BASE_URL = base_url
+    data_download.CVE_DATA_DIR = cve_scan.CVE_DATA_DIR = work_dir / "nvd_cve_data"
+    data_download.CPE_DATA_DIR = work_dir / "nvd_cpe_data"
+    data_download.MANIFEST_FILE = work_dir / "feed_manifest.json"
+    cve_scan.INDEX_DIR = cve_scan.CVE_DATA_DIR / "whoosh_indexing"
+    cve_scan.SEARCHER_POOL.index_root = cve_scan.INDEX_DIR
+    cve_scan.LOOKUP_TABLE_FILE = cve_scan.INDEX_DIR / "cpe_lookup.bin"
+    cve_scan.CVE_YEARS = list(years)
+    cpe_scan.CPE_JSON_FILE = data_download.CPE_DATA_DIR / "nvdcpematch-1.0.json"
+    cpe_scan.INDEX_DIR = data_download.CPE_DATA_DIR / "whoosh_indexing"
+    cpe_scan.SEARCHER_POOL.index_root = cpe_scan.INDEX_DIR
+
+
+# Chạy trong process con: toàn bộ luồng với các feed đang được phục vụ tại base_url
+def run_pipeline(base_url, work_dir, years, per_year, cpe_matches, gz_mb, json_mb, lookups):
+    from benchmark.synthetic_nvd import VENDOR_PRODUCTS, make_cpe, random_version
+    from flaskr.function import cpe_scan, cve_scan, data_download
+
+    configure(base_url, work_dir, years)
+    stages = {"baseline": {"peak_rss_mb": peak_rss_mb()}}
+
+    start = time.perf_counter()
+    updated = data_download.pulling(list(years) + ["cpe"])
+    seconds = time.perf_counter() - start
+    stages["download"] = {"seconds": seconds, "feeds": len(updated), "gz_mb": gz_mb, "json_mb": json_mb,
+                          "gz_mb_per_s": gz_mb / seconds, "json_mb_per_s": json_mb / seconds,
+                          "peak_rss_mb": peak_rss_mb()}
+
+    start = time.perf_counter()
+    cve_scan.indexing_full_cve(years=list(years), feeds=[])
+    seconds = time.perf_counter() - start
+    documents = per_year * len(years)
+    stages["index_cve"] = {"seconds": seconds, "documents": documents, "docs_per_s": documents / seconds,
+                           "index_mb": dir_size_mb(cve_scan.INDEX_DIR), "peak_rss_mb": peak_rss_mb()}
+
+    start = time.perf_counter()
+    cpe_scan.indexing_cpe()
+    seconds = time.perf_counter() - start
+    stages["index_cpe"] = {"seconds": seconds, "documents": cpe_matches, "docs_per_s": cpe_matches / seconds,
+                           "index_mb": dir_size_mb(cpe_scan.INDEX_DIR), "peak_rss_mb": peak_rss_mb()}
+
+    rng = random.Random(0)
+    inputs = [(rng.choice(VENDOR_PRODUCTS), random_version(rng)) for _ in range(lookups)]
+    cpe_timings, cve_timings = [], []
+    for (vendor, product), version in inputs:
+        start = time.perf_counter()
+        cpe_scan.search_cpe(product, version, 5)
+        cpe_timings.append((time.perf_counter() - start) * 1000)
+        # Bỏ cache để đo thời gian tra cứu index thật
+        cve_scan.CVE_CACHE.clear()
+        start = time.perf_counter()
+        cve_scan.create_cve_list(make_cpe(vendor, product), version, 100)
+        cve_timings.append((time.perf_counter() - start) * 1000)
+    stages["search_cpe"] = dict(latency_stats(cpe_timings), lookups=lookups)
+    stages["create_cve_list"] = dict(latency_stats(cve_timings), lookups=lookups, peak_rss_mb=peak_rss_mb())
+    cve_scan.SEARCHER_POOL.close_all()
+    cpe_scan.SEARCHER_POOL.close_all()
+    print(json.dumps(stages))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,5000", help="Các kích thước cần đo: số CVE mỗi năm, cách nhau dấu phẩy")
+    parser.add_argument("--years", type=int, default=4, help="Số feed năm")
+    parser.add_argument("--cpe-matches", type=int, default=None,
+                        help="Số phần tử matches của feed CPE (mặc định 4 lần số CVE mỗi năm)")
+    parser.add_argument("--lookups", type=int, default=200, help="Số lần tra cứu")
+    parser.add_argument("--rate-kb", type=int, default=None, help="Giới hạn tốc độ mỗi kết nối (KB/s)")
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file này (mặc định in ra stdout)")
+    parser.add_argument("--run-pipeline", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_pipeline:
+        run_pipeline(**json.loads(args.run_pipeline))
+        return
+
+    from benchmark.feed_server import serve_feeds
+    from benchmark.synthetic_nvd import write_cpe_match_feed, write_cve_feed, write_feed_archive
+
+    years = list(range(2020, 2020 + args.years))
+    results = []
+    for per_year in [int(size) for size in args.sizes.split(",")]:
+        cpe_matches = args.cpe_matches or per_year * 4
+        with tempfile.TemporaryDirectory() as tmp:
+            served = Path(tmp) / "served"
+            served.mkdir()
+            feeds = [write_cve_feed(served, year, per_year) for year in years]
+            feeds.append(write_cpe_match_feed(served, cpe_matches))
+            json_mb = sum(feed.stat().st_size for feed in feeds) / 1024 / 1024
+            gz_mb = sum(write_feed_archive(feed).stat().st_size for feed in feeds) / 1024 / 1024
+            for feed in feeds:
+                feed.unlink()
+
+            with serve_feeds(served, rate_limit=args.rate_kb * 1024 if args.rate_kb else None) as base_url:
+                config = {"base_url": base_url, "work_dir": str(Path(tmp) / "work"), "years": years,
+                          "per_year": per_year, "cpe_matches": cpe_matches, "gz_mb": gz_mb, "json_mb": json_mb,
+                          "lookups": args.lookups}
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmark.bench_end_to_end", "--run-pipeline", json.dumps(config)],
+                    capture_output=True, text=True, check=True,
+                    cwd=Path(__file__).resolve().parent.parent
+                ).stdout.strip().splitlines()[-1]
+        stages = json.loads(output)
+        results.append({"per_year": per_year, "years": len(years), "cpe_matches": cpe_matches, "stages": stages})
+
+        download, index_cve, index_cpe = stages["download"], stages["index_cve"], stages["index_cpe"]
+        print(f"\n=== {per_year} CVE/năm x {len(years)} năm, {cpe_matches} CPE matches "
+              f"({json_mb:.1f} MB JSON, {gz_mb:.1f} MB gzip) ===")
+        print(f"tải        {download['seconds']:7.2f} s  {download['gz_mb_per_s']:7.2f} MB/s gzip  "
+              f"{download['json_mb_per_s']:7.2f} MB/s JSON  peak RSS={download['peak_rss_mb']:7.1f} MB")
+        for name, stage in (("index CVE", index_cve), ("index CPE", index_cpe)):
+            print(f"{name:<10} {stage['seconds']:7.2f} s  {stage['docs_per_s']:9.0f} doc/s  "
+                  f"index={stage['index_mb']:7.1f} MB  peak RSS={stage['peak_rss_mb']:7.1f} MB")
+        for name in ("search_cpe", "create_cve_list"):
+            print(f"{name:<16} p50={stages[name]['p50_ms']:8.3f} ms  p99={stages[name]['p99_ms']:8.3f} ms")
+
+    report = {"python": platform.python_version(), "platform": platform.platform(), "results": results}
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nĐã ghi kết quả vào {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
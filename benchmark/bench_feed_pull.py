@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark tải feed NVD: tải lần lượt so với tải song song (pulling với workers > 1) từ server HTTP cục bộ
+giới hạn tốc độ mỗi kết nối. In thời gian, số kết nối đồng thời lớn nhất phía server
+(không vượt quá --host-connections) và số feed tải được.
+
+    python -m benchmark.bench_feed_pull --years 8 --per-year 2000 --rate-kb 500 --workers 4
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmark.feed_server import FeedStats, serve_feeds
+from benchmark.synthetic_nvd import write_cve_feed, write_feed_archive
+from flaskr.function import data_download
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=8, help="Số feed năm")
+    parser.add_argument("--per-year", type=int, default=2000, help="Số CVE mỗi feed")
+    parser.add_argument("--rate-kb", type=int, default=500, help="Tốc độ tối đa mỗi kết nối (KB/s)")
+    parser.add_argument("--workers", type=int, default=4, help="Số feed tải song song")
+    parser.add_argument("--host-connections", type=int, default=None,
+                        help="Số kết nối tối đa tới host (mặc định bằng --workers)")
+    args = parser.parse_args()
+    host_connections = args.host_connections or args.workers
+
+    years = list(range(2002, 2002 + args.years))
+    with tempfile.TemporaryDirectory() as tmp:
+        served = Path(tmp) / "served"
+        served.mkdir()
+        size = 0
+        for year in years:
+            feed = write_cve_feed(served, year, args.per_year)
+            size += write_feed_archive(feed).stat().st_size
+            feed.unlink()
+        print(f"{len(years)} feed giả lập, tổng {size / 1024 / 1024:.1f} MB gzip, {args.rate_kb} KB/s mỗi kết nối")
+
+        for workers in (1, args.workers):
+            stats = FeedStats()
+            data_download.CVE_DATA_DIR = Path(tmp) / f"workers-{workers}"
+            data_download.MANIFEST_FILE = data_download.CVE_DATA_DIR / "feed_manifest.json"
+            data_download.SESSION = data_download.create_session(pool_maxsize=host_connections)
+            with serve_feeds(served, rate_limit=args.rate_kb * 1024, stats=stats) as base_url:
+                data_download.NVD_BASE_URL = base_url
+                start = time.perf_counter()
+                updated = data_download.pulling(years, workers=workers)
+                seconds = time.perf_counter() - start
+            print(f"workers={workers:<3} time={seconds:7.2f} s  {size / 1024 / 1024 / seconds:6.2f} MB/s  "
+                  f"kết nối mở={stats.connections}  đồng thời tối đa={stats.max_active}  "
+                  f"feed tải được={len(updated)}/{len(years)}")
+
+
+if __name__ == "__main__":
+    main()
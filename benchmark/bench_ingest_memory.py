@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark bộ nhớ khi đọc feed NVD: json.load cả file so với đọc dần bằng iter_json_array.
+Mỗi chế độ chạy trong một process con riêng để đo peak RSS (chỉ chạy được trên Linux/macOS).
+
+    python -m benchmark.bench_ingest_memory --items 50000
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+MODES = ("load", "stream", "index")
+
+
+def peak_rss_mb():
+    # ru_maxrss được giữ qua exec (process con kế thừa peak của process cha), trên Linux đọc VmHWM thay thế
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+# Chạy trong process con: parse feed theo chế độ được chọn rồi in kết quả dạng JSON
+def run_mode(mode, data_dir):
+    from flaskr.function import cve_scan
+    from flaskr.function.json_stream import iter_json_array
+
+    data_dir = Path(data_dir)
+    feed = data_dir / "nvdcve-1.1-2020.json"
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    count = 0
+    if mode == "load":
+        with feed.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        for item in data.get("CVE_Items", []):
+            cve_scan.parse_cve(item)
+            count += 1
+    elif mode == "stream":
+        for item in iter_json_array(feed, "CVE_Items"):
+            cve_scan.parse_cve(item)
+            count += 1
+    else:
+        cve_scan.CVE_DATA_DIR = data_dir
+        cve_scan.INDEX_DIR = data_dir / "whoosh_indexing"
+        cve_scan.create_cve_index([2020])
+        count = None
+    print(json.dumps({"mode": mode, "items": count, "seconds": time.perf_counter() - start,
+                      "baseline_rss_mb": baseline, "peak_rss_mb": peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20000, help="Số CVE trong feed giả lập")
+    parser.add_argument("--run-mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args.run_mode, args.data_dir)
+        return
+
+    from benchmark.synthetic_nvd import write_cve_feed
+
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = write_cve_feed(tmp, 2020, args.items)
+        print(f"Feed giả lập: {args.items} CVE, {feed.stat().st_size / 1024 / 1024:.1f} MB")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmark.bench_ingest_memory", "--run-mode", mode, "--data-dir", tmp],
+                capture_output=True, text=True, check=True,
+                cwd=Path(__file__).resolve().parent.parent
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(output)
+            print(f"{mode:<7} peak RSS={result['peak_rss_mb']:8.1f} MB  "
+                  f"(baseline {result['baseline_rss_mb']:.1f} MB)  time={result['seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark nguồn cập nhật NVD CVE API 2.0 với server giả lập phát lại các trang đã ghi:
+lần chạy 1 bị lỗi 503 giữa chừng, lần chạy 2 tiếp tục từ checkpoint, lần chạy 3 không còn gì thay đổi.
+In thông lượng (CVE/giây), số request và kiểm tra mọi CVE đều có trong index đúng một lần.
+
+    python -m benchmark.bench_nvd_api --cves 20000 --page-size 2000
+"""
+import argparse
+import datetime
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from whoosh import index
+
+from benchmark.nvd_api_server import APIStats, load_recordings, serve_api
+from benchmark.synthetic_nvd import write_api_recordings
+from flaskr.function import cve_scan, nvd_api
+from flaskr.function.data_download import create_session
+from flaskr.function.index_pool import current_index_dir
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cves", type=int, default=20000, help="Số CVE thay đổi trong các trang đã ghi")
+    parser.add_argument("--days", type=int, default=10, help="Khoảng lastModified của các CVE (ngày)")
+    parser.add_argument("--page-size", type=int, default=2000, help="resultsPerPage")
+    parser.add_argument("--batch", type=int, default=None, help="NVD_API_BATCH (mặc định 2 trang)")
+    args = parser.parse_args()
+
+    years = (2023, 2024)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_api_recordings(tmp / "recordings", args.cves, args.days, now, years=years, page_size=args.page_size)
+        vulnerabilities = load_recordings(tmp / "recordings")
+
+        cve_scan.CVE_DATA_DIR = tmp / "nvd_cve_data"
+        cve_scan.INDEX_DIR = cve_scan.CVE_DATA_DIR / "whoosh_indexing"
+        cve_scan.SEARCHER_POOL.index_root = cve_scan.INDEX_DIR
+        cve_scan.LOOKUP_TABLE_FILE = cve_scan.INDEX_DIR / "cpe_lookup.bin"
+        cve_scan.CVE_YEARS = list(years)
+        nvd_api.CHECKPOINT_FILE = tmp / "nvd_api_checkpoint.json"
+        nvd_api.NVD_API_DELAY = 0
+        nvd_api.NVD_API_PAGE_SIZE = args.page_size
+        nvd_api.NVD_API_BATCH = args.batch or args.page_size * 2
+        nvd_api.NVD_API_INITIAL_DAYS = args.days + 1
+        # Không retry để lỗi 503 dừng lần chạy ngay
+        nvd_api.SESSION = create_session(retries=0)
+
+        pages = -(-args.cves // args.page_size)
+        stats = APIStats(fail_after=pages // 2)
+        with serve_api(vulnerabilities, stats=stats, max_page_size=args.page_size) as url:
+            nvd_api.NVD_API_URL = url
+            total_changed = 0
+            for run, fail_after in ((1, pages // 2), (2, None), (3, None)):
+                stats.fail_after = fail_after
+                pages_before = stats.pages
+                start = time.perf_counter()
+                changed = nvd_api.ingest_changes(now=now + datetime.timedelta(minutes=run))
+                seconds = time.perf_counter() - start
+                total_changed += len(changed)
+                print(f"lần {run}: {len(changed):6d} CVE thay đổi, {stats.pages - pages_before} trang, "
+                      f"{seconds:6.2f} s  ({len(changed) / seconds if seconds else 0:8.0f} CVE/s)  "
+                      f"checkpoint={nvd_api.load_checkpoint()}", file=sys.stderr)
+
+        indexed = 0
+        for year in years:
+            with index.open_dir(str(current_index_dir(cve_scan.INDEX_DIR, str(year)))).searcher() as searcher:
+                indexed += searcher.doc_count()
+        print(f"CVE trong index: {indexed}/{args.cves}, tổng số lần thay đổi: {total_changed}, "
+              f"lỗi 503 giả lập: {stats.failures}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark tải feed qua kết nối chập chờn: server HTTP cục bộ cắt kết nối sau mỗi --drop-kb KB
+(tối đa --drops lần). So sánh server không hỗ trợ Range (mỗi lần thử tải lại từ byte 0) với server
+hỗ trợ Range (handle_data tải tiếp từ file .part). Kiểm tra SHA-256 của file JSON cuối cùng.
+
+    python -m benchmark.bench_resume_download --matches 100000 --drops 3 --rate-kb 2000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmark.feed_server import FeedStats, serve_feeds
+from benchmark.synthetic_nvd import write_cpe_match_feed, write_feed_archive
+from flaskr.function import data_download
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=100000, help="Số phần tử matches của feed CPE giả lập")
+    parser.add_argument("--drops", type=int, default=3, help="Số lần server cắt kết nối")
+    parser.add_argument("--drop-kb", type=int, default=None,
+                        help="Cắt kết nối sau bấy nhiêu KB của mỗi response (mặc định 3/4 file nén)")
+    parser.add_argument("--rate-kb", type=int, default=2000, help="Tốc độ tối đa mỗi kết nối (KB/s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        served = Path(tmp) / "served"
+        served.mkdir()
+        feed = write_cpe_match_feed(served, args.matches)
+        archive = write_feed_archive(feed)
+        feed.unlink()
+        size = archive.stat().st_size
+        drop_after = args.drop_kb * 1024 if args.drop_kb else size * 3 // 4
+        print(f"Feed nén {size / 1024 / 1024:.1f} MB, cắt kết nối sau {drop_after / 1024:.0f} KB, "
+              f"tối đa {args.drops} lần")
+
+        data_download.NVD_RESUME_ATTEMPTS = args.drops + 1
+        for mode, range_support in (("restart", False), ("resume", True)):
+            stats = FeedStats()
+            data_download.CPE_DATA_DIR = Path(tmp) / mode
+            data_download.MANIFEST_FILE = data_download.CPE_DATA_DIR / "feed_manifest.json"
+            data_download.SESSION = data_download.create_session()
+            with serve_feeds(served, rate_limit=args.rate_kb * 1024, stats=stats, range_support=range_support,
+                             drop_after=drop_after, drops=args.drops) as base_url:
+                data_download.CPE_BASE_URL = base_url
+                start = time.perf_counter()
+                status = data_download.handle_data("cpe", progress=False)
+                seconds = time.perf_counter() - start
+            print(f"{mode:<8} time={seconds:6.2f} s  server gửi {stats.bytes_sent / 1024 / 1024:6.2f} MB "
+                  f"({stats.bytes_sent / size:.2f}x file)  kết nối bị cắt={stats.dropped}  "
+                  f"SHA256 khớp: {status == data_download.UPDATED}")
+
+
+if __name__ == "__main__":
+    main()
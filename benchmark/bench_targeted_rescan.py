@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark quét lại sau khi cập nhật feed modified: quét lại mọi URL (auto_scan cũ) so với chỉ quét các URL
+có tech chung CPE (vendor/product) với các CVE vừa thay đổi (rescan_targets). Dữ liệu CVE và DB theo dõi
+(URL, Tech, URL_Tech trong SQLite) đều là giả lập; nuclei được thay bằng một khoảng chờ cố định mỗi URL.
+Kiểm tra mọi URL có kết quả chứa CVE thay đổi trong lần quét đầy đủ đều nằm trong tập quét lại.
+
+    python -m benchmark.bench_targeted_rescan --urls 1000 --products 200 --changed 300 --touched 5
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from flask import Flask
+
+from benchmark.synthetic_nvd import make_cpe, make_cve_item, random_version
+from flaskr import db
+from flaskr.function import cve_scan, mode_scan
+from flaskr.model import URL, Tech, URL_Tech
+from flaskr.monitor import rescan_targets
+
+YEARS = (2023, 2024)
+
+
+# CVE giả lập với CPE thuộc sản phẩm thứ `product` trong `products` sản phẩm
+def make_item(year, seq, rng, product):
+    item = make_cve_item(year, seq, rng)
+    for match in item["configurations"]["nodes"][0]["cpe_match"]:
+        version = match["cpe23Uri"].split(":")[5]
+        match["cpe23Uri"] = make_cpe(f"vendor{product}", f"product{product}", version)
+    return item
+
+
+def sweep(app, url_ids, targets, changed_ids):
+    cve_scan.CVE_CACHE.clear()
+    start = time.perf_counter()
+    with app.app_context():
+        techs = Tech.query.join(URL_Tech, URL_Tech.tech_id == Tech.id).all()
+        if targets is not None:
+            techs = [tech for tech in techs if any(tech.id in tech_ids for tech_ids in targets.values())]
+        cve_results = cve_scan.create_cve_list_many([(tech.cpe, tech.version) for tech in techs], 100)
+    hit_urls = set()
+    for url_id in url_ids:
+        new_cves, _ = mode_scan.manual_scan(url_id, app, cve_results, None if targets is None else targets[url_id])
+        if any(cve[0] in changed_ids for cve, _ in new_cves):
+            hit_urls.add(url_id)
+    return time.perf_counter() - start, hit_urls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--urls", type=int, default=1000, help="Số URL đang theo dõi")
+    parser.add_argument("--techs-per-url", type=int, default=3, help="Số tech mỗi URL")
+    parser.add_argument("--products", type=int, default=200, help="Số sản phẩm (vendor/product) khác nhau")
+    parser.add_argument("--per-year", type=int, default=2000, help="Số CVE mỗi năm trong index")
+    parser.add_argument("--changed", type=int, default=300, help="Số CVE thay đổi trong feed modified")
+    parser.add_argument("--touched", type=int, default=5, help="Số sản phẩm mà các CVE thay đổi chạm tới")
+    parser.add_argument("--nuclei-ms", type=float, default=10, help="Thời gian giả lập của nuclei mỗi URL (ms)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    nuclei_seconds = args.nuclei_ms / 1000
+
+    def fake_nuclei(cves, url):
+        time.sleep(nuclei_seconds)
+        return {cve: {"status": "Không tìm thấy template"} for cve in cves}
+    mode_scan.nuclei_scan = fake_nuclei
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        cve_scan.CVE_DATA_DIR = tmp / "nvd_cve_data"
+        cve_scan.INDEX_DIR = cve_scan.CVE_DATA_DIR / "whoosh_indexing"
+        cve_scan.SEARCHER_POOL.index_root = cve_scan.INDEX_DIR
+        cve_scan.LOOKUP_TABLE_FILE = cve_scan.INDEX_DIR / "cpe_lookup.bin"
+        cve_scan.CVE_YEARS = list(YEARS)
+        cve_scan.CVE_LOOKUP_ENGINE = "whoosh"
+
+        # Index ban đầu: CVE rải đều trên mọi sản phẩm
+        items = [make_item(year, seq, rng, rng.randrange(args.products))
+                 for year in YEARS for seq in range(args.per_year)]
+        cve_scan.upsert_cve_items(items, rebuild_lookup=False)
+
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp / 'monitor.db'}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            techs = {}
+            for n in range(args.urls):
+                url = URL(url=f"https://site{n}.example", status="online", monitoring_active=True)
+                db.session.add(url)
+                db.session.flush()
+                for product in rng.sample(range(args.products), args.techs_per_url):
+                    key = (product, random_version(rng))
+                    if key not in techs:
+                        techs[key] = Tech(tech=f"product{product}", version=key[1],
+                                          cpe=make_cpe(f"vendor{product}", f"product{product}"))
+                        db.session.add(techs[key])
+                        db.session.flush()
+                    db.session.add(URL_Tech(url_id=url.id, tech_id=techs[key].id))
+            db.session.commit()
+            url_ids = [url.id for url in URL.query.all()]
+
+        # Feed modified: sửa các CVE có sẵn và thêm CVE mới, chỉ trên `touched` sản phẩm
+        touched = rng.sample(range(args.products), args.touched)
+        modified = [make_item(YEARS[-1], args.per_year + seq if seq % 2 else rng.randrange(args.per_year),
+                              rng, rng.choice(touched)) for seq in range(args.changed)]
+        changed_ids = set(cve_scan.upsert_cve_items(modified, rebuild_lookup=False))
+
+        start = time.perf_counter()
+        with app.app_context():
+            targets = rescan_targets(changed_ids)
+        select_seconds = time.perf_counter() - start
+        target_techs = set().union(*targets.values()) if targets else set()
+
+        full_seconds, full_hits = sweep(app, url_ids, None, changed_ids)
+        targeted_seconds, targeted_hits = sweep(app, sorted(targets), targets, changed_ids)
+
+        print(f"{args.urls} URL, {len(techs)} tech, {len(changed_ids)} CVE thay đổi trên {args.touched} sản phẩm "
+              f"(nuclei giả lập {args.nuclei_ms:.0f} ms/URL)")
+        print(f"chọn mục tiêu   {select_seconds * 1000:9.1f} ms  -> {len(target_techs)} tech, {len(targets)} URL")
+        print(f"quét tất cả     {full_seconds:9.2f} s   {args.urls} URL")
+        print(f"quét theo thay đổi {targeted_seconds:6.2f} s   {len(targets)} URL  "
+              f"(nhanh hơn {full_seconds / max(targeted_seconds, 1e-9):.1f}x)")
+        missed = full_hits - set(targets)
+        print(f"URL có CVE thay đổi: {len(full_hits)} khi quét tất cả, {len(targeted_hits)} khi quét theo thay đổi, "
+              f"bỏ sót {len(missed)}")
+        cve_scan.SEARCHER_POOL.close_all()
+        if missed or targeted_hits != full_hits:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
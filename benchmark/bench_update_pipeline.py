@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark cập nhật toàn bộ: tải hết rồi mới index (complete_pull -> indexing_full_cve -> indexing_cpe)
+so với pipeline run_complete_pipeline (index từng feed ngay khi tải xong). Feed được phục vụ bởi server
+HTTP cục bộ giới hạn tốc độ, để thời gian tải và thời gian index cùng cỡ như cập nhật thật.
+
+    python -m benchmark.bench_update_pipeline --years 6 --per-year 2000 --rate-kb 60 --workers 2
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmark.bench_end_to_end import configure
+from benchmark.feed_server import serve_feeds
+from benchmark.synthetic_nvd import write_cpe_match_feed, write_cve_feed, write_feed_archive
+from flaskr.function import cpe_scan, cve_scan, data_download, update_pipeline
+
+
+def sequential(workers):
+    updated = data_download.pulling(data_download.complete_targets(), workers=workers)
+    cve_scan.indexing_full_cve(years=[target for target in updated if target in cve_scan.CVE_YEARS], feeds=updated)
+    cpe_scan.indexing_cpe()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=6, help="Số feed năm")
+    parser.add_argument("--per-year", type=int, default=2000, help="Số CVE mỗi năm")
+    parser.add_argument("--cpe-matches", type=int, default=10000, help="Số phần tử matches của feed CPE")
+    parser.add_argument("--rate-kb", type=int, default=60, help="Tốc độ tối đa mỗi kết nối (KB/s)")
+    parser.add_argument("--workers", type=int, default=2, help="Số feed tải song song")
+    parser.add_argument("--index-workers", type=int, default=1, help="Số process index CVE (CVE_INDEX_WORKERS)")
+    args = parser.parse_args()
+
+    years = list(range(2020, 2020 + args.years))
+    with tempfile.TemporaryDirectory() as tmp:
+        served = Path(tmp) / "served"
+        served.mkdir()
+        # Feed modified: một phần CVE của năm cuối với nội dung khác
+        modified = write_cve_feed(tmp, years[-1], args.per_year // 10, seed=1)
+        feeds = [modified.rename(served / "nvdcve-1.1-modified.json")]
+        feeds += [write_cve_feed(served, year, args.per_year) for year in years]
+        feeds.append(write_cpe_match_feed(served, args.cpe_matches))
+        for feed in feeds:
+            write_feed_archive(feed)
+            feed.unlink()
+        data_download.complete_targets = lambda: ["cpe"] + years + ["modified"]
+        cve_scan.CVE_INDEX_WORKERS = args.index_workers
+
+        results = []
+        with serve_feeds(served, rate_limit=args.rate_kb * 1024) as base_url:
+            for mode, run in (("tuần tự", lambda: sequential(args.workers)),
+                              ("pipeline", lambda: update_pipeline.run_complete_pipeline(
+                                  download_workers=args.workers))):
+                configure(base_url, Path(tmp) / mode, years)
+                start = time.perf_counter()
+                run()
+                results.append((mode, time.perf_counter() - start))
+                cve_scan.SEARCHER_POOL.close_all()
+                cpe_scan.SEARCHER_POOL.close_all()
+        for mode, seconds in results:
+            print(f"{mode:<9} tổng={seconds:7.2f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
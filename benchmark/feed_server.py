@@ -0,0 +1,135 @@
+import contextlib
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# Server HTTP cục bộ thay cho nvd.nist.gov khi chạy benchmark: phục vụ các file .json.gz / .meta trong một thư mục
+
+
+class FeedStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.connections = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+
+    def sent(self, size):
+        with self.lock:
+            self.bytes_sent += size
+
+    # Còn được cắt kết nối không (tối đa `limit` lần cho cả server)
+    def take_drop(self, limit):
+        with self.lock:
+            if self.dropped >= limit:
+                return False
+            self.dropped += 1
+            return True
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.connections += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+
+class FeedRequestHandler(SimpleHTTPRequestHandler):
+    # Keep-alive như server thật, để thấy client dùng lại kết nối trong pool
+    protocol_version = "HTTP/1.1"
+    # Giới hạn tốc độ gửi (byte/giây) trên mỗi kết nối để giả lập đường truyền chậm, None = không giới hạn
+    rate_limit = None
+    stats = None
+    # Hỗ trợ "Range: bytes=N-" (trả 206); False để giả lập server luôn trả cả file
+    range_support = True
+    # Cắt kết nối sau drop_after byte của một response, tối đa drops lần (cần stats để đếm)
+    drop_after = None
+    drops = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    # Đếm theo kết nối (không theo request) để đo số kết nối đồng thời tới host
+    def handle(self):
+        if self.stats is not None:
+            self.stats.enter()
+        try:
+            super().handle()
+        finally:
+            if self.stats is not None:
+                self.stats.leave()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", "").strip())
+        if not (self.range_support and match and os.path.isfile(path)):
+            return super().send_head()
+        start, size = int(match.group(1)), os.path.getsize(path)
+        if start >= size:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        f = open(path, "rb")
+        f.seek(start)
+        self.send_response(206)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        self.send_header("Content-Length", str(size - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        return f
+
+    def copyfile(self, source, outputfile):
+        limit = None
+        remaining = os.fstat(source.fileno()).st_size - source.tell()
+        if (self.drop_after and remaining > self.drop_after and self.stats is not None
+                and self.stats.take_drop(self.drops)):
+            limit = self.drop_after
+        chunk_size = max(1024, self.rate_limit // 20) if self.rate_limit else 1 << 16
+        sent = 0
+        while chunk := source.read(chunk_size if limit is None else min(chunk_size, limit - sent)):
+            outputfile.write(chunk)
+            sent += len(chunk)
+            if self.stats is not None:
+                self.stats.sent(len(chunk))
+            if self.rate_limit:
+                time.sleep(len(chunk) / self.rate_limit)
+            if limit is not None and sent >= limit:
+                # Đóng kết nối khi chưa gửi hết Content-Length: client nhận IncompleteRead
+                self.close_connection = True
+                return
+
+
+class FeedServer(ThreadingHTTPServer):
+    # Client đóng kết nối giữa chừng là bình thường trong các benchmark tải lại, không in traceback
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+@contextlib.contextmanager
+def serve_feeds(directory, handler=FeedRequestHandler, **attributes):
+    """
+    Chạy server trong thread nền, trả về URL gốc (http://127.0.0.1:<port>), tắt server khi ra khỏi with.
+    attributes: thuộc tính gán cho handler (ví dụ rate_limit=..., stats=FeedStats()).
+    """
+    if attributes:
+        handler = type(handler.__name__, (handler,), attributes)
+    server = FeedServer(("127.0.0.1", 0), functools.partial(handler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Server giả lập NVD CVE API 2.0 (/rest/json/cves/2.0) phát lại các trang đã ghi, dùng để chạy
+nvd_api.ingest_changes không cần mạng. Hỗ trợ lastModStartDate / lastModEndDate, startIndex và
+resultsPerPage; có thể giả lập lỗi 503 sau một số trang để kiểm tra việc tiếp tục từ checkpoint.
+
+Ghi lại các trang từ NVD thật (ví dụ 2 ngày gần nhất) rồi phát lại:
+
+    python -m benchmark.nvd_api_server record --days 2 --out recordings/
+    python -m benchmark.nvd_api_server serve --recordings recordings/ --port 8010
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+API_PATH = "/rest/json/cves/2.0"
+
+
+def parse_date(value):
+    value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+# Đọc mọi "vulnerabilities" trong các file *.json của thư mục, sắp theo lastModified
+def load_recordings(directory):
+    vulnerabilities = {}
+    for path in sorted(Path(directory).glob("*.json")):
+        with path.open("r", encoding="utf-8") as f:
+            for vulnerability in json.load(f).get("vulnerabilities", []):
+                vulnerabilities[vulnerability["cve"]["id"]] = vulnerability
+    return sorted(vulnerabilities.values(), key=lambda v: parse_date(v["cve"]["lastModified"]))
+
+
+class APIStats:
+    def __init__(self, fail_after=None):
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.failures = 0
+        # Sau bấy nhiêu trang thành công thì trả 503 cho mọi request (đặt lại None để server hoạt động lại)
+        self.fail_after = fail_after
+
+    def take_page(self):
+        with self.lock:
+            if self.fail_after is not None and self.pages >= self.fail_after:
+                self.failures += 1
+                return False
+            self.pages += 1
+            return True
+
+
+class NVDAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    vulnerabilities = []
+    max_page_size = 2000
+    stats = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != API_PATH:
+            self.send_json(404, {"message": "not found"})
+            return
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if ("lastModStartDate" in query) != ("lastModEndDate" in query):
+            self.send_json(404, {"message": "lastModStartDate và lastModEndDate phải đi cùng nhau"})
+            return
+        if self.stats is not None and not self.stats.take_page():
+            self.send_json(503, {"message": "Service Unavailable"})
+            return
+
+        matched = self.vulnerabilities
+        if "lastModStartDate" in query:
+            start, end = parse_date(query["lastModStartDate"]), parse_date(query["lastModEndDate"])
+            if end - start > datetime.timedelta(days=120):
+                self.send_json(404, {"message": "Khoảng thời gian tối đa 120 ngày"})
+                return
+            matched = [v for v in matched if start <= parse_date(v["cve"]["lastModified"]) <= end]
+        start_index = int(query.get("startIndex", 0))
+        page_size = min(int(query.get("resultsPerPage", self.max_page_size)), self.max_page_size)
+        page = matched[start_index:start_index + page_size]
+        self.send_json(200, {
+            "resultsPerPage": len(page), "startIndex": start_index, "totalResults": len(matched),
+            "format": "NVD_CVE", "version": "2.0",
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000"),
+            "vulnerabilities": page,
+        })
+
+
+@contextlib.contextmanager
+def serve_api(vulnerabilities, stats=None, port=0, **attributes):
+    """
+    Chạy server trong thread nền, trả về URL của API (http://127.0.0.1:<port>/rest/json/cves/2.0).
+    """
+    handler = type("NVDAPIHandler", (NVDAPIHandler,),
+                   dict(attributes, vulnerabilities=list(vulnerabilities), stats=stats))
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}{API_PATH}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# Ghi các trang thay đổi trong `days` ngày gần nhất từ NVD API thật vào out_dir
+def record(days, out_dir):
+    from flaskr.function import nvd_api
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    end = datetime.datetime.now(datetime.timezone.utc)
+    page_number = 0
+    for window_start, window_end in nvd_api.split_windows(end - datetime.timedelta(days=days), end):
+        start_index = 0
+        while True:
+            page = nvd_api.fetch_page(window_start, window_end, start_index)
+            with (out_dir / f"page-{page_number:05d}.json").open("w", encoding="utf-8") as f:
+                json.dump(page, f)
+            page_number += 1
+            start_index += len(page.get("vulnerabilities", []))
+            print(f"Đã ghi {start_index}/{page.get('totalResults', 0)} CVE")
+            if not page.get("vulnerabilities") or start_index >= page.get("totalResults", 0):
+                break
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record", help="Ghi các trang từ NVD API thật")
+    record_parser.add_argument("--days", type=int, default=2)
+    record_parser.add_argument("--out", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Phát lại các trang đã ghi")
+    serve_parser.add_argument("--recordings", required=True)
+    serve_parser.add_argument("--port", type=int, default=8010)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.days, args.out)
+        return
+    vulnerabilities = load_recordings(args.recordings)
+    with serve_api(vulnerabilities, port=args.port) as url:
+        print(f"Phát lại {len(vulnerabilities)} CVE tại {url} (Ctrl+C để dừng)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import datetime
+import gzip
+import hashlib
+import json
+import random
+from pathlib import Path
+
+# Sinh dữ liệu NVD giả lập (định dạng feed 1.1) phục vụ benchmark, không cần tải từ NVD
+
+VENDOR_PRODUCTS = [
+    ("nginx", "nginx"), ("php", "php"), ("jquery", "jquery"), ("wordpress", "wordpress"),
+    ("apache", "http_server"), ("apache", "tomcat"), ("openssl", "openssl"), ("microsoft", "asp.net"),
+    ("getbootstrap", "bootstrap"), ("drupal", "drupal"), ("joomla", "joomla\\!"), ("mysql", "mysql"),
+    ("oracle", "mysql"), ("vuejs", "vue.js"), ("facebook", "react"), ("angularjs", "angular.js"),
+    ("lodash", "lodash"), ("moment", "moment.js"), ("igor_sysoev", "nginx"), ("python", "python"),
+]
+
+
+def make_cpe(vendor, product, version="*"):
+    return f"cpe:2.3:a:{vendor}:{product}:{version}:*:*:*:*:*:*:*"
+
+
+def random_version(rng):
+    return f"{rng.randint(0, 9)}.{rng.randint(0, 20)}.{rng.randint(0, 30)}"
+
+
+def make_cve_item(year, seq, rng):
+    vendor, product = rng.choice(VENDOR_PRODUCTS)
+    start, end = sorted([random_version(rng), random_version(rng)], key=lambda v: tuple(map(int, v.split("."))))
+    cpe_match = [
+        {"vulnerable": True, "cpe23Uri": make_cpe(vendor, product),
+         "versionStartIncluding": start, "versionEndExcluding": end},
+        {"vulnerable": True, "cpe23Uri": make_cpe(vendor, product, random_version(rng))},
+    ]
+    score = round(rng.uniform(1.0, 10.0), 1)
+    return {
+        "cve": {
+            "CVE_data_meta": {"ID": f"CVE-{year}-{seq:05d}"},
+            "problemtype": {"problemtype_data": [{"description": [{"value": f"CWE-{rng.randint(20, 900)}"}]}]},
+            "description": {"description_data": [{"value": f"Synthetic vulnerability {seq} in {vendor} {product}. " * 3}]},
+        },
+        "configurations": {"nodes": [{"operator": "OR", "children": [], "cpe_match": cpe_match}]},
+        "impact": {
+            "baseMetricV3": {
+                "cvssV3": {
+                    "vectorString": "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H",
+                    "baseScore": score,
+                    "baseSeverity": "CRITICAL" if score >= 9 else "HIGH" if score >= 7 else "MEDIUM",
+                },
+                "exploitabilityScore": 3.9,
+                "impactScore": 5.9,
+            }
+        },
+    }
+
+
+# Ghi file nvdcve-1.1-{year}.json với `count` CVE vào data_dir
+def write_cve_feed(data_dir: Path, year, count, seed=0):
+    rng = random.Random(f"{seed}-{year}")
+    items = [make_cve_item(year, seq, rng) for seq in range(count)]
+    path = Path(data_dir) / f"nvdcve-1.1-{year}.json"
+    with path.open("w", encoding="utf-8") as f:
+        json.dump({"CVE_data_type": "CVE", "CVE_data_format": "MITRE", "CVE_data_version": "4.0",
+                   "CVE_data_numberOfCVEs": str(count), "CVE_Items": items}, f)
+    return path
+
+
+# Ghi file nvdcpematch-1.0.json với `count` phần tử matches vào data_dir
+def write_cpe_match_feed(data_dir: Path, count, seed=0):
+    rng = random.Random(f"{seed}-cpe")
+    matches = []
+    for seq in range(count):
+        vendor, product = VENDOR_PRODUCTS[seq % len(VENDOR_PRODUCTS)]
+        versions = sorted({random_version(rng) for _ in range(rng.randint(1, 8))})
+        match = {"cpe23Uri": make_cpe(vendor, product),
+                 "cpe_name": [{"cpe23Uri": make_cpe(vendor, product, version)} for version in versions]}
+        if rng.random() < 0.5:
+            match["versionEndExcluding"] = versions[-1]
+        matches.append(match)
+    path = Path(data_dir) / "nvdcpematch-1.0.json"
+    with path.open("w", encoding="utf-8") as f:
+        json.dump({"matches": matches}, f)
+    return path
+
+
+# Nén file JSON thành .json.gz và ghi file .meta giống NVD (sha256 là của file JSON chưa nén)
+def write_feed_archive(json_path: Path, out_dir: Path = None):
+    json_path = Path(json_path)
+    out_dir = Path(out_dir or json_path.parent)
+    base = json_path.name[:-len(".json")]
+    sha256 = hashlib.sha256()
+    with json_path.open("rb") as src, gzip.open(out_dir / f"{base}.json.gz", "wb") as dst:
+        while chunk := src.read(1 << 16):
+            sha256.update(chunk)
+            dst.write(chunk)
+    gz_size = (out_dir / f"{base}.json.gz").stat().st_size
+    modified = datetime.datetime.fromtimestamp(json_path.stat().st_mtime, datetime.timezone.utc)
+    meta = (f"lastModifiedDate:{modified.strftime('%Y-%m-%dT%H:%M:%S')}-00:00\r\n"
+            f"size:{json_path.stat().st_size}\r\n"
+            f"zipSize:{gz_size}\r\n"
+            f"gzSize:{gz_size}\r\n"
+            f"sha256:{sha256.hexdigest().upper()}\r\n")
+    (out_dir / f"{base}.meta").write_text(meta)
+    return out_dir / f"{base}.json.gz"
+
+
+# Một CVE theo định dạng NVD CVE API 2.0 ("vulnerabilities"[i]["cve"])
+def make_api_cve(year, seq, rng, last_modified: datetime.datetime):
+    vendor, product = rng.choice(VENDOR_PRODUCTS)
+    start, end = sorted([random_version(rng), random_version(rng)], key=lambda v: tuple(map(int, v.split("."))))
+    score = round(rng.uniform(1.0, 10.0), 1)
+    return {
+        "id": f"CVE-{year}-{seq:05d}",
+        "sourceIdentifier": "cve@mitre.org",
+        "published": f"{year}-01-01T00:00:00.000",
+        "lastModified": last_modified.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3],
+        "vulnStatus": "Analyzed",
+        "descriptions": [{"lang": "en", "value": f"Synthetic vulnerability {seq} in {vendor} {product}."}],
+        "metrics": {"cvssMetricV31": [{
+            "source": "nvd@nist.gov", "type": "Primary",
+            "cvssData": {"version": "3.1", "vectorString": "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H",
+                         "baseScore": score,
+                         "baseSeverity": "CRITICAL" if score >= 9 else "HIGH" if score >= 7 else "MEDIUM"},
+            "exploitabilityScore": 3.9, "impactScore": 5.9,
+        }]},
+        "weaknesses": [{"source": "nvd@nist.gov", "type": "Primary",
+                        "description": [{"lang": "en", "value": f"CWE-{rng.randint(20, 900)}"}]}],
+        "configurations": [{"nodes": [{"operator": "OR", "negate": False, "cpeMatch": [
+            {"vulnerable": True, "criteria": make_cpe(vendor, product),
+             "versionStartIncluding": start, "versionEndExcluding": end},
+            {"vulnerable": True, "criteria": make_cpe(vendor, product, random_version(rng))},
+        ]}]}],
+    }
+
+
+# Ghi `count` CVE (lastModified rải đều trong `days` ngày trước `end`) thành các trang giống response
+# của NVD CVE API 2.0 vào out_dir, để server giả lập phát lại
+def write_api_recordings(out_dir: Path, count, days, end: datetime.datetime, years=(2023, 2024), seed=0,
+                         page_size=2000):
+    rng = random.Random(f"{seed}-api")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    step = datetime.timedelta(days=days) / max(count, 1)
+    vulnerabilities = [
+        {"cve": make_api_cve(years[seq % len(years)], seq, rng, end - step * (count - seq))}
+        for seq in range(count)
+    ]
+    paths = []
+    for page, offset in enumerate(range(0, count, page_size)):
+        path = out_dir / f"page-{page:05d}.json"
+        with path.open("w", encoding="utf-8") as f:
+            json.dump({"resultsPerPage": len(vulnerabilities[offset:offset + page_size]), "startIndex": offset,
+                       "totalResults": count, "format": "NVD_CVE", "version": "2.0",
+                       "vulnerabilities": vulnerabilities[offset:offset + page_size]}, f)
+        paths.append(path)
+    return paths
@@ -0,0 +1,114 @@
+import re
+from collections import Counter
+
+# Engine tìm CPE thay thế cho QueryParser + BM25F: index trigram trong bộ nhớ trên các cặp vendor:product
+# khác nhau, lấy ứng viên theo số trigram chung rồi chấm điểm bằng hệ số Dice giữa tên công nghệ
+# và "product" / "vendor product" của từng ứng viên.
+
+# Tách từ giống cpe_analyzer, thêm "." để "ASP.NET" khớp với "asp.net"
+TOKEN_SPLIT = re.compile(r"[\s\\/\-_:.!]+")
+# Số ứng viên (theo số trigram chung) được chấm điểm đầy đủ
+CANDIDATES = 64
+# Trigram có posting dài hơn tỉ lệ này trên tổng số product được coi là phổ biến
+COMMON_RATIO = 0.02
+# Điểm cộng khi công nghệ có version đầu vào trong danh sách version của CPE
+VERSION_BONUS = 0.1
+
+
+def normalize_name(name: str):
+    return " ".join(token for token in TOKEN_SPLIT.split(name.lower()) if token)
+
+
+def trigrams(text: str):
+    compact = f"  {text.replace(' ', '')} "
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+def dice(a: set, b: set):
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class _Product:
+    __slots__ = ("vendor_product", "cpes", "docnums", "forms", "tokens", "cpe", "entries")
+
+    def __init__(self, vendor_product):
+        self.vendor_product = vendor_product
+        self.cpes = Counter()
+        self.docnums = []
+        vendor, _, product = vendor_product.partition(":")
+        vendor, product = normalize_name(vendor), normalize_name(product)
+        # Các dạng tên được so khớp: "product", "vendor product" và "vendor viết tắt"
+        # (internet_information_services -> iis) nếu product có nhiều từ
+        self.forms = [trigrams(product), trigrams(f"{vendor} {product}")]
+        self.tokens = set(f"{vendor} {product}".split())
+        product_tokens = product.split()
+        if len(product_tokens) > 1:
+            acronym = "".join(token[0] for token in product_tokens)
+            self.forms.append(trigrams(f"{vendor} {acronym}"))
+            self.tokens.add(acronym)
+
+    # Chốt sau khi đã đọc hết entry: CPE đại diện là CPE tổng quát (version = *) xuất hiện nhiều nhất
+    def finish(self):
+        self.cpe = self.cpes.most_common(1)[0][0]
+        self.entries = sum(self.cpes.values())
+        self.cpes = None
+
+
+class TrigramMatcher:
+    def __init__(self, entries):
+        """
+        entries: các bộ (docnum, vendor_product, cpe) của index CPE.
+        """
+        products = {}
+        for docnum, vendor_product, cpe in entries:
+            if not vendor_product or not cpe:
+                continue
+            product = products.get(vendor_product)
+            if product is None:
+                product = products[vendor_product] = _Product(vendor_product)
+            cpe_split = cpe.split(":")
+            if len(cpe_split) > 5:
+                cpe_split[5] = "*"
+            product.cpes[":".join(cpe_split)] += 1
+            product.docnums.append(docnum)
+
+        self.products = list(products.values())
+        for product in self.products:
+            product.finish()
+        self.postings = {}
+        self.common_limit = max(100, int(len(self.products) * COMMON_RATIO))
+        for product_id, product in enumerate(self.products):
+            for gram in set().union(*product.forms):
+                self.postings.setdefault(gram, []).append(product_id)
+
+    # Trả về [(score, cpe, version), ...] tốt nhất cho một tên công nghệ.
+    # version_docs: tập docnum có version đầu vào (từ điển version), None nếu không xét version
+    def search(self, name: str, version: str, limit, version_docs=None):
+        normalized = normalize_name(name)
+        grams = trigrams(normalized)
+        if not normalized:
+            return []
+        # Trigram phổ biến (posting dài) tốn thời gian đếm mà ít phân biệt được ứng viên: chỉ đếm trên
+        # các trigram hiếm, trừ khi tên chỉ gồm trigram phổ biến. Điểm cuối vẫn tính trên toàn bộ trigram.
+        postings = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        rare = [posting for posting in postings if len(posting) <= self.common_limit] or postings[:3]
+        overlaps = Counter()
+        for posting in rare:
+            overlaps.update(posting)
+
+        tokens = set(normalized.split())
+        scored = []
+        for product_id, _ in overlaps.most_common(CANDIDATES):
+            product = self.products[product_id]
+            score = max(dice(grams, form) for form in product.forms)
+            # Tên trùng hoàn toàn với các từ của vendor/product được ưu tiên
+            if tokens <= product.tokens:
+                score += 0.2
+            if version_docs and any(docnum in version_docs for docnum in product.docnums):
+                score += VERSION_BONUS
+            scored.append((score, product.entries, product.cpe))
+        # Điểm bằng nhau thì ưu tiên product có nhiều entry trong feed hơn
+        scored.sort(key=lambda item: (-item[0], -item[1], item[2]))
+        return [(score, cpe, version) for score, _, cpe in scored[:limit]]
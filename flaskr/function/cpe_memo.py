@@ -0,0 +1,132 @@
+from collections import Counter
+from flaskr import db
+from flaskr.model import Tech, Tech_CPE
+from flaskr.function.cpe_scan import INDEX_DIR, search_cpe_many
+from flaskr.function.index_pool import read_generation
+
+# Bộ nhớ tên công nghệ -> CPE tổng quát, học từ các CPE người dùng đã chọn khi quét thủ công (và bảng Tech).
+# Công nghệ đã biết không cần tìm full-text trong index CPE nữa khi quét tự động; luồng thủ công vẫn
+# hiện đủ ứng viên (rank_cpe_candidates) để người dùng sửa lại lựa chọn đã nhớ. Khi indexing_cpe dựng lại index
+# (generation đổi), mỗi entry được kiểm tra lại một lần với kết quả tìm kiếm mới.
+
+# Chuẩn hóa tên công nghệ của Wappalyzer ("Nginx", " jQuery ") làm key
+def normalize_tech(tech: str):
+    return tech.strip().lower()
+
+# CPE tổng quát của một CPE: bỏ version để dùng được cho mọi version của công nghệ
+def generic_cpe(cpe: str):
+    cpe_split = cpe.strip().split(':')
+    if len(cpe_split) < 6:
+        return cpe.strip()
+    cpe_split[5] = "*"
+    return ":".join(cpe_split)
+
+def cpe_generation():
+    return read_generation(INDEX_DIR)
+
+# Ghi nhớ CPE đã xác nhận cho một công nghệ, người gọi chịu trách nhiệm commit
+def learn_tech_cpe(tech, cpe, generation=None):
+    if not tech or not cpe:
+        return
+    generation = cpe_generation() if generation is None else generation
+    key = normalize_tech(tech)
+    memo = Tech_CPE.query.filter_by(tech=key).first()
+    if memo is None:
+        memo = Tech_CPE(tech=key, cpe=generic_cpe(cpe), hits=0, cpe_generation=generation)
+        db.session.add(memo)
+    else:
+        memo.cpe = generic_cpe(cpe)
+        memo.cpe_generation = generation
+    db.session.flush()
+
+# Ghi nhớ các cặp tech/cpe của một kết quả quét người dùng đã xác nhận (data["results"] của add_to_database).
+# Chạy sau khi kết quả quét đã commit để lỗi ghi nhớ không làm hỏng việc lưu kết quả.
+def learn_confirmed_results(results):
+    try:
+        generation = cpe_generation()
+        for result in results:
+            learn_tech_cpe(result.get('tech'), result.get('cpe'), generation)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Lỗi khi ghi nhớ CPE: {e}")
+
+# Học lại toàn bộ từ bảng Tech: mỗi công nghệ lấy CPE xuất hiện nhiều nhất
+def learn_from_tech_table():
+    counters = {}
+    for tech in Tech.query.all():
+        if tech.cpe:
+            counters.setdefault(normalize_tech(tech.tech), Counter())[generic_cpe(tech.cpe)] += 1
+    generation = cpe_generation()
+    for key, counter in counters.items():
+        learn_tech_cpe(key, counter.most_common(1)[0][0], generation)
+    db.session.commit()
+    return len(counters)
+
+# Giống search_cpe_many nhưng công nghệ đã ghi nhớ trả về ngay CPE đã xác nhận (score = None).
+# Cần app context. Trả về dict {(tech, version): [(score, cpe, version), ...]}.
+def resolve_cpe_many(pairs, limit):
+    pairs = list(dict.fromkeys((tech, version) for tech, version in pairs))
+    generation = cpe_generation()
+    keys = {normalize_tech(tech) for tech, _ in pairs}
+    memos = {memo.tech: memo for memo in Tech_CPE.query.filter(Tech_CPE.tech.in_(keys)).all()} if keys else {}
+
+    results = {}
+    misses = []
+    stale = []
+    for tech, version in pairs:
+        memo = memos.get(normalize_tech(tech))
+        if memo is None:
+            misses.append((tech, version))
+        elif memo.cpe_generation != generation:
+            stale.append((tech, version))
+        else:
+            results[(tech, version)] = [(None, memo.cpe, version)]
+            memo.hits += 1
+
+    searched = search_cpe_many(misses + stale, limit) if misses or stale else {}
+    for tech, version in misses:
+        results[(tech, version)] = searched[(tech, version)]
+    # Index CPE đã được dựng lại: giữ entry nếu CPE đã nhớ vẫn nằm trong các ứng viên, nếu không thì bỏ
+    for tech, version in stale:
+        key = normalize_tech(tech)
+        memo = memos.get(key)
+        candidates = searched[(tech, version)]
+        if memo is not None and memo.cpe_generation != generation:
+            if any(generic_cpe(cpe) == memo.cpe for _, cpe, _ in candidates):
+                memo.cpe_generation = generation
+            elif candidates:
+                db.session.delete(memo)
+                memos.pop(key)
+                memo = None
+        # Không có ứng viên cho version này thì chưa đủ thông tin để bỏ entry, dùng kết quả tìm kiếm
+        if memo is None or memo.cpe_generation != generation:
+            results[(tech, version)] = candidates
+            continue
+        results[(tech, version)] = [(None, memo.cpe, version)]
+        memo.hits += 1
+
+    # Số lần dùng và generation chỉ là thông tin phụ, lỗi ghi (ví dụ thread khác vừa xóa entry) thì bỏ qua
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Lỗi khi cập nhật bộ nhớ CPE: {e}")
+    return results
+
+# Luồng thủ công: luôn tìm đủ `limit` ứng viên, CPE đã nhớ (nếu còn hiệu lực) đứng đầu với score = None.
+# Cần app context. Trả về dict {(tech, version): [(score, cpe, version), ...]} như search_cpe_many.
+def rank_cpe_candidates(pairs, limit):
+    pairs = list(dict.fromkeys((tech, version) for tech, version in pairs))
+    generation = cpe_generation()
+    keys = {normalize_tech(tech) for tech, _ in pairs}
+    memos = {memo.tech: memo for memo in Tech_CPE.query.filter(Tech_CPE.tech.in_(keys)).all()} if keys else {}
+
+    results = search_cpe_many(pairs, limit)
+    for tech, version in pairs:
+        memo = memos.get(normalize_tech(tech))
+        if memo is None or memo.cpe_generation != generation:
+            continue
+        others = [candidate for candidate in results[(tech, version)] if generic_cpe(candidate[1]) != memo.cpe]
+        results[(tech, version)] = [(None, memo.cpe, version)] + others[:max(0, limit - 1)]
+    return results
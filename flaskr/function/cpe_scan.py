@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
-import json
 import time
 import sys
+import os
 import re
+import threading
+from functools import lru_cache, partial
 from pathlib import Path
 
 from tqdm import tqdm
@@ -13,20 +15,43 @@ from whoosh.qparser import QueryParser
 from whoosh.analysis import RegexTokenizer, LowercaseFilter
 from whoosh import scoring
 from whoosh import highlight
+from .json_stream import iter_json_array
+from .index_pool import (SearcherPool, bump_generation, read_generation, new_index_dir, publish_index_dir,
+                         current_index_dir)
+from .cpe_versions import VersionDictionaryBuilder, CPEVersionDictionary
+from .cpe_fuzzy import TrigramMatcher
 
 # Đường dẫn đến file JSON và thư mục chứa index sử dụng pathlib
 CPE_JSON_FILE = (Path(__file__).resolve().parent / "../../src/nvd_cpe_data/nvdcpematch-1.0.json").resolve()
 INDEX_DIR = (Path(__file__).resolve().parent / "../../src/nvd_cpe_data/whoosh_indexing").resolve()
+# Mỗi lần index tạo một bản build INDEX_DIR/cpe@<n> rồi mới chuyển con trỏ cpe.current sang (xem index_pool.py).
+# Index cũ dựng trực tiếp trong INDEX_DIR vẫn được dùng cho tới lần index đầu tiên.
+CPE_INDEX_NAME = "cpe"
+# Từ điển version dạng cột (xem cpe_versions.py), nằm trong cùng thư mục build với index Whoosh
+VERSION_DICT_NAME = "versions.bin"
 
 CPE_PATTERN = re.compile(
     r"^cpe:2\.3:(?P<part>[aho]):(?P<vendor>[^:]*):(?P<product>[^:]*):(?P<version>[^:]*):(?P<update>[^:]*):(?P<edition>[^:]*):(?P<language>[^:]*):(?P<sw_edition>[^:]*):(?P<target_sw>[^:]*):(?P<target_hw>[^:]*):(?P<other>[^:]*)$"
 )
 
+# Searcher CPE dùng chung, chỉ mở lại khi indexing_cpe dựng lại index (file GENERATION trong INDEX_DIR)
+SEARCHER_POOL = SearcherPool(INDEX_DIR, partial(scoring.BM25F, k1=0.001))
+
+# Engine tìm CPE: "whoosh" (QueryParser + BM25F) hoặc "fuzzy" (index trigram trong bộ nhớ, xem cpe_fuzzy.py)
+CPE_MATCH_ENGINE = os.getenv("CPE_MATCH_ENGINE", "whoosh")
+
 # 0.1. Tạo analyzer cho index, loại bỏ các kí tự đặc biệt (bao gồm cả "/" và "\")
 cpe_analyzer = RegexTokenizer(r"[^ \\\/\t\r\n\-_:]+") | LowercaseFilter()
 
 # 1. Tạo schema cho index
+# Version không còn được index dạng text mà nằm trong từ điển version (VERSION_DICT_FILE)
 schema = Schema(
+    vendor_product=TEXT(stored=True, analyzer=cpe_analyzer),
+    cpe=STORED
+)
+
+# Schema của index cũ (còn trường versions), chỉ dùng để tìm kiếm khi chưa có từ điển version
+legacy_schema = Schema(
     vendor_product=TEXT(stored=True, analyzer=cpe_analyzer),
     versions=TEXT(stored=True, analyzer=cpe_analyzer),
     cpe=STORED
@@ -50,26 +75,19 @@ def parse_cpe_uri(cpe_uri: str):
 def indexing_cpe():
     start_time = time.time()
 
-    # Tạo thư mục chứa index: nếu chưa tồn tại, tạo mới; nếu đã tồn tại, làm mới nội dung
-    if not INDEX_DIR.exists():
-        INDEX_DIR.mkdir(parents=True, exist_ok=True)
-        ix = index.create_in(str(INDEX_DIR), schema)
-    else:
-        # Xóa các file cũ trong thư mục index
-        for file in INDEX_DIR.iterdir():
-            file.unlink()
-        ix = index.create_in(str(INDEX_DIR), schema)
+    # Dựng index trong thư mục build mới, index đang dùng vẫn tìm kiếm được trong lúc dựng
+    directory = new_index_dir(INDEX_DIR, CPE_INDEX_NAME)
+    ix = index.create_in(str(directory), schema)
 
-    # Đọc dữ liệu từ file JSON
-    with CPE_JSON_FILE.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    # Đọc dần từng phần tử của "matches" trong file JSON thay vì load cả file vào bộ nhớ
+    matches = iter_json_array(CPE_JSON_FILE, "matches")
 
     count_index = 0  # Đếm số lượng index
     cpe_universe = ""
-    matches = data.get("matches", [])
+    versions_builder = VersionDictionaryBuilder()
     with ix.writer() as writer:
         # Lấy dữ liệu từ trường "matches" trong JSON, cập nhật tiến trình bằng tqdm
-        for i, match in tqdm(enumerate(matches), total=len(matches), desc="Đang Index"):
+        for i, match in tqdm(enumerate(matches), desc="Đang Index"):
             cpe_uri_raw = match.get("cpe23Uri", "").strip()
             # Nếu cpe khái quát trùng với cpe trước, bỏ qua
             if cpe_uri_raw == cpe_universe:
@@ -87,55 +105,137 @@ def indexing_cpe():
             # Lấy version từ danh sách cpe_name
             vendor_product_cpe, _ = parse_cpe_uri(cpe_uri_raw)
             version_list = []
-            if not match.get("cpe_name", []):
-                version_field = ["*"]
-            else:
-                for cpe_versions in match.get("cpe_name", []):
-                    _, sub_version = parse_cpe_uri(cpe_versions.get("cpe23Uri", "").strip())
-                    version_list.append(sub_version)
-            version_field = " ".join(version_list)
+            for cpe_versions in match.get("cpe_name", []):
+                _, sub_version = parse_cpe_uri(cpe_versions.get("cpe23Uri", "").strip())
+                version_list.append(sub_version)
 
             writer.add_document(
                 vendor_product=vendor_product_cpe,
-                versions=version_field,
                 cpe=cpe_uri_raw
             )
+            # Docnum trong từ điển version trùng với thứ tự add_document
+            vendor, _, product = vendor_product_cpe.partition(":")
+            versions_builder.add(vendor, product, version_list)
             count_index += 1
 
         pause_time = time.time()
         print(f"Complete adding document time: {pause_time - start_time:.4f} seconds")
         print("Start merging segments...")
 
+    # Từ điển version ghi lại generation sắp bump, để biết nó khớp với index hiện tại
+    if ix.doc_count_all() == len(versions_builder.doc_vendor):
+        versions_builder.write(directory / VERSION_DICT_NAME, read_generation(INDEX_DIR) + 1)
+    else:
+        print("Số document của index khác từ điển version, bỏ qua ghi từ điển")
+
+    # Chuyển sang bản build mới, bản cũ chỉ bị xóa sau khi đã cũ hơn một lần build nữa
+    publish_index_dir(INDEX_DIR, CPE_INDEX_NAME, directory, legacy=INDEX_DIR)
+
+    # Báo cho các searcher đang mở biết index đã thay đổi
+    bump_generation(INDEX_DIR)
     stop_time = time.time()
     print(f"Index created/updated: {count_index} CPE entries.")
     print(f"Indexing time: {stop_time - start_time:.4f} seconds")
 
+def cpe_index_exists():
+    return index.exists_in(str(current_index_dir(INDEX_DIR, CPE_INDEX_NAME, legacy=INDEX_DIR)))
+
 # 4. Tìm kiếm CPE
-def search_cpe(input_product: str, input_version: str, limit):
+def search_cpe(input_product: str, input_version: str, limit, engine=None):
+    return search_cpe_many([(input_product, input_version)], limit, engine)[(input_product, input_version)]
+
+# 4.1 Tìm CPE cho nhiều cặp (tech, version) cùng lúc, ví dụ toàn bộ kết quả Wappalyzer của nhiều URL.
+# Các cặp trùng nhau chỉ được tìm một lần, tất cả dùng chung một searcher.
+# Trả về dict {(tech, version): [(score, cpe, version), ...]} theo thứ tự điểm giảm dần.
+def search_cpe_many(pairs, limit, engine=None):
+    engine = engine or CPE_MATCH_ENGINE
+    pairs = list(dict.fromkeys((tech, version) for tech, version in pairs))
+    results = {pair: [] for pair in pairs}
     if not INDEX_DIR.exists():
         print("Index directory not found. Please run indexing first.")
-        return []
-
-    ix = index.open_dir(str(INDEX_DIR))
-
-    # Sử dụng BM25F để tính điểm (scoring)
-    searcher_weighting = scoring.BM25F(k1=0.001)
-    q = custom_query_parser(input_product, input_version)
-    with ix.searcher(weighting=searcher_weighting) as searcher:
-        results = searcher.search(q, limit=limit)
-        matched = []
-        for hit in results:
-            score = hit.score
-            cpe_general = hit["cpe"]
-            version = input_version
-            matched.append((score, cpe_general, version))
-        return matched
+        return results
+
+    # Gom các cặp chỉ khác nhau ở khoảng trắng đầu/cuối
+    queries = {}
+    for tech, version in pairs:
+        queries.setdefault((tech.strip(), version.strip()), []).append((tech, version))
+
+    # Sử dụng BM25F để tính điểm (scoring), searcher được lấy từ pool thay vì mở index mỗi lần
+    SEARCHER_POOL.sync()
+    cpe_dir = SEARCHER_POOL.resolve(CPE_INDEX_NAME, legacy=INDEX_DIR)
+    with SEARCHER_POOL.acquire(cpe_dir) as searcher:
+        if searcher is None:
+            print("Index directory not found. Please run indexing first.")
+            return results
+        versions = get_version_dictionary(cpe_dir)
+        matcher = get_fuzzy_matcher(searcher) if engine == "fuzzy" else None
+        for (product, version), inputs in queries.items():
+            try:
+                # Index trước khi có từ điển version: tìm version bằng trường text như cũ
+                if versions is None and "versions" in searcher.schema:
+                    q = custom_query_parser(product, version)
+                    hits = [(hit.score, hit["cpe"]) for hit in searcher.search(q, limit=limit)]
+                else:
+                    # "*" (hoặc rỗng) khớp mọi version như wildcard của QueryParser
+                    version_docs = None
+                    if versions is not None and version not in ("", "*"):
+                        version_docs = versions.docs_with_version(version)
+                    # Version không có trong CPE nào: cả hai engine đều không trả ứng viên
+                    if version_docs is not None and not version_docs:
+                        hits = []
+                    elif matcher is not None:
+                        hits = [(score, cpe) for score, cpe, _ in matcher.search(product, version, limit, version_docs)]
+                    else:
+                        # Index text chỉ còn dùng để tìm theo tên, version được lọc bằng từ điển
+                        q = product_query(product)
+                        hits = [(hit.score, hit["cpe"]) for hit in searcher.search(q, filter=version_docs, limit=limit)]
+            except Exception as e:
+                print(f"Lỗi khi tìm CPE cho {product} {version}: {e}")
+                continue
+            for tech, input_version in inputs:
+                results[(tech, input_version)] = [(score, cpe_general, input_version) for score, cpe_general in hits]
+    return results
+
+_version_dictionary = None
+
+# Lấy từ điển version của thư mục index cpe_dir, còn khớp với generation hiện tại; None nếu chưa có hoặc đã cũ
+def get_version_dictionary(cpe_dir: Path):
+    global _version_dictionary
+    generation = SEARCHER_POOL.generation
+    if _version_dictionary is not None and _version_dictionary.generation == generation:
+        return _version_dictionary
+    _version_dictionary = None
+    if (cpe_dir / VERSION_DICT_NAME).exists():
+        dictionary = CPEVersionDictionary(cpe_dir / VERSION_DICT_NAME)
+        if dictionary.generation == generation:
+            _version_dictionary = dictionary
+    return _version_dictionary
+
+_fuzzy_matcher = None
+_fuzzy_lock = threading.Lock()
+
+# Index trigram của engine "fuzzy", dựng từ stored fields của index CPE và dựng lại khi generation đổi
+def get_fuzzy_matcher(searcher):
+    global _fuzzy_matcher
+    generation = SEARCHER_POOL.generation
+    with _fuzzy_lock:
+        if _fuzzy_matcher is None or _fuzzy_matcher[0] != generation:
+            entries = ((docnum, fields.get("vendor_product", ""), fields.get("cpe", ""))
+                       for docnum, fields in searcher.reader().iter_docs())
+            _fuzzy_matcher = (generation, TrigramMatcher(entries))
+        return _fuzzy_matcher[1]
+
+vendor_product_parser = QueryParser("vendor_product", schema=schema)
+version_parser = QueryParser("versions", schema=legacy_schema)
+
+@lru_cache(maxsize=4096)
+def product_query(input_product: str):
+    return vendor_product_parser.parse(input_product)
 
 # Điều chỉnh query parser cho user input
+# Query đã parse được cache theo input (query Whoosh không bị thay đổi khi tìm kiếm)
+@lru_cache(maxsize=4096)
 def custom_query_parser(input_product: str, input_version: str):
-    vendor_product_parser = QueryParser("vendor_product", schema=schema)
-    version_parser = QueryParser("versions", schema=schema)
-
     q_product = vendor_product_parser.parse(input_product)
     q_version = version_parser.parse(input_version)
 
@@ -0,0 +1,130 @@
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+# Từ điển version của index CPE: vendor, product và version được intern thành id, lưu dạng cột (array uint32)
+# theo docnum của index Whoosh. Dùng để kiểm tra chính xác một version có trong entry CPE hay không,
+# thay vì tách version thành token trong trường TEXT.
+#
+# Bố cục file (little-endian):
+#   header  : magic, generation, số document, số vendor, số product, số version, số posting
+#   cột     : doc_vendor[doc], doc_product[doc], version_offsets[version + 1], version_docs[posting]
+#             (version_docs của mỗi version là danh sách docnum tăng dần)
+#   chuỗi   : vendor, product, version, mỗi chuỗi kết thúc bằng "\0"
+MAGIC = b"CPEVER01"
+HEADER = struct.Struct("<8sQIIIII")
+
+
+class VersionDictionaryBuilder:
+    def __init__(self):
+        self.vendors = {}
+        self.products = {}
+        self.versions = {}
+        self.doc_vendor = array("I")
+        self.doc_product = array("I")
+        # Cặp (version_id, docnum) theo thứ tự thêm, đảo thành posting theo version khi ghi
+        self.pairs_version = array("I")
+        self.pairs_doc = array("I")
+
+    @staticmethod
+    def _intern(table, value):
+        value_id = table.get(value)
+        if value_id is None:
+            value_id = table[value] = len(table)
+        return value_id
+
+    # Thêm một document theo đúng thứ tự add_document vào index Whoosh, trả về docnum
+    def add(self, vendor, product, versions):
+        docnum = len(self.doc_vendor)
+        self.doc_vendor.append(self._intern(self.vendors, vendor))
+        self.doc_product.append(self._intern(self.products, product))
+        for version_id in {self._intern(self.versions, normalize_version(version)) for version in versions if version}:
+            self.pairs_version.append(version_id)
+            self.pairs_doc.append(docnum)
+        return docnum
+
+    def write(self, path: Path, generation: int):
+        # Đếm rồi xếp (counting sort) để có posting theo version, docnum trong mỗi posting vẫn tăng dần
+        version_offsets = array("I", [0]) * (len(self.versions) + 1)
+        for version_id in self.pairs_version:
+            version_offsets[version_id + 1] += 1
+        for i in range(len(self.versions)):
+            version_offsets[i + 1] += version_offsets[i]
+        version_docs = array("I", [0]) * len(self.pairs_doc)
+        cursor = array("I", version_offsets[:-1])
+        for version_id, docnum in zip(self.pairs_version, self.pairs_doc):
+            version_docs[cursor[version_id]] = docnum
+            cursor[version_id] += 1
+
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, generation, len(self.doc_vendor), len(self.vendors), len(self.products),
+                                len(self.versions), len(version_docs)))
+            for column in (self.doc_vendor, self.doc_product, version_offsets, version_docs):
+                f.write(to_little_endian(column).tobytes())
+            for table in (self.vendors, self.products, self.versions):
+                f.write("".join(f"{value}\0" for value in table).encode("utf-8"))
+        os.replace(tmp_path, path)
+
+
+class CPEVersionDictionary:
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            data = f.read()
+        (magic, self.generation, doc_count, vendor_count, product_count,
+         version_count, posting_count) = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} không phải từ điển version CPE hợp lệ")
+
+        offset = HEADER.size
+        columns = []
+        for length in (doc_count, doc_count, version_count + 1, posting_count):
+            column = array("I")
+            column.frombytes(data[offset:offset + length * column.itemsize])
+            columns.append(to_little_endian(column))
+            offset += length * column.itemsize
+        self.doc_vendor, self.doc_product, self.version_offsets, self.version_docs = columns
+
+        strings = data[offset:].decode("utf-8").split("\0")
+        self.vendors = strings[:vendor_count]
+        self.products = strings[vendor_count:vendor_count + product_count]
+        self.version_ids = {version: i for i, version in
+                            enumerate(strings[vendor_count + product_count:vendor_count + product_count + version_count])}
+
+    def __len__(self):
+        return len(self.doc_vendor)
+
+    def vendor_product(self, docnum):
+        return f"{self.vendors[self.doc_vendor[docnum]]}:{self.products[self.doc_product[docnum]]}"
+
+    def _posting(self, version):
+        version_id = self.version_ids.get(normalize_version(version))
+        if version_id is None:
+            return 0, 0
+        return self.version_offsets[version_id], self.version_offsets[version_id + 1]
+
+    # Tập docnum có version này (dùng làm filter cho searcher Whoosh)
+    def docs_with_version(self, version):
+        start, end = self._posting(version)
+        return set(self.version_docs[start:end])
+
+    # Kiểm tra một document có version này không (tìm kiếm nhị phân trong posting của version)
+    def has_version(self, docnum, version):
+        start, end = self._posting(version)
+        i = bisect_left(self.version_docs, docnum, start, end)
+        return i < end and self.version_docs[i] == docnum
+
+
+def normalize_version(version: str):
+    return version.strip().lower()
+
+
+# File luôn là little-endian, đổi byte order nếu máy big-endian
+def to_little_endian(column):
+    if array("I", [1]).tobytes()[0] != 1:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
@@ -0,0 +1,151 @@
+import marshal
+import mmap
+import os
+import struct
+from pathlib import Path
+
+# Bảng tra cứu CPE -> CVE dạng nhị phân, mở bằng mmap để nhiều process dùng chung page cache.
+#
+# Bố cục file (little-endian):
+#   header   : magic, generation, số CPE, số posting, số dải version, số CVE, offset của từng phần
+#   cpe      : [key_off, key_len, posting_start, posting_count] sắp xếp theo chuỗi CPE
+#   posting  : [row, range_start, range_count] sắp xếp theo row (năm giảm dần, rồi theo thứ tự điểm của truy vấn Whoosh trong năm)
+#   range    : [string_id] các khoảng version đã biên dịch (version_range.compile_range) của posting
+#   row      : [cve_off, cve_len, year, docnum] thông tin tối thiểu để đọc chi tiết CVE từ index của năm đó
+#   string   : [off, len] bảng khoảng version (marshal) đã khử trùng lặp
+#   blob     : dữ liệu chuỗi UTF-8
+MAGIC = b"CPELUT03"
+HEADER = struct.Struct("<8sQIIIII6Q")
+CPE_ENTRY = struct.Struct("<IIII")
+POSTING = struct.Struct("<III")
+RANGE = struct.Struct("<I")
+ROW = struct.Struct("<IIHI")
+STRING = struct.Struct("<II")
+
+
+# Ghi bảng tra cứu từ danh sách document (cve_id, year, docnum, field_length, {cpe: (interval, ...)}).
+# field_length là độ dài trường cpe_list trong index của năm (reader.doc_field_length).
+def write_lookup_table(path: Path, documents, generation: int):
+    blob = bytearray()
+
+    def add_blob(data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        offset = len(blob)
+        blob.extend(data)
+        return offset, len(data)
+
+    # Sắp xếp CVE giống thứ tự kết quả tìm theo từng năm: năm giảm dần, rồi điểm BM25F của truy vấn Term
+    # trên cpe_list (mọi CVE chứa cpe đều có tf = 1 nên cpe_list ngắn hơn điểm cao hơn), cùng điểm thì docnum tăng dần
+    documents = sorted(documents, key=lambda doc: (-doc[1], doc[3], doc[2]))
+    rows = []
+    postings_by_cpe = {}
+    for row, (cve_id, year, docnum, _, cpe_ranges) in enumerate(documents):
+        rows.append((*add_blob(cve_id), year, docnum))
+        for cpe, ranges in cpe_ranges.items():
+            postings_by_cpe.setdefault(cpe.lower(), []).append((row, ranges))
+
+    string_ids = {}
+    strings = []
+    range_ids = []
+    postings = []
+    cpe_entries = []
+    for cpe in sorted(postings_by_cpe, key=lambda key: key.encode("utf-8")):
+        start = len(postings)
+        for row, intervals in postings_by_cpe[cpe]:
+            range_start = len(range_ids)
+            for interval in intervals:
+                if interval not in string_ids:
+                    string_ids[interval] = len(strings)
+                    strings.append(add_blob(marshal.dumps(interval)))
+                range_ids.append(string_ids[interval])
+            postings.append((row, range_start, len(intervals)))
+        cpe_entries.append((*add_blob(cpe), start, len(postings) - start))
+
+    sections = [
+        (CPE_ENTRY, cpe_entries),
+        (POSTING, postings),
+        (RANGE, [(range_id,) for range_id in range_ids]),
+        (ROW, rows),
+        (STRING, strings),
+    ]
+    offsets = []
+    position = HEADER.size
+    for packer, entries in sections:
+        offsets.append(position)
+        position += packer.size * len(entries)
+    offsets.append(position)
+
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, generation, len(cpe_entries), len(postings), len(range_ids),
+                            len(rows), len(strings), *offsets))
+        for packer, entries in sections:
+            for entry in entries:
+                f.write(packer.pack(*entry))
+        f.write(blob)
+    # Thay file cũ một cách nguyên tử, các process đang mmap file cũ vẫn đọc được bản cũ
+    os.replace(tmp_path, path)
+
+
+class CVELookupTable:
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.generation, self.cpe_count, _, _, _, _,
+         self._cpe_off, self._posting_off, self._range_off, self._row_off,
+         self._string_off, self._blob_off) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} không phải bảng tra cứu CPE hợp lệ")
+        self._intervals = {}
+
+    def close(self):
+        self._mm.close()
+
+    def _text(self, offset, length):
+        start = self._blob_off + offset
+        return self._mm[start:start + length]
+
+    # Tìm kiếm nhị phân trên danh sách CPE đã sắp xếp
+    def _find(self, cpe: str):
+        key = cpe.strip().lower().encode("utf-8")
+        lo, hi = 0, self.cpe_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_off, key_len, start, count = CPE_ENTRY.unpack_from(self._mm, self._cpe_off + mid * CPE_ENTRY.size)
+            current = self._text(key_off, key_len)
+            if current < key:
+                lo = mid + 1
+            elif current > key:
+                hi = mid
+            else:
+                return start, count
+        return 0, 0
+
+    # Giải mã khoảng version một lần cho mỗi string_id
+    def _interval(self, string_id):
+        interval = self._intervals.get(string_id)
+        if interval is None:
+            offset, length = STRING.unpack_from(self._mm, self._string_off + string_id * STRING.size)
+            interval = self._intervals[string_id] = marshal.loads(self._text(offset, length))
+        return interval
+
+    # Trả về danh sách (row, (interval, ...)) của một CPE
+    def postings(self, cpe: str):
+        start, count = self._find(cpe)
+        results = []
+        for i in range(start, start + count):
+            row, range_start, range_count = POSTING.unpack_from(self._mm, self._posting_off + i * POSTING.size)
+            intervals = []
+            for j in range(range_start, range_start + range_count):
+                (string_id,) = RANGE.unpack_from(self._mm, self._range_off + j * RANGE.size)
+                intervals.append(self._interval(string_id))
+            results.append((row, tuple(intervals)))
+        return results
+
+    # Trả về (cve_id, year, docnum) của một row
+    def row(self, row: int):
+        offset, length, year, docnum = ROW.unpack_from(self._mm, self._row_off + row * ROW.size)
+        return self._text(offset, length).decode("utf-8"), year, docnum
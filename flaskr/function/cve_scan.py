@@ -1,18 +1,54 @@
-import json, time, sys, subprocess, platform
+import os, json, time, sys, subprocess, platform, hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from tqdm import tqdm
-from packaging.version import Version
 from whoosh import index
-from whoosh.fields import Schema, TEXT, ID, STORED, KEYWORD
-from whoosh.query import Term
-from whoosh import scoring
+from whoosh.fields import Schema, TEXT, ID, STORED, KEYWORD, NUMERIC, COLUMN
+from whoosh.columns import PickleColumn, VarBytesColumn
+from whoosh.query import Term, NumericRange, Or
+from whoosh import scoring, sorting
+from .index_pool import SearcherPool, bump_generation, read_generation, current_index_dir, new_index_dir, publish_index_dir
+from .cve_lookup import CVELookupTable, write_lookup_table
+from .version_range import version_key, compile_intervals, compile_cpe_ranges, stab
+from .lookup_cache import LookupCache
+from .json_stream import iter_json_array
 
 # Khai báo đường dẫn đến thư mục chứa data sử dụng pathlib
-INDEX_DIR = (Path(__file__).resolve().parent / "../../src/nvd_cve_data/whoosh_indexing").resolve()
+CVE_DATA_DIR = (Path(__file__).resolve().parent / "../../src/nvd_cve_data").resolve()
+INDEX_DIR = CVE_DATA_DIR / "whoosh_indexing"
+# Index gộp tất cả các năm (có trường year), được ưu tiên khi tìm kiếm nếu đã tồn tại
+UNIFIED_INDEX_NAME = "all"
+CVE_YEARS = list(range(2002, 2026))
+
+# Bảng tra cứu CPE -> CVE nhị phân (mmap), được dựng lại sau mỗi lần index toàn bộ
+LOOKUP_TABLE_FILE = INDEX_DIR / "cpe_lookup.bin"
+
+# Bật CVE_UNIFIED_INDEX=1 để indexing_full_cve dựng thêm index gộp
+CVE_UNIFIED_INDEX = os.getenv("CVE_UNIFIED_INDEX", "0") == "1"
+# Engine mặc định của create_cve_list: "whoosh" hoặc "table" (bảng tra cứu mmap)
+CVE_LOOKUP_ENGINE = os.getenv("CVE_LOOKUP_ENGINE", "whoosh")
+
+# Số process dùng để index song song các năm (1 = tuần tự như cũ)
+CVE_INDEX_WORKERS = int(os.getenv("CVE_INDEX_WORKERS", "1"))
+# Với các file feed lớn hơn CVE_INDEX_MULTIPROC_MB, dùng writer nhiều process của Whoosh
+# (CVE_INDEX_WRITER_PROCS process, mỗi process ghi một segment riêng). 1 = tắt.
+CVE_INDEX_WRITER_PROCS = int(os.getenv("CVE_INDEX_WRITER_PROCS", "1"))
+CVE_INDEX_MULTIPROC_MB = int(os.getenv("CVE_INDEX_MULTIPROC_MB", "50"))
+
+# Cache LRU kết quả create_cve_list theo (cpe, version, limit, engine, generation).
+# Tự xóa khi generation của INDEX_DIR đổi, tức là sau create_cve_index / indexing_modified_recent_cve.
+CVE_CACHE = LookupCache(
+    max_entries=int(os.getenv("CVE_CACHE_MAX_ENTRIES", "4096")),
+    max_bytes=int(os.getenv("CVE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+)
+
+# Pool searcher dùng chung cho các index theo năm, chỉ mở lại khi generation của INDEX_DIR thay đổi
+SEARCHER_POOL = SearcherPool(INDEX_DIR, scoring.BM25F)
 
 # 1. Tạo schema
+# cve_id và cpe_ranges có thêm column để đọc theo docnum mà không phải nạp toàn bộ stored fields
 schema = Schema(
-    cve_id=ID(unique=True, stored=True),
+    cve_id=ID(unique=True, stored=True, sortable=True),
     cwe_id=STORED,
     description=STORED,
     vectorString=STORED,
@@ -21,9 +57,15 @@ schema = Schema(
     exploitabilityScore=STORED,
     impactScore=STORED,
     cpe_list=KEYWORD(stored=True, commas=True, lowercase=True),
-    cpe_info=STORED
+    cpe_info=STORED,
+    cpe_ranges=COLUMN(PickleColumn(VarBytesColumn())),
+    # Hash nội dung bản ghi gốc, dùng để bỏ qua CVE không đổi khi cập nhật tăng dần
+    content_hash=ID(sortable=True)
 )
 
+# Schema của index gộp: giống schema theo năm, thêm trường year để lọc và sắp xếp
+unified_schema = Schema(year=NUMERIC(int, stored=True, sortable=True), **{name: schema[name] for name in schema.names()})
+
 # 2. Parse dữ liệu từ JSON
 def parse_cve(item):
     # Lấy thông tin CVE và CWE
@@ -69,6 +111,8 @@ def parse_cve(item):
     
     cpe_list_str = ",".join(sorted(cpe_set))
     cpe_info_json = json.dumps(cpe_info_dict)
+    # Biên dịch sẵn dải version thành các khoảng so sánh được để không phải parse lại khi tìm kiếm
+    cpe_ranges = compile_cpe_ranges(cpe_info_dict)
     
     return {
         "cve_id": cve_id,
@@ -80,131 +124,502 @@ def parse_cve(item):
         "exploitabilityScore": exploitabilityScore,
         "impactScore": impactScore,
         "cpe_list": cpe_list_str,
-        "cpe_info": cpe_info_json
+        "cpe_info": cpe_info_json,
+        "cpe_ranges": cpe_ranges,
+        "content_hash": content_hash(item)
     }
 
-def indexing_full_cve():
-    targets = list(range(2002, 2026)) + ["modified", "recent"]
-    create_cve_index(targets)
+# Hash của bản ghi CVE gốc trong feed (không phụ thuộc thứ tự key)
+def content_hash(item):
+    return hashlib.sha1(json.dumps(item, sort_keys=True).encode("utf-8")).hexdigest()
+
+# Các feed chứa CVE mới/được sửa, được áp dụng tăng dần vào index theo năm thay vì index riêng
+UPDATE_FEEDS = ["modified", "recent"]
+
+# years / feeds: các feed năm và feed modified/recent có dữ liệu mới (None = tất cả).
+# Năm chưa có index luôn được index; nếu không có gì thay đổi thì không dựng lại gì.
+def indexing_full_cve(unified=CVE_UNIFIED_INDEX, years=None, feeds=None):
+    years = CVE_YEARS if years is None else [year for year in CVE_YEARS
+                                              if year in years or not index_exists(str(year))]
+    feeds = UPDATE_FEEDS if feeds is None else [feed for feed in UPDATE_FEEDS if feed in feeds]
+    if years:
+        create_cve_index(years)
+    # iter_cve luôn ưu tiên index gộp nếu có, nên index gộp đã dựng (kể cả dựng tay) phải được dựng lại theo
+    unified = unified or index_exists(UNIFIED_INDEX_NAME)
+    if unified and (years or not index_exists(UNIFIED_INDEX_NAME)):
+        create_unified_cve_index(CVE_YEARS)
+    # Feed năm có thể cũ hơn feed modified vài giờ: năm nào vừa dựng lại thì luôn áp dụng lại cả
+    # modified/recent (dù job 2 giờ một lần đã tải chúng trước đó), CVE không đổi sẽ được bỏ qua
+    if years:
+        feeds = UPDATE_FEEDS
+    changed = upsert_cve_feeds(feeds, rebuild_lookup=False) if feeds else []
+    if years or changed or not LOOKUP_TABLE_FILE.exists():
+        build_cve_lookup_table(CVE_YEARS)
+    else:
+        print("Không có feed CVE nào thay đổi, bỏ qua lập chỉ mục")
+
+def indexing_modified_recent_cve(feeds=None):
+    return upsert_cve_feeds(UPDATE_FEEDS if feeds is None else [feed for feed in UPDATE_FEEDS if feed in feeds])
 
-def indexing_modified_recent_cve():
-    targets = ["modified", "recent"]
-    create_cve_index(targets)
+def index_exists(name):
+    return index.exists_in(str(current_index_dir(INDEX_DIR, name)))
+
+# Tạo index rỗng trong thư mục build mới INDEX_DIR/<name>@<n>, bản đang dùng không bị động tới.
+# Gọi publish_index_dir sau khi ghi xong để chuyển sang bản mới.
+def create_new_index(name, index_schema):
+    directory = new_index_dir(INDEX_DIR, str(name))
+    return index.create_in(str(directory), index_schema), directory
+
+# Đọc dần các CVE trong CVE_Items của file nvdcve-1.1-{target}.json, không load cả file vào bộ nhớ
+def load_cve_items(target):
+    CVE_JSON_FILE = CVE_DATA_DIR / "nvdcve-1.1-{}.json".format(target)
+    return iter_json_array(CVE_JSON_FILE, "CVE_Items")
 
 # 3. Tạo index cho các file cve.json
-def create_cve_index(targets):
+# Với workers > 1, các target được chia cho một pool process, file lớn được giao trước để cân bằng tải
+def create_cve_index(targets, workers=None):
     initialize_time = time.time()
+    workers = CVE_INDEX_WORKERS if workers is None else workers
+    workers = max(1, min(workers, len(targets)))
 
-    # Xử lý từng file JSON
-    for target in targets:
-        start_time = time.time()
-        TARGET_DIR = INDEX_DIR / str(target)
-        if not TARGET_DIR.exists():
-            TARGET_DIR.mkdir(parents=True, exist_ok=True)
-            ix = index.create_in(str(TARGET_DIR), schema)
-        else:
-            # Xóa các file cũ trong thư mục index
-            for file in TARGET_DIR.iterdir():
-                file.unlink()
-            ix = index.create_in(str(TARGET_DIR), schema)
-        
-        # Load JSON từ file nvdcve-1.1-{target}.json
-        CVE_JSON_FILE = (Path(__file__).resolve().parent / "../../src/nvd_cve_data/nvdcve-1.1-{}.json".format(target)).resolve()
-        with CVE_JSON_FILE.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # Lấy các CVE từ CVE_Items, sau đó parse từng CVE và thêm vào index
-        with ix.writer() as writer:
-            for item in tqdm(data.get("CVE_Items", []), desc=f"Index của {target}"):
-                cve_info = parse_cve(item)
-                writer.add_document(**cve_info)
-        
-        finish_time = time.time()
-        print(f"Hoàn thành index cve {target} trong: {finish_time - start_time:.4f} giây")
+    if workers == 1:
+        # Xử lý từng file JSON
+        for target in targets:
+            report_index_time(*index_cve_target(target))
+    else:
+        targets = sorted(targets, key=lambda target: feed_size(target), reverse=True)
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(index_cve_target, target, False) for target in targets]
+            for future in as_completed(futures):
+                report_index_time(*future.result())
     stop_time = time.time()
-    print(f"Hoàn thành index trong: {stop_time - initialize_time:.4f} giây")
-    
+    print(f"Hoàn thành index trong: {stop_time - initialize_time:.4f} giây ({workers} process)")
+
+# Kích thước file feed của một target (0 nếu chưa tải)
+def feed_size(target):
+    CVE_JSON_FILE = CVE_DATA_DIR / "nvdcve-1.1-{}.json".format(target)
+    return CVE_JSON_FILE.stat().st_size if CVE_JSON_FILE.exists() else 0
+
+# Index một file feed vào bản build mới của <target>, trả về (target, số CVE, thời gian)
+# Có thể chạy trong process con; generation được tăng ở process gọi để tránh ghi đè lẫn nhau
+def index_cve_target(target, progress=True):
+    start_time = time.time()
+    ix, directory = create_new_index(target, schema)
+    items = load_cve_items(target)
+
+    # File lớn: Whoosh chia document cho nhiều process con, mỗi process ghi một segment
+    writer_options = {}
+    if CVE_INDEX_WRITER_PROCS > 1 and feed_size(target) > CVE_INDEX_MULTIPROC_MB * 1024 * 1024:
+        writer_options = {"procs": CVE_INDEX_WRITER_PROCS, "multisegment": True}
+
+    # Lấy các CVE từ CVE_Items, sau đó parse từng CVE và thêm vào index
+    count = 0
+    with ix.writer(**writer_options) as writer:
+        for item in tqdm(items, desc=f"Index của {target}", disable=not progress):
+            cve_info = parse_cve(item)
+            writer.add_document(**cve_info)
+            count += 1
+    publish_index_dir(INDEX_DIR, str(target), directory)
+    return target, count, time.time() - start_time
+
+def report_index_time(target, count, seconds):
+    # Báo cho các searcher đang mở biết index đã thay đổi
+    bump_generation(INDEX_DIR)
+    print(f"Hoàn thành index cve {target} ({count} CVE) trong: {seconds:.4f} giây")
+
+# 3.1 Tạo một index gộp cho nhiều năm, mỗi document có thêm trường year
+def create_unified_cve_index(years):
+    start_time = time.time()
+    ix, directory = create_new_index(UNIFIED_INDEX_NAME, unified_schema)
+    with ix.writer() as writer:
+        for year in years:
+            for item in tqdm(load_cve_items(year), desc=f"Index gộp {year}"):
+                writer.add_document(year=int(year), **parse_cve(item))
+    publish_index_dir(INDEX_DIR, UNIFIED_INDEX_NAME, directory)
+    bump_generation(INDEX_DIR)
+    print(f"Hoàn thành index gộp trong: {time.time() - start_time:.4f} giây")
+
+# 3.2 Cập nhật tăng dần: đưa các CVE trong feed modified/recent vào index của năm tương ứng
+# (và index gộp nếu có) bằng update_document theo cve_id. CVE có content_hash không đổi được bỏ qua.
+# Trả về danh sách cve_id đã được thêm hoặc cập nhật.
+def upsert_cve_feeds(feeds, rebuild_lookup=None):
+    def feed_items():
+        for feed in feeds:
+            if not (CVE_DATA_DIR / "nvdcve-1.1-{}.json".format(feed)).exists():
+                print(f"Không tìm thấy feed {feed}, bỏ qua")
+                continue
+            yield from load_cve_items(feed)
+    return upsert_cve_items(feed_items(), rebuild_lookup)
+
+# Upsert các CVE (định dạng item của feed 1.1) vào index theo năm, dùng chung cho feed và nguồn NVD API
+def upsert_cve_items(items, rebuild_lookup=None):
+    start_time = time.time()
+    docs_by_year = {}
+    seen = set()
+    for item in items:
+        doc = parse_cve(item)
+        # recent là tập con của modified, chỉ giữ bản xuất hiện đầu tiên
+        if doc["cve_id"] in seen:
+            continue
+        seen.add(doc["cve_id"])
+        year = cve_year(doc["cve_id"])
+        if year is None:
+            print(f"Bỏ qua {doc['cve_id']}: không thuộc năm nào trong CVE_YEARS")
+            continue
+        docs_by_year.setdefault(year, []).append(doc)
+
+    changed = []
+    for year, docs in sorted(docs_by_year.items()):
+        changed.extend(upsert_index(str(year), docs))
+    if changed and index_exists(UNIFIED_INDEX_NAME):
+        changed_ids = set(changed)
+        upsert_index(UNIFIED_INDEX_NAME, [dict(doc, year=year) for year, docs in docs_by_year.items()
+                                         for doc in docs if doc["cve_id"] in changed_ids])
+
+    if changed:
+        bump_generation(INDEX_DIR)
+        # update_document làm đổi docnum nên bảng tra cứu cũ hết hiệu lực (create_cve_list tự dùng Whoosh).
+        # Chỉ dựng lại khi đang dùng engine bảng tra cứu, để job định kỳ tỉ lệ với số thay đổi.
+        if rebuild_lookup is None:
+            rebuild_lookup = CVE_LOOKUP_ENGINE == "table"
+        if rebuild_lookup:
+            build_cve_lookup_table(CVE_YEARS)
+    print(f"Cập nhật {len(changed)}/{len(seen)} CVE trong: {time.time() - start_time:.4f} giây")
+    return changed
+
+# Khóa part:vendor:product của một CPE 2.3, dùng để so CPE của tech với CPE của CVE mà không xét version
+def cpe_product_key(cpe: str):
+    return ":".join(cpe.strip().lower().split(":")[2:5])
+
+# Các khóa part:vendor:product có trong cpe_list của các CVE (đọc từ index theo năm đang dùng),
+# dùng sau khi upsert để biết tech nào bị ảnh hưởng bởi các CVE thay đổi
+def affected_cpes(cve_ids):
+    ids_by_year = {}
+    for cve_id in cve_ids:
+        year = cve_year(cve_id)
+        if year is not None:
+            ids_by_year.setdefault(year, []).append(cve_id)
+
+    products = set()
+    SEARCHER_POOL.sync()
+    for year, ids in sorted(ids_by_year.items()):
+        with SEARCHER_POOL.acquire(SEARCHER_POOL.resolve(str(year))) as searcher:
+            if searcher is None:
+                continue
+            for cve_id in ids:
+                docnum = searcher.document_number(cve_id=cve_id)
+                if docnum is None:
+                    continue
+                cpe_list = searcher.stored_fields(docnum).get("cpe_list") or ""
+                products.update(cpe_product_key(cpe) for cpe in cpe_list.split(",") if cpe)
+    return products
+
+# Năm của index chứa một CVE, lấy theo năm trong cve_id giống cách NVD chia feed
+# (feed 2002 chứa cả các CVE cũ hơn). None nếu năm lớn hơn năm cuối của CVE_YEARS.
+def cve_year(cve_id):
+    try:
+        year = int(cve_id.split("-")[1])
+    except (IndexError, ValueError):
+        return None
+    if year > CVE_YEARS[-1]:
+        return None
+    return max(year, CVE_YEARS[0])
+
+# Ghi các document vào index `name` đang dùng, bỏ qua document có content_hash trùng với bản đang có.
+# Cập nhật trực tiếp (không dựng lại) nên searcher đang mở vẫn đọc được bản trước khi commit.
+def upsert_index(name, docs):
+    index_dir = current_index_dir(INDEX_DIR, name)
+    directory = None
+    if not index.exists_in(str(index_dir)):
+        ix, directory = create_new_index(name, unified_schema if name == UNIFIED_INDEX_NAME else schema)
+    else:
+        ix = index.open_dir(str(index_dir))
+
+    with ix.searcher() as searcher:
+        reader = searcher.reader()
+        hashes = reader.column_reader("content_hash") if reader.has_column("content_hash") else None
+        changed_docs = []
+        for doc in docs:
+            docnum = searcher.document_number(cve_id=doc["cve_id"])
+            if docnum is not None and hashes is not None and hashes[docnum] == doc["content_hash"]:
+                continue
+            changed_docs.append(doc)
+
+    if changed_docs:
+        with ix.writer() as writer:
+            for doc in changed_docs:
+                # Index tạo trước khi có trường mới (ví dụ content_hash) vẫn cập nhật được
+                writer.update_document(**{field: value for field, value in doc.items() if field in ix.schema})
+    if directory is not None:
+        publish_index_dir(INDEX_DIR, name, directory)
+    return [doc["cve_id"] for doc in changed_docs]
+
+# 3.3 Dựng bảng tra cứu CPE -> CVE từ stored fields của các index theo năm
+def build_cve_lookup_table(years):
+    start_time = time.time()
+    documents = []
+    for year in years:
+        YEAR_DIR = current_index_dir(INDEX_DIR, str(year))
+        if not index.exists_in(str(YEAR_DIR)):
+            continue
+        with index.open_dir(str(YEAR_DIR)).reader() as reader:
+            ranges_column = reader.column_reader("cpe_ranges") if reader.has_column("cpe_ranges") else None
+            for docnum, fields in reader.iter_docs():
+                cpe_ranges = ranges_column[docnum] if ranges_column is not None else stored_cpe_ranges(fields)
+                field_length = reader.doc_field_length(docnum, "cpe_list", 0)
+                documents.append((fields["cve_id"], int(year), docnum, field_length, cpe_ranges))
+    # Bảng ghi lại generation mà nó phản ánh; mọi thay đổi index sau đó (kể cả docnum) sẽ làm bảng hết hiệu lực
+    generation = read_generation(INDEX_DIR) + 1
+    write_lookup_table(LOOKUP_TABLE_FILE, documents, generation)
+    bump_generation(INDEX_DIR)
+    print(f"Hoàn thành bảng tra cứu CPE ({len(documents)} CVE) trong: {time.time() - start_time:.4f} giây")
+
+_lookup_table = None
+
+# Lấy bảng tra cứu còn hiệu lực với generation hiện tại, None nếu chưa có hoặc đã cũ
+def get_lookup_table():
+    global _lookup_table
+    generation = SEARCHER_POOL.sync()
+    if _lookup_table is not None and _lookup_table.generation == generation:
+        return _lookup_table
+    _lookup_table = None
+    if LOOKUP_TABLE_FILE.exists():
+        try:
+            table = CVELookupTable(LOOKUP_TABLE_FILE)
+        except ValueError:
+            # Bảng dựng bằng phiên bản định dạng cũ: coi như chưa có cho tới lần dựng lại kế tiếp
+            return None
+        if table.generation == generation:
+            _lookup_table = table
+        else:
+            table.close()
+    return _lookup_table
+
 # 4. Tìm kiếm CVE
-def search_cve(input_cpe: str, limit):
+class CVEHit:
+    """
+    Kết quả tìm kiếm nhẹ: chỉ giữ docnum và điểm, các stored field chỉ được nạp khi truy cập lần đầu.
+    cve_id và cpe_ranges được đọc từ column nên không kéo theo description/cpe_info.
+    Chỉ dùng được trong lúc đang duyệt iter_cve (searcher được trả lại pool khi chuyển sang năm khác).
+    """
+    __slots__ = ("searcher", "docnum", "score", "year", "_columns", "_fields")
+
+    def __init__(self, searcher, docnum, score, year, columns):
+        self.searcher = searcher
+        self.docnum = docnum
+        self.score = score
+        self.year = year
+        self._columns = columns
+        self._fields = None
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            self._fields = self.searcher.stored_fields(self.docnum)
+        return self._fields
+
+    @property
+    def cve_id(self):
+        column = self._columns.get("cve_id")
+        return column[self.docnum] if column is not None else self.fields["cve_id"]
+
+    @property
+    def cpe_ranges(self):
+        column = self._columns.get("cpe_ranges")
+        return column[self.docnum] if column is not None else stored_cpe_ranges(self.fields)
+
+    def __getitem__(self, name):
+        return self.fields[name]
+
+    def get(self, name, default=None):
+        if name == "cpe_ranges":
+            return self.cpe_ranges
+        return self.fields.get(name, default)
+
+def index_columns(searcher):
+    reader = searcher.reader()
+    return {name: reader.column_reader(name) for name in ("cve_id", "cpe_ranges", "year")
+            if name in reader.schema and reader.has_column(name)}
+
+# Duyệt lười các CVE chứa cpe: năm giảm dần, trong mỗi năm theo điểm giảm dần.
+# per_year giới hạn số kết quả mỗi năm (None là không giới hạn); dừng duyệt bất kỳ lúc nào cũng được.
+def iter_cve(input_cpe: str, years=None, per_year=None):
     if not INDEX_DIR.exists():
         print("whoosh_index directory not found. Please run indexing first.")
-        return []
-    
+        return
+
     # Chuẩn hóa input
     input_cpe = input_cpe.strip().lower()
-    matched = []
-    for year in reversed(range(2002, 2026)):
-        YEAR_DIR = INDEX_DIR / str(year)
-        if not YEAR_DIR.exists():
-            print(f"Whoosh index directory for {year} not found. Please run indexing first.")
-            continue
-        ix = index.open_dir(str(YEAR_DIR))
-        # Sử dụng truy vấn Term
-        query = Term("cpe_list", input_cpe)
-        with ix.searcher(weighting=scoring.BM25F()) as searcher:
-            results = searcher.search(query, limit=limit)
-            for hit in results:
-                cve = hit['cve_id']
-                cwe = hit['cwe_id']
-                description = hit['description']
-                vectorString = hit['vectorString']
-                baseScore = hit['baseScore']
-                baseSeverity = hit['baseSeverity']
-                exploitabilityScore = hit['exploitabilityScore']
-                impactScore = hit['impactScore']
-                cpe_info = hit['cpe_info']
-                matched.append((cve, cwe, description, vectorString ,baseScore,
-                                baseSeverity, exploitabilityScore, impactScore, cpe_info))
-    return matched
+    # Sử dụng truy vấn Term
+    query = Term("cpe_list", input_cpe)
+    SEARCHER_POOL.sync()
+
+    # Nếu có index gộp: một truy vấn duy nhất thay vì lặp qua từng năm
+    with SEARCHER_POOL.acquire(SEARCHER_POOL.resolve(UNIFIED_INDEX_NAME)) as searcher:
+        if searcher is not None:
+            yield from iter_unified(searcher, query, years, per_year)
+            return
+
+    for year in sorted(years or CVE_YEARS, reverse=True):
+        YEAR_DIR = SEARCHER_POOL.resolve(str(year))
+        with SEARCHER_POOL.acquire(YEAR_DIR) as searcher:
+            if searcher is None:
+                print(f"Whoosh index directory for {year} not found. Please run indexing first.")
+                continue
+            # Results chỉ giữ (điểm, docnum), chưa đọc stored field nào
+            results = searcher.search(query, limit=per_year)
+            columns = index_columns(searcher)
+            for n in range(results.scored_length()):
+                yield CVEHit(searcher, results.docnum(n), results.score(n), year, columns)
+
+# Sắp xếp theo năm giảm dần rồi theo điểm, giữ tối đa `per_year` kết quả mỗi năm như khi tìm theo từng năm
+def iter_unified(searcher, query, years=None, per_year=None):
+    year_filter = Or([NumericRange("year", year, year) for year in years]) if years else None
+    order = sorting.MultiFacet([sorting.FieldFacet("year", reverse=True), sorting.ScoreFacet()])
+    results = searcher.search(query, limit=None, filter=year_filter, sortedby=order, terms=False)
+    columns = index_columns(searcher)
+    counts = {}
+    for n in range(results.scored_length()):
+        docnum = results.docnum(n)
+        year = columns["year"][docnum]
+        counts[year] = counts.get(year, 0) + 1
+        if per_year is None or counts[year] <= per_year:
+            yield CVEHit(searcher, docnum, results.score(n), year, columns)
+
+# Giữ API cũ: danh sách tuple, tối đa `limit` kết quả mỗi năm.
+# Trường bổ sung ở cuối mỗi tuple kết quả là extra_field ("cpe_info" hoặc "cpe_ranges")
+def search_cve(input_cpe: str, limit, years=None, extra_field="cpe_info"):
+    return [hit_to_tuple(hit, extra_field) for hit in iter_cve(input_cpe, years, per_year=limit)]
+
+def hit_to_tuple(hit, extra_field="cpe_info"):
+    cve = hit['cve_id']
+    cwe = hit['cwe_id']
+    description = hit['description']
+    vectorString = hit['vectorString']
+    baseScore = hit['baseScore']
+    baseSeverity = hit['baseSeverity']
+    exploitabilityScore = hit['exploitabilityScore']
+    impactScore = hit['impactScore']
+    extra = stored_cpe_ranges(hit) if extra_field == "cpe_ranges" else hit[extra_field]
+    return (cve, cwe, description, vectorString ,baseScore,
+            baseSeverity, exploitabilityScore, impactScore, extra)
+
+# Lấy các khoảng version đã biên dịch; index dựng trước khi có trường cpe_ranges thì biên dịch từ cpe_info
+def stored_cpe_ranges(fields):
+    cpe_ranges = fields.get("cpe_ranges")
+    if cpe_ranges is None:
+        cpe_ranges = compile_cpe_ranges(json.loads(fields["cpe_info"]))
+    return cpe_ranges
 
 # 5. Tìm kiếm theo cpe chi tiết và (cpe tổng quát + check version)
-def create_cve_list(input_cpe: str, input_version: str, limit):
-    start = time.time()
+def create_cve_list(input_cpe: str, input_version: str, limit, engine=None):
+    return create_cve_list_many([(input_cpe, input_version)], limit, engine)[(input_cpe, input_version)]
+
+# Thay version vào cpe tổng quát để có cpe chi tiết
+def versioned_cpe(input_cpe: str, input_version: str):
     cpe_split = input_cpe.split(':')
     cpe_split[5] = input_version
-    full_cpe = ":".join(cpe_split)
-
-    # 5.1 Search theo cpe chi tiết
-    results = search_cve(full_cpe, limit)
-
-    # 5.2 Search theo cpe tổng quát và check dải version
-    raw_results = search_cve(input_cpe, limit)
-    for hit in raw_results:
-        _, _, _, _, _, _, _, _, cpe_info = hit
-        for ver_range in json.loads(cpe_info)[input_cpe]:
-            # Kiểm tra từng ver_range
-            if is_in_version_range(input_version, ver_range):
-                results.append(hit)
-                break
-    
-    # Lược cpe_info để tránh dư thừa
-    final_results = []
-    for result in results:
-        cve, cwe, description, vectorString, baseScore, baseSeverity, exploitabilityScore, impactScore, _ = result
-        final_results.append((cve, cwe, description, vectorString, baseScore, baseSeverity, exploitabilityScore, impactScore))
+    return ":".join(cpe_split)
+
+# 5.1 Tìm kiếm nhiều cặp (cpe, version) trong một lần: khử trùng lặp, gom theo cpe tổng quát để
+# mỗi posting list chỉ đọc một lần rồi check version cho tất cả version cần tìm.
+# Trả về dict {(cpe, version): [kết quả]} theo đúng các cặp đầu vào.
+def create_cve_list_many(pairs, limit, engine=None):
+    start = time.time()
+    engine = engine or CVE_LOOKUP_ENGINE
+    generation = SEARCHER_POOL.sync()
+    CVE_CACHE.sync(generation)
+
+    results = {}
+    versions_by_cpe = {}
+    for input_cpe, input_version in dict.fromkeys(pairs):
+        cached = CVE_CACHE.get((input_cpe, input_version, limit, engine, generation))
+        if cached is not None:
+            results[(input_cpe, input_version)] = list(cached)
+        else:
+            versions_by_cpe.setdefault(input_cpe, []).append(input_version)
+
+    table = None
+    if versions_by_cpe and engine == "table":
+        table = get_lookup_table()
+        if table is None:
+            print("Bảng tra cứu CPE chưa có hoặc đã cũ, chuyển sang tìm kiếm bằng Whoosh.")
+
+    for input_cpe, input_versions in versions_by_cpe.items():
+        if table is not None:
+            matched = create_cve_list_from_table(table, input_cpe, input_versions, limit)
+        else:
+            matched = create_cve_list_from_index(input_cpe, input_versions, limit)
+        for input_version, final_results in matched.items():
+            results[(input_cpe, input_version)] = final_results
+            CVE_CACHE.put((input_cpe, input_version, limit, engine, generation), final_results)
     end = time.time()
-    print(f"Thời gian hoàn thành tìm kiếm: {end - start:.3f} giây")
+    print(f"Thời gian hoàn thành tìm kiếm {len(results)} cặp cpe/version: {end - start:.3f} giây")
+    return results
+
+# 5.2 Tìm bằng Whoosh cho một cpe tổng quát và nhiều version
+def create_cve_list_from_index(input_cpe, input_versions, limit):
+    # Search theo cpe chi tiết (lược cpe_info để tránh dư thừa)
+    matched = {}
+    for input_version in input_versions:
+        matched[input_version] = [hit_to_tuple(hit)[:-1] for hit in iter_cve(versioned_cpe(input_cpe, input_version), per_year=limit)]
+
+    # Search theo cpe tổng quát một lần và check dải version của mọi version cần tìm
+    # (truy vấn stabbing trên các khoảng đã biên dịch); chỉ hit qua được mới nạp stored fields
+    input_keys = {input_version: version_key(input_version) for input_version in input_versions}
+    for hit in iter_cve(input_cpe, per_year=limit):
+        intervals = hit.cpe_ranges.get(input_cpe, ())
+        hit_versions = [version for version, key in input_keys.items() if stab(intervals, key)]
+        if hit_versions:
+            result = hit_to_tuple(hit)[:-1]
+            for input_version in hit_versions:
+                matched[input_version].append(result)
+    return matched
+
+# 5.3 Trả lời từ bảng tra cứu: chỉ đọc chi tiết CVE từ Whoosh cho các row qua được bước check version
+def create_cve_list_from_table(table, input_cpe, input_versions, limit):
+    # Giới hạn mỗi năm được áp trước bước check version, giống iter_cve(per_year=limit) của Whoosh
+    postings = cap_postings_per_year(table, table.postings(input_cpe), limit)
+    matched = {}
+    for input_version in input_versions:
+        rows = [row for row, _ in cap_postings_per_year(table, table.postings(versioned_cpe(input_cpe, input_version)), limit)]
+        input_key = version_key(input_version)
+        rows += [row for row, intervals in postings if stab(intervals, input_key)]
+        matched[input_version] = fetch_cve_details([table.row(row) for row in rows])
+    return matched
+
+# Bộ đếm hit/miss/eviction của cache để điều chỉnh kích thước
+def cve_cache_stats():
+    return CVE_CACHE.stats()
+
+# Giữ `limit` posting đầu tiên của mỗi năm (posting đã theo thứ tự điểm của Whoosh), giống search_cve
+def cap_postings_per_year(table, postings, limit):
+    if limit is None:
+        return list(postings)
+    per_year = {}
+    capped = []
+    for row, intervals in postings:
+        _, year, _ = table.row(row)
+        per_year[year] = per_year.get(year, 0) + 1
+        if per_year[year] <= limit:
+            capped.append((row, intervals))
+    return capped
+
+# Đọc chi tiết CVE (không kèm cpe_info) theo danh sách (cve_id, year, docnum) của bảng tra cứu
+def fetch_cve_details(rows):
+    final_results = []
+    SEARCHER_POOL.sync()
+    for cve_id, year, docnum in rows:
+        with SEARCHER_POOL.acquire(SEARCHER_POOL.resolve(str(year))) as searcher:
+            if searcher is None:
+                continue
+            final_results.append(hit_to_tuple(searcher.stored_fields(docnum))[:-1])
     return final_results
 
 # Check version
 def is_in_version_range(cpe_version, ver_range):
-    cpe_version = Version(cpe_version)
-    ver_range_detail = ver_range.split('_')
-    if ver_range_detail[4] == "false":
-        return False
     # Dải version có dạng: verStartIncluding_verStartExcluding_verEndIncluding_verEndExcluding_isVulnerable
-    if all(ver == "x" for ver in ver_range_detail[:4]):
-        return False
-    conditions = [
-        (ver_range_detail[0], lambda v: cpe_version >= v),  # versionStartIncluding
-        (ver_range_detail[1], lambda v: cpe_version > v),   # versionStartExcluding
-        (ver_range_detail[2], lambda v: cpe_version <= v),  # versionEndIncluding
-        (ver_range_detail[3], lambda v: cpe_version < v)    # versionEndExcluding
-    ]
-    for ver, check in conditions:
-        if ver != "x" and not check(Version(ver)):
-            return False
-    return True
+    return stab(compile_intervals([ver_range]), version_key(cpe_version))
 
 # Hàm đệ quy để trích xuất các đối tượng cpe_match từ một node.
 def extract_child_cpe(node):
@@ -231,6 +646,15 @@ def main():
         if sys.argv[1] == "index":
             indexing_modified_recent_cve()
             return
+        elif sys.argv[1] == "full":
+            indexing_full_cve()
+            return
+        elif sys.argv[1] == "unified":
+            create_unified_cve_index(CVE_YEARS)
+            return
+        elif sys.argv[1] == "lookup":
+            build_cve_lookup_table(CVE_YEARS)
+            return
         elif int(sys.argv[1]) in range(2002, 2026):
             create_cve_index(["2023"])
             return
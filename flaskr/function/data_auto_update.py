@@ -7,9 +7,11 @@ import subprocess
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.executors.pool import ThreadPoolExecutor, ProcessPoolExecutor
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
-from .data_download import modified_recent_pull, complete_pull
-from .cve_scan import indexing_modified_recent_cve, indexing_full_cve
-from .cpe_scan import indexing_cpe
+from .data_download import modified_recent_pull, complete_pull, mark_indexed
+from .cve_scan import indexing_modified_recent_cve, indexing_full_cve, CVE_YEARS
+from .cpe_scan import indexing_cpe, cpe_index_exists
+from .nvd_api import ingest_changes
+from .update_pipeline import run_complete_pipeline
 from flaskr.monitor import auto_scan
 
 # Múi giờ Haloi
@@ -23,6 +25,13 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 logger.propagate = False  # Không chuyển log lên root
 
+# Nguồn của job cập nhật 2 giờ một lần: "feed" (tải feed modified/recent) hoặc "api" (NVD CVE API 2.0)
+NVD_UPDATE_SOURCE = os.getenv("NVD_UPDATE_SOURCE", "feed")
+# Cập nhật toàn bộ theo pipeline (index từng feed ngay khi tải xong); 0 = tải hết rồi mới index
+NVD_PIPELINE = os.getenv("NVD_PIPELINE", "1") == "1"
+# Sau job modified/recent chỉ quét lại các tech/URL có CPE bị các CVE thay đổi ảnh hưởng; 0 = quét lại tất cả
+NVD_TARGETED_RESCAN = os.getenv("NVD_TARGETED_RESCAN", "1") == "1"
+
 # Tạo thư mục log nếu chưa có
 LOG_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../log'))
 if not os.path.exists(LOG_DIR):
@@ -85,14 +94,25 @@ def next_run_time_modified_recent_cron():
 def modified_recent_update():
     start = time.time()
     try:
-        print("[INFO] Bắt đầu cập nhật dữ liệu (modified/recent).")
-        modified_recent_pull()
-        
-        print("[INFO] Bắt đầu lập chỉ mục dữ liệu (modified/recent).")
-        indexing_modified_recent_cve()
+        if NVD_UPDATE_SOURCE == "api":
+            # Chỉ lấy các CVE thay đổi từ lần chạy trước và upsert thẳng vào index
+            print("[INFO] Bắt đầu cập nhật dữ liệu thay đổi từ NVD API.")
+            changed = ingest_changes()
+        else:
+            print("[INFO] Bắt đầu cập nhật dữ liệu (modified/recent).")
+            updated = modified_recent_pull()
+
+            # Feed không đổi so với lần tải trước thì không cần lập chỉ mục lại
+            changed = []
+            if updated:
+                print("[INFO] Bắt đầu lập chỉ mục dữ liệu (modified/recent).")
+                changed = indexing_modified_recent_cve(updated)
+                mark_indexed(updated)
+            else:
+                print("[INFO] Feed modified/recent không đổi, bỏ qua lập chỉ mục.")
 
         print("[INFO] Tự động quét lại!!!")
-        auto_scan()
+        auto_scan(changed if NVD_TARGETED_RESCAN else None)
     except Exception as e:
         logger.error(f"Lỗi trong modified_recent_update: {e}")
         return  # Nếu có lỗi, không cập nhật next_run
@@ -103,13 +123,23 @@ def complete_update():
     start = time.time()
     try:
         print("[INFO] Bắt đầu cập nhật toàn bộ dữ liệu.")
-        complete_pull()
-        
-        print("[INFO] Bắt đầu lập chỉ mục toàn bộ dữ liệu CVE.")
-        indexing_full_cve()
-        
-        print("[INFO] Bắt đầu lập chỉ mục dữ liệu CPE.")
-        indexing_cpe()
+        if NVD_PIPELINE:
+            # Mỗi feed được lập chỉ mục ngay khi tải và xác minh xong, trong lúc các feed khác vẫn đang tải
+            run_complete_pipeline()
+        else:
+            updated = complete_pull()
+
+            # Chỉ lập chỉ mục lại các feed có dữ liệu mới (và các năm chưa có index)
+            print("[INFO] Bắt đầu lập chỉ mục dữ liệu CVE thay đổi.")
+            indexing_full_cve(years=[target for target in updated if target in CVE_YEARS], feeds=updated)
+            mark_indexed([target for target in updated if target != "cpe"])
+
+            if "cpe" in updated or not cpe_index_exists():
+                print("[INFO] Bắt đầu lập chỉ mục dữ liệu CPE.")
+                indexing_cpe()
+                mark_indexed(["cpe"])
+            else:
+                print("[INFO] Feed CPE không đổi, bỏ qua lập chỉ mục CPE.")
 
         print("[INFO] Bắt đầu cập nhật template Nuclei")
         subprocess.run(['nuclei', '-ut', '-up'])
@@ -1,17 +1,35 @@
 import os
-import gzip
+import json
+import zlib
 import hashlib
 import requests
 import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 from pathlib import Path
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 NVD_BASE_URL = "https://nvd.nist.gov/feeds/json/cve/1.1"
+CPE_BASE_URL = "https://nvd.nist.gov/feeds/json/cpematch/1.0"
 BASE_DIR = (Path(__file__).resolve().parent / "../../src").resolve()
 CVE_DATA_DIR = BASE_DIR / "nvd_cve_data"
 CPE_DATA_DIR = BASE_DIR / "nvd_cpe_data"
+# Ghi lại sha256 / lastModifiedDate trong file .meta của lần tải thành công gần nhất cho từng feed
+MANIFEST_FILE = BASE_DIR / "feed_manifest.json"
+
+# Kết quả của handle_data (None nếu tải / xác minh thất bại)
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+
+# Số feed được tải song song (1 = tải lần lượt như trước)
+NVD_DOWNLOAD_WORKERS = int(os.getenv("NVD_DOWNLOAD_WORKERS", "4"))
+# Số kết nối tối đa tới một host; khi hết, request chờ kết nối được trả lại pool thay vì mở thêm
+NVD_MAX_HOST_CONNECTIONS = int(os.getenv("NVD_MAX_HOST_CONNECTIONS", "4"))
+# Số lần tải tiếp (bằng Range từ phần đã có trong file .part) khi kết nối bị ngắt giữa chừng
+NVD_RESUME_ATTEMPTS = int(os.getenv("NVD_RESUME_ATTEMPTS", "5"))
 
 # Set đường dẫn
 def get_local_paths(target: str):
@@ -27,10 +45,16 @@ def get_local_paths(target: str):
         "local_gz_path": data_dir / f"{filename_base}.json.gz",
         "local_meta_path": data_dir / f"{filename_base}.meta",
         "local_json_path": data_dir / f"{filename_base}.json",
+        "local_tmp_path": data_dir / f"{filename_base}.json.tmp",
+        "local_part_path": data_dir / f"{filename_base}.json.gz.part",
+        # sha256 (theo file .meta) của bản feed mà file .part đang tải dở
+        "local_part_meta_path": data_dir / f"{filename_base}.json.gz.part.sha256",
     }
 
 # tạo session để tải dữ liệu
-def create_session(retries=5, backoff_factor=1.0, status_forcelist=(500, 502, 503, 504)):
+# Retry của urllib3 được sao chép cho mỗi request nên trạng thái retry của các feed tải song song độc lập nhau
+def create_session(retries=5, backoff_factor=1.0, status_forcelist=(500, 502, 503, 504),
+                   pool_maxsize=NVD_MAX_HOST_CONNECTIONS):
     session = requests.Session()
     retry = Retry(
         total=retries,
@@ -39,7 +63,7 @@ def create_session(retries=5, backoff_factor=1.0, status_forcelist=(500, 502, 50
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize, pool_block=True)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
@@ -47,22 +71,24 @@ def create_session(retries=5, backoff_factor=1.0, status_forcelist=(500, 502, 50
 SESSION = create_session()
 
 # tải dữ liệu và xử lý lỗi khi tải
-def download_and_retry(url, chunk_size=1024, timeout=240):
+# Response luôn được đóng để kết nối trả về pool (pool_block=True sẽ chờ mãi nếu kết nối bị giữ)
+def download_and_retry(url, chunk_size=1024, timeout=240, progress=True):
     try:
-        response = SESSION.get(url, stream=True, timeout=timeout)
-        response.raise_for_status()
-        total_length = response.headers.get('content-length')
-        if total_length is None:
-            print("Không biết kích thước file, tải toàn bộ dữ liệu...")
-            return response.content
-        total_length = int(total_length)
-        data = bytearray()
-        with tqdm(total=total_length, unit='B', unit_scale=True, desc="Downloading", dynamic_ncols=True) as pbar:
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    data.extend(chunk)
-                    pbar.update(len(chunk))
-        return bytes(data)
+        with SESSION.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            total_length = response.headers.get('content-length')
+            if total_length is None:
+                print("Không biết kích thước file, tải toàn bộ dữ liệu...")
+                return response.content
+            total_length = int(total_length)
+            data = bytearray()
+            with tqdm(total=total_length, unit='B', unit_scale=True, desc="Downloading", dynamic_ncols=True,
+                      disable=not progress) as pbar:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        data.extend(chunk)
+                        pbar.update(len(chunk))
+            return bytes(data)
     except Exception as e:
         print(f"[ERROR] Lỗi tải {url}: {e}")
         return None
@@ -72,93 +98,307 @@ def sha256_of_bytes(data: bytes) -> str:
     sha256_hash.update(data)
     return sha256_hash.hexdigest()
 
-# xử lý dữ liệu
-def handle_data(target):
-    paths = get_local_paths(target)
-    filename_base = paths["filename_base"]
-    gz_url = f"{NVD_BASE_URL}/{filename_base}.json.gz"
-    meta_url = f"{NVD_BASE_URL}/{filename_base}.meta"
-    if target == "cpe":
-        gz_url = "https://nvd.nist.gov/feeds/json/cpematch/1.0/nvdcpematch-1.0.json.gz"
-        meta_url = "https://nvd.nist.gov/feeds/json/cpematch/1.0/nvdcpematch-1.0.meta"
+# Giải nén gzip theo từng chunk, ghi ra file và cập nhật SHA-256 của dữ liệu đã giải nén,
+# bộ nhớ dùng chỉ cỡ một chunk thay vì cả file
+class GunzipWriter:
+    def __init__(self, f, max_output=1 << 16):
+        self.f = f
+        self.max_output = max_output
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
 
-    # Tải file .gz và ghi vào đĩa
-    print(f"[INFO] Tải file nén: {gz_url}")
-    gz_data = download_and_retry(gz_url)
-    if gz_data is None:
-        print(f"[ERROR] Không thể tải xuống {gz_url}")
-        return False
-    with open(paths["local_gz_path"], "wb") as f:
-        f.write(gz_data)
+    def _output(self, data):
+        if data:
+            self.f.write(data)
+            self.sha256.update(data)
+            self.size += len(data)
+
+    def write(self, chunk):
+        while chunk:
+            # Giới hạn số byte giải nén mỗi lần, phần chưa giải nén nằm trong unconsumed_tail
+            self._output(self._decompressor.decompress(chunk, self.max_output))
+            if self._decompressor.eof:
+                # File gzip có thể gồm nhiều member nối tiếp nhau
+                chunk = self._decompressor.unused_data
+                if chunk:
+                    self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                chunk = self._decompressor.unconsumed_tail
+
+    def close(self):
+        self._output(self._decompressor.flush())
+        if not self._decompressor.eof:
+            raise EOFError("File gzip bị cắt ngang")
+        return self.sha256.hexdigest()
 
+# Tải file .json.gz vào part_path, đồng thời giải nén và tính SHA-256 vào tmp_path.
+# Nếu part_path đã có dữ liệu (lần tải trước bị ngắt), chỉ xin phần còn lại bằng Range; server không hỗ trợ
+# Range (trả 200) thì tải lại từ đầu. Trả về SHA-256 của dữ liệu đã giải nén, None nếu lỗi (part_path được
+# giữ lại để lần chạy sau tải tiếp, trừ khi dữ liệu hỏng).
+def download_gunzip(url, part_path: Path, tmp_path: Path, chunk_size=1 << 16, timeout=240, progress=True,
+                    attempts=None):
+    attempts = NVD_RESUME_ATTEMPTS if attempts is None else attempts
+    for attempt in range(1, attempts + 1):
+        try:
+            return download_gunzip_once(url, part_path, tmp_path, chunk_size, timeout, progress)
+        except requests.exceptions.HTTPError as e:
+            print(f"[ERROR] Lỗi tải {url}: {e}")
+            break
+        except requests.exceptions.RequestException as e:
+            # Kết nối bị ngắt giữa chừng (IncompleteRead, timeout, ...): tải tiếp từ cuối file .part
+            size = part_path.stat().st_size if part_path.exists() else 0
+            print(f"[WARN] Tải {url} bị ngắt sau {size} byte ({e}), thử lại {attempt}/{attempts}")
+        except Exception as e:
+            # Dữ liệu nén hỏng (ví dụ file .part không còn dùng được): bỏ file .part, lần thử sau tải từ đầu
+            print(f"[ERROR] Lỗi tải / giải nén {url}: {e}, thử lại {attempt}/{attempts}")
+            part_path.unlink(missing_ok=True)
+    tmp_path.unlink(missing_ok=True)
+    return None
+
+def download_gunzip_once(url, part_path: Path, tmp_path: Path, chunk_size, timeout, progress):
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with SESSION.get(url, stream=True, timeout=timeout, headers=headers) as response:
+        if response.status_code == 416:
+            # Phần đã tải dài hơn file trên server (file đã đổi): bỏ và tải lại từ đầu
+            part_path.unlink(missing_ok=True)
+            raise requests.exceptions.RequestException("Range không hợp lệ, tải lại từ đầu")
+        response.raise_for_status()
+        if response.status_code == 206:
+            if not response.headers.get("content-range", "").startswith(f"bytes {offset}-"):
+                part_path.unlink(missing_ok=True)
+                raise requests.exceptions.RequestException("Content-Range không khớp, tải lại từ đầu")
+        elif offset:
+            print(f"[INFO] Server không hỗ trợ Range, tải lại {url} từ đầu")
+            offset = 0
+        total_length = response.headers.get('content-length')
+        total_length = int(total_length) + offset if total_length is not None else None
+
+        with open(part_path, "ab" if offset else "wb") as part, open(tmp_path, "wb") as f, \
+                tqdm(total=total_length, initial=offset, unit='B', unit_scale=True, desc="Downloading",
+                     dynamic_ncols=True, disable=not progress) as pbar:
+            writer = GunzipWriter(f)
+            # Giải nén lại phần đã tải ở lần trước (đọc từ đĩa) để tiếp tục luồng giải nén và SHA-256
+            if offset:
+                with open(part_path, "rb") as previous:
+                    remaining = offset
+                    while remaining and (chunk := previous.read(min(chunk_size, remaining))):
+                        writer.write(chunk)
+                        remaining -= len(chunk)
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    part.write(chunk)
+                    writer.write(chunk)
+                    pbar.update(len(chunk))
+            return writer.close()
+
+def discard_part(paths):
+    paths["local_part_path"].unlink(missing_ok=True)
+    paths["local_part_meta_path"].unlink(missing_ok=True)
+
+# Đọc các dòng "key:value" của file .meta (lastModifiedDate, size, gzSize, sha256, ...)
+def parse_meta(meta_data: bytes):
+    meta = {}
+    for line in meta_data.decode("utf-8").splitlines():
+        key, sep, value = line.partition(":")
+        if sep:
+            meta[key.strip().lower()] = value.strip()
+    return meta
+
+def feed_urls(target):
+    filename_base = get_local_paths(target)["filename_base"]
+    base_url = CPE_BASE_URL if target == "cpe" else NVD_BASE_URL
+    return f"{base_url}/{filename_base}.json.gz", f"{base_url}/{filename_base}.meta"
+
+def load_manifest():
     try:
-        uncompressed_data = gzip.decompress(gz_data)
-    except Exception as e:
-        print(f"[ERROR] Lỗi giải nén (in-memory) {paths['local_gz_path']}: {e}")
-        return False
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_FILE.with_name(f"{MANIFEST_FILE.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+_manifest_lock = threading.Lock()
+
+# Ghi feed vừa tải và xác minh xong với indexed=False: feed chỉ được coi là không đổi sau khi
+# bước lập chỉ mục gọi mark_indexed, để lỗi index (hoặc process bị dừng) không làm index cũ bị bỏ qua mãi
+def record_manifest(target, meta):
+    # Các feed tải song song cùng ghi vào một manifest
+    with _manifest_lock:
+        manifest = load_manifest()
+        manifest[str(target)] = {
+            "sha256": meta["sha256"].lower(),
+            "lastModifiedDate": meta.get("lastmodifieddate"),
+            "size": meta.get("size"),
+            "indexed": False,
+        }
+        save_manifest(manifest)
 
-    # Tải file .meta và ghi vào đĩa
+# Gọi sau khi index / upsert của các target đã thành công
+def mark_indexed(targets):
+    with _manifest_lock:
+        manifest = load_manifest()
+        for target in targets:
+            entry = manifest.get(str(target))
+            if entry:
+                entry["indexed"] = True
+        save_manifest(manifest)
+
+# Entry của manifest nếu sha256 trong .meta trùng với lần tải trước và file JSON trên đĩa vẫn còn nguyên
+def downloaded_entry(target, meta, json_path: Path):
+    entry = load_manifest().get(str(target))
+    if not entry or entry.get("sha256") != meta["sha256"].lower() or not json_path.exists():
+        return None
+    size = meta.get("size")
+    if size is not None and size.isdigit() and json_path.stat().st_size != int(size):
+        return None
+    return entry
+
+# Feed chưa đổi và đã được lập chỉ mục (entry cũ không có trường indexed coi như đã index)
+def is_unchanged(target, meta, json_path: Path):
+    entry = downloaded_entry(target, meta, json_path)
+    return entry is not None and entry.get("indexed", True)
+
+# xử lý dữ liệu
+# Tải .meta trước, nếu feed không đổi so với manifest thì bỏ qua (trả về UNCHANGED).
+# Ngược lại tải .json.gz, xác minh SHA256 rồi trả về UPDATED; None nếu thất bại.
+# Sau khi lập chỉ mục xong target UPDATED, bên gọi phải gọi mark_indexed.
+def handle_data(target, force=False, progress=True):
+    paths = get_local_paths(target)
+    filename_base = paths["filename_base"]
+    gz_url, meta_url = feed_urls(target)
+
+    # Tải file .meta (nhỏ, đọc trong bộ nhớ)
     print(f"[INFO] Tải file meta: {meta_url}")
-    meta_data = download_and_retry(meta_url)
+    meta_data = download_and_retry(meta_url, progress=progress)
     if meta_data is None:
         print(f"[ERROR] Không thể tải xuống {meta_url}")
-        return False
-    with open(paths["local_meta_path"], "wb") as f:
-        f.write(meta_data)
+        return None
 
     # Lấy sha256 từ file meta
-    expected_sha256 = None
     try:
-        meta_lines = meta_data.decode("utf-8").splitlines()
-        for line in meta_lines:
-            if line.lower().startswith("sha256:"):
-                _, value = line.split(":", 1)
-                expected_sha256 = value.strip()
-                break
+        meta = parse_meta(meta_data)
     except Exception as e:
-        print(f"[ERROR] Lỗi đọc file meta {paths['local_meta_path']}: {e}")
-        return False
-
+        print(f"[ERROR] Lỗi đọc file meta của {filename_base}: {e}")
+        return None
+    expected_sha256 = meta.get("sha256")
     if not expected_sha256:
         print(f"[ERROR] Không tìm thấy SHA256 trong file meta của {filename_base}")
-        return False
+        return None
+
+    if not force and is_unchanged(target, meta, paths["local_json_path"]):
+        print(f"[INFO] {filename_base} không đổi (lastModifiedDate {meta.get('lastmodifieddate')}), bỏ qua")
+        return UNCHANGED
+    if not force and downloaded_entry(target, meta, paths["local_json_path"]) is not None:
+        # Đã tải ở lần trước nhưng chưa lập chỉ mục xong: không tải lại, chỉ cần index lại
+        print(f"[INFO] {filename_base} đã tải nhưng chưa được lập chỉ mục, lập chỉ mục lại")
+        return UPDATED
+
+    # File .part của một bản feed khác (sha256 trong .meta đã đổi) không dùng để tải tiếp được
+    part_meta_path = paths["local_part_meta_path"]
+    if paths["local_part_path"].exists():
+        if not part_meta_path.exists() or part_meta_path.read_text().strip() != expected_sha256.lower():
+            discard_part(paths)
+        else:
+            print(f"[INFO] Tải tiếp {filename_base} từ byte {paths['local_part_path'].stat().st_size}")
+    part_meta_path.write_text(expected_sha256.lower())
+
+    # Tải file .gz vào file .part, giải nén và tính SHA256 theo từng chunk vào file tạm
+    print(f"[INFO] Tải file nén: {gz_url}")
+    actual_sha256 = download_gunzip(gz_url, paths["local_part_path"], paths["local_tmp_path"], progress=progress)
+    if actual_sha256 is None:
+        print(f"[ERROR] Không thể tải xuống {gz_url}")
+        return None
 
-    actual_sha256 = sha256_of_bytes(uncompressed_data)
     if actual_sha256.lower() != expected_sha256.lower():
         print(f"[ERROR] SHA256 không khớp cho {filename_base}")
         print(f"       Dự kiến: {expected_sha256}")
         print(f"       Thực tế: {actual_sha256}")
-        return False
+        paths["local_tmp_path"].unlink(missing_ok=True)
+        discard_part(paths)
+        return None
 
     print(f"[INFO] Đã xác nhận SHA256 cho {filename_base}")
 
-    # Ghi dữ liệu JSON đã giải nén và xóa file tạm thời
+    # Đổi tên file tạm thành file JSON (thay thế nguyên tử, file cũ vẫn dùng được tới lúc này)
     try:
-        with open(paths["local_json_path"], "wb") as f:
-            f.write(uncompressed_data)
+        os.replace(paths["local_tmp_path"], paths["local_json_path"])
         print(f"[INFO] Đã ghi file {paths['local_json_path']}")
-        paths["local_gz_path"].unlink()
-        paths["local_meta_path"].unlink()
+        record_manifest(target, meta)
+        discard_part(paths)
     except Exception as e:
         print(f"[ERROR] Lỗi ghi file JSON {paths['local_json_path']}: {e}")
-        return False
-    return True
-
-def pulling(targets):
-    for target in targets:
-        print(f"\n=== Xử lý dữ liệu cho {target} ===")
-        if not handle_data(target):
-            print(f"[ERROR] Tải / xác minh dữ liệu {target} thất bại.")
+        return None
+    return UPDATED
+
+# Xử lý một target, lỗi bất kỳ chỉ làm hỏng target đó. Trả về (kết quả handle_data, số giây)
+# on_updated(target) được gọi ngay trong thread tải khi target có dữ liệu mới; nếu nó chặn (hàng đợi đầy)
+# thì thread đó dừng tải target tiếp theo
+def pull_target(target, force=False, progress=True, on_updated=None):
+    start_time = time.time()
+    try:
+        status = handle_data(target, force, progress)
+    except Exception as e:
+        print(f"[ERROR] Lỗi xử lý dữ liệu {target}: {e}")
+        status = None
+    seconds = time.time() - start_time
+    if status == UPDATED and on_updated is not None:
+        on_updated(target)
+    return status, seconds
+
+# Trả về danh sách target có dữ liệu mới (feed không đổi hoặc tải lỗi không nằm trong danh sách)
+# Với workers > 1, các target được tải song song bởi một pool thread dùng chung SESSION
+def pulling(targets, force=False, workers=None, on_updated=None):
+    start_time = time.time()
+    workers = NVD_DOWNLOAD_WORKERS if workers is None else workers
+    workers = max(1, min(workers, len(targets)))
+    updated = []
+    failed = []
+
+    def report(done, target, status, seconds):
+        if status is None:
+            failed.append(target)
+            print(f"[ERROR] [{done}/{len(targets)}] Tải / xác minh dữ liệu {target} thất bại ({seconds:.1f} giây).")
         else:
-            print(f"[INFO] Hoàn tất dữ liệu {target}.\n")
+            if status == UPDATED:
+                updated.append(target)
+            print(f"[INFO] [{done}/{len(targets)}] Hoàn tất dữ liệu {target}: {status} ({seconds:.1f} giây).\n")
+
+    if workers == 1:
+        for done, target in enumerate(targets, 1):
+            print(f"\n=== Xử lý dữ liệu cho {target} ===")
+            report(done, target, *pull_target(target, force, on_updated=on_updated))
+    else:
+        # Thanh tiến trình của nhiều thread chồng lên nhau nên chỉ in dòng kết quả của từng target
+        with ThreadPoolExecutor(workers) as executor:
+            futures = {executor.submit(pull_target, target, force, False, on_updated): target for target in targets}
+            for done, future in enumerate(as_completed(futures), 1):
+                report(done, futures[future], *future.result())
+
+    # Giữ thứ tự target ban đầu cho bước lập chỉ mục
+    updated.sort(key=targets.index)
+    print(f"[INFO] {len(updated)}/{len(targets)} feed có dữ liệu mới: {updated}")
+    if failed:
+        print(f"[ERROR] {len(failed)} feed tải thất bại: {failed}")
+    print(f"[INFO] Hoàn tất tải dữ liệu trong {time.time() - start_time:.1f} giây ({workers} luồng)")
+    return updated
+
+# Feed CPE lớn nhất được đưa vào pool trước
+def complete_targets():
+    return ["cpe"] + list(range(2002, 2026)) + ["modified", "recent"]
 
-def complete_pull():
-    targets = list(range(2002, 2026)) + ["modified", "recent", "cpe"]
-    pulling(targets)
+def complete_pull(force=False, workers=None):
+    return pulling(complete_targets(), force, workers)
 
-def modified_recent_pull():
+def modified_recent_pull(force=False, workers=None):
     targets = ["modified", "recent"]
-    pulling(targets)
+    return pulling(targets, force, workers)
 
 if __name__ == '__main__':
     modified_recent_pull()
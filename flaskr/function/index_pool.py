@@ -0,0 +1,185 @@
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from whoosh import index
+
+# Tên file đánh dấu thế hệ (generation) của một thư mục index gốc.
+# Tiến trình lập chỉ mục tăng giá trị này sau mỗi lần ghi xong, các tiến trình
+# tìm kiếm (web server, scheduler chạy ở process khác) đọc lại để biết khi nào cần mở lại index.
+GENERATION_FILE = "GENERATION"
+
+# Đọc generation hiện tại của thư mục index gốc (0 nếu chưa từng đánh dấu)
+def read_generation(index_root: Path) -> int:
+    try:
+        with open(Path(index_root) / GENERATION_FILE, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+# Tăng generation sau khi index thay đổi, ghi qua file tạm + os.replace để không ai đọc được file dở dang
+def bump_generation(index_root: Path) -> int:
+    index_root = Path(index_root)
+    index_root.mkdir(parents=True, exist_ok=True)
+    generation = read_generation(index_root) + 1
+    tmp_path = index_root / f"{GENERATION_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(str(generation))
+    os.replace(tmp_path, index_root / GENERATION_FILE)
+    return generation
+
+
+# Dựng lại index trong thư mục mới "<name>@<số build>" cạnh bản đang dùng, xong mới chuyển con trỏ
+# "<name>.current" sang thư mục mới (os.replace). Tìm kiếm trong lúc dựng vẫn đọc bản cũ đầy đủ.
+POINTER_SUFFIX = ".current"
+# Số bản build giữ lại: bản hiện tại và bản trước (có thể còn searcher ở process khác đang đọc)
+KEEP_BUILDS = 2
+
+# Thư mục index đang dùng của `name`; nếu chưa có con trỏ (index dựng tại chỗ kiểu cũ) trả về legacy
+# (mặc định index_root/name)
+def current_index_dir(index_root: Path, name: str, legacy: Path = None) -> Path:
+    index_root = Path(index_root)
+    try:
+        with open(index_root / f"{name}{POINTER_SUFFIX}", "r", encoding="utf-8") as f:
+            return index_root / f.read().strip()
+    except OSError:
+        return Path(legacy) if legacy is not None else index_root / name
+
+def _builds(index_root: Path, name: str):
+    builds = []
+    for path in index_root.glob(f"{name}@*"):
+        build = path.name[len(name) + 1:]
+        if path.is_dir() and build.isdigit():
+            builds.append((int(build), path))
+    return sorted(builds, reverse=True)
+
+# Tạo thư mục rỗng cho bản build mới của `name`
+def new_index_dir(index_root: Path, name: str) -> Path:
+    index_root = Path(index_root)
+    index_root.mkdir(parents=True, exist_ok=True)
+    builds = _builds(index_root, name)
+    directory = index_root / f"{name}@{builds[0][0] + 1 if builds else 1}"
+    directory.mkdir()
+    return directory
+
+# Chuyển con trỏ của `name` sang thư mục vừa dựng, sau đó xóa các bản build cũ hơn KEEP_BUILDS.
+# Người gọi tăng generation sau đó để các SearcherPool chuyển sang bản mới; searcher cũ chỉ bị đóng
+# khi hết lượt mượn.
+def publish_index_dir(index_root: Path, name: str, directory: Path, legacy: Path = None):
+    index_root = Path(index_root)
+    pointer = index_root / f"{name}{POINTER_SUFFIX}"
+    tmp_path = index_root / f"{name}{POINTER_SUFFIX}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(Path(directory).name)
+    os.replace(tmp_path, pointer)
+
+    # Giữ bản vừa publish và KEEP_BUILDS - 1 bản trước nó; bản có số lớn hơn (đang dựng dở) không động tới
+    current = int(Path(directory).name[len(name) + 1:])
+    older = [path for build, path in _builds(index_root, name) if build < current]
+    for path in older[KEEP_BUILDS - 1:]:
+        # Trên Windows file còn mở không xóa được, lần publish sau sẽ thử lại
+        shutil.rmtree(path, ignore_errors=True)
+    # Index dựng tại chỗ kiểu cũ cũng chỉ bị xóa khi đã cũ hơn các bản được giữ lại
+    legacy = Path(legacy) if legacy is not None else index_root / name
+    if len(older) >= KEEP_BUILDS - 1 and legacy.exists():
+        if legacy == index_root:
+            for file in legacy.iterdir():
+                if file.is_file() and file.name != GENERATION_FILE and POINTER_SUFFIX not in file.name:
+                    file.unlink()
+        else:
+            shutil.rmtree(legacy, ignore_errors=True)
+
+
+class _PooledSearcher:
+    def __init__(self, searcher, generation):
+        self.searcher = searcher
+        self.generation = generation
+        self.leases = 0
+        self.retired = False
+
+
+class SearcherPool:
+    """
+    Pool searcher dùng chung trong toàn process cho các thư mục index Whoosh
+    nằm dưới cùng một thư mục gốc. Mỗi thư mục chỉ được mở một lần, searcher
+    được dùng lại giữa các thread và chỉ mở lại khi generation của thư mục gốc thay đổi.
+    Searcher cũ chỉ bị đóng khi không còn thread nào đang dùng nó.
+    """
+
+    def __init__(self, index_root: Path, weighting_factory):
+        self.index_root = Path(index_root)
+        self.weighting_factory = weighting_factory
+        self.generation = None
+        self._entries = {}
+        self._dirs = {}
+        self._lock = threading.Lock()
+
+    # Đọc generation trên đĩa, nếu đã thay đổi thì đánh dấu toàn bộ searcher hiện có là cũ
+    def sync(self) -> int:
+        generation = read_generation(self.index_root)
+        with self._lock:
+            if generation != self.generation:
+                for key in list(self._entries):
+                    self._retire(self._entries.pop(key))
+                self._dirs.clear()
+                self.generation = generation
+        return generation
+
+    # Thư mục index đang dùng của `name` (xem current_index_dir), đọc con trỏ một lần cho mỗi generation
+    def resolve(self, name: str, legacy: Path = None) -> Path:
+        with self._lock:
+            directory = self._dirs.get(name)
+            generation = self.generation
+        if directory is None:
+            directory = current_index_dir(self.index_root, name, legacy)
+            with self._lock:
+                # Không lưu nếu generation đã đổi trong lúc đọc con trỏ
+                if generation == self.generation:
+                    self._dirs[name] = directory
+        return directory
+
+    # Mượn searcher của một thư mục index, trả về None nếu thư mục chưa có index
+    @contextmanager
+    def acquire(self, index_dir: Path):
+        entry = self._lease(Path(index_dir))
+        try:
+            yield entry.searcher if entry else None
+        finally:
+            if entry:
+                self._release(entry)
+
+    def close_all(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._retire(self._entries.pop(key))
+            self._dirs.clear()
+            self.generation = None
+
+    def _lease(self, index_dir: Path):
+        key = str(index_dir)
+        with self._lock:
+            if self.generation is None:
+                self.generation = read_generation(self.index_root)
+            entry = self._entries.get(key)
+            if entry is None:
+                if not index.exists_in(key):
+                    return None
+                ix = index.open_dir(key)
+                entry = _PooledSearcher(ix.searcher(weighting=self.weighting_factory()), self.generation)
+                self._entries[key] = entry
+            entry.leases += 1
+            return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry.leases -= 1
+            if entry.retired and entry.leases == 0:
+                entry.searcher.close()
+
+    # Gọi khi đang giữ lock
+    def _retire(self, entry):
+        entry.retired = True
+        if entry.leases == 0:
+            entry.searcher.close()
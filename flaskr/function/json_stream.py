@@ -0,0 +1,82 @@
+import json
+
+# Đọc dần một mảng lớn trong file JSON (ví dụ "CVE_Items" của feed CVE hay "matches" của feed CPE)
+# và trả về từng phần tử, thay vì json.load cả file vào bộ nhớ.
+
+_decoder = json.JSONDecoder()
+WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        # Bỏ phần đã đọc để bộ đệm không phình to theo kích thước file
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    # Bỏ qua khoảng trắng và trả về ký tự tiếp theo (chuỗi rỗng nếu hết file)
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON không hợp lệ: cần '{char}' tại vị trí {self.pos}")
+        self.pos += 1
+
+    # Giải mã một giá trị JSON, đọc thêm dữ liệu nếu giá trị bị cắt ở cuối bộ đệm
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # Số ở cuối bộ đệm có thể chưa đủ chữ số, cần đọc thêm để chắc chắn
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iter_json_array(path, key, chunk_size=1 << 16):
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _Reader(f, chunk_size)
+        reader.expect("{")
+        while reader.peek() != "}":
+            name = reader.value()
+            reader.expect(":")
+            if name != key:
+                # Các trường khác ở cấp cao nhất (metadata của feed) nhỏ, đọc rồi bỏ qua
+                reader.value()
+            else:
+                reader.expect("[")
+                while reader.peek() != "]":
+                    yield reader.value()
+                    if reader.peek() == ",":
+                        reader.pos += 1
+                reader.pos += 1
+                return
+            if reader.peek() == ",":
+                reader.pos += 1
@@ -1,9 +1,11 @@
 from flaskr.model import URL, CVE, Tech, Tech_CVE, URL_Tech, Alerts
 from flaskr import db, create_app, socketio
-from flaskr.function.cve_scan import create_cve_list
+from flaskr.function.cve_scan import create_cve_list_many
 from flaskr.scan import nuclei_scan
 
-def manual_scan(url_id, app):
+# cve_results: kết quả create_cve_list_many đã tìm sẵn (auto_scan tìm một lần cho mọi URL)
+# tech_ids: chỉ quét các tech này của URL (quét lại theo thay đổi), None = mọi tech
+def manual_scan(url_id, app, cve_results=None, tech_ids=None):
     manual_cve_scan = []
     cve_name_list = []
     nuclei_cve_name_target = []
@@ -17,14 +19,21 @@ def manual_scan(url_id, app):
 
         url = url_obj.url
         url_techs = URL_Tech.query.filter_by(url_id=url_id).all()
-        for url_tech in url_techs:
-            tech = Tech.query.filter_by(id=url_tech.tech_id).first()
-            cpe = tech.cpe
-            version = tech.version
-            results = create_cve_list(cpe, version, 100) # Tìm cve từ danh sách các năm (dành cho thủ công)
+        if tech_ids is not None:
+            url_techs = [url_tech for url_tech in url_techs if url_tech.tech_id in tech_ids]
+        techs = [(url_tech.tech_id, Tech.query.filter_by(id=url_tech.tech_id).first()) for url_tech in url_techs]
+        techs = [(tech_id, tech) for tech_id, tech in techs if tech]
+        # Tìm cve từ danh sách các năm cho tất cả tech của url trong một lần.
+        # Tech được thêm / sửa sau khi auto_scan tìm sẵn cve_results thì được tìm bổ sung ở đây.
+        cve_results = cve_results or {}
+        missing = [(tech.cpe, tech.version) for _, tech in techs if (tech.cpe, tech.version) not in cve_results]
+        if missing:
+            cve_results = {**cve_results, **create_cve_list_many(missing, 100)}
+        for tech_id, tech in techs:
+            results = cve_results[(tech.cpe, tech.version)]
             for result in results:
                 manual_cve_scan.append(result) # Đã lấy được kết quả quét thủ công
-                cve_name_list.append((result[0], url_tech.tech_id))
+                cve_name_list.append((result[0], tech_id))
                 nuclei_cve_name_target.append(result[0])
 
     # nuclei 
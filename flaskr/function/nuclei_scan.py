@@ -1,10 +1,40 @@
 import subprocess
 import os
 import json
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from filelock import FileLock, Timeout
 
 template_folder_path = Path(__file__).resolve().parent.parent.parent / "nuclei-templates/http/cves"
 
+# Số tiến trình nuclei chạy cùng lúc trong toàn ứng dụng (quét thủ công và các worker của quét tự động).
+# Quét tự động chạy trong process của scheduler, quét thủ công trong process web: semaphore chỉ giới hạn
+# các thread trong một process, giới hạn chung giữa các process là NUCLEI_MAX_CONCURRENT file lock trong NUCLEI_LOCK_DIR.
+NUCLEI_MAX_CONCURRENT = int(os.getenv("NUCLEI_MAX_CONCURRENT", "2"))
+NUCLEI_SEMAPHORE = threading.BoundedSemaphore(max(1, NUCLEI_MAX_CONCURRENT))
+NUCLEI_LOCK_DIR = Path(os.getenv("NUCLEI_LOCK_DIR", Path(__file__).resolve().parent.parent.parent / "instance" / "nuclei_slots"))
+
+# Giữ một slot nuclei: chờ semaphore của process rồi lần lượt thử các file lock slot<n>.lock cho tới khi lấy được
+@contextmanager
+def nuclei_slot():
+    with NUCLEI_SEMAPHORE:
+        NUCLEI_LOCK_DIR.mkdir(parents=True, exist_ok=True)
+        while True:
+            for n in range(max(1, NUCLEI_MAX_CONCURRENT)):
+                lock = FileLock(str(NUCLEI_LOCK_DIR / f"slot{n}.lock"))
+                try:
+                    lock.acquire(timeout=0)
+                except Timeout:
+                    continue
+                try:
+                    yield
+                finally:
+                    lock.release()
+                return
+            time.sleep(0.2)
+
 def check_template_available(cves):
     available_templates = []
     missing_templates = []
@@ -41,12 +71,13 @@ def run_nuclei(url, available_templates, output_file):
         templates.append(template)
     try:
         # Thêm flag -system-resolvers nếu chạy trên website nội bộ
-        result = subprocess.run(
-            ["nuclei", "-u", url, "-t", ",".join(templates), "-j", "-o", output_file],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        with nuclei_slot():
+            result = subprocess.run(
+                ["nuclei", "-u", url, "-t", ",".join(templates), "-j", "-o", output_file],
+                capture_output=True,
+                text=True,
+                check=True
+            )
         return result.stdout, result.stderr
     except subprocess.CalledProcessError as e:
         return e.stdout, e.stderr
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import datetime
+from .data_download import BASE_DIR, create_session
+from . import cve_scan
+
+# Nguồn cập nhật tăng dần qua NVD CVE API 2.0: chỉ lấy các CVE có lastModified trong cửa sổ
+# [lần chạy trước, hiện tại], phân trang theo startIndex, chuyển về định dạng item của feed 1.1
+# rồi upsert thẳng vào index theo năm. Checkpoint được ghi sau mỗi lần upsert để lần chạy sau tiếp tục được.
+
+NVD_API_URL = os.getenv("NVD_API_URL", "https://services.nvd.nist.gov/rest/json/cves/2.0")
+NVD_API_KEY = os.getenv("NVD_API_KEY", "")
+NVD_API_PAGE_SIZE = int(os.getenv("NVD_API_PAGE_SIZE", "2000"))
+# NVD giới hạn 5 request / 30 giây khi không có API key (50 khi có), nghỉ giữa các trang cho đúng giới hạn
+NVD_API_DELAY = float(os.getenv("NVD_API_DELAY", "0.6" if NVD_API_KEY else "6"))
+# Lần chạy đầu tiên (chưa có checkpoint) lấy các thay đổi trong bấy nhiêu ngày, giống feed modified
+NVD_API_INITIAL_DAYS = int(os.getenv("NVD_API_INITIAL_DAYS", "8"))
+# Số CVE gom lại trước mỗi lần upsert (mỗi lần upsert là một lần commit index), checkpoint ghi sau mỗi lần upsert
+NVD_API_BATCH = int(os.getenv("NVD_API_BATCH", "10000"))
+CHECKPOINT_FILE = BASE_DIR / "nvd_api_checkpoint.json"
+
+# API giới hạn mỗi khoảng lastModStartDate/lastModEndDate tối đa 120 ngày
+MAX_WINDOW = datetime.timedelta(days=120)
+# Cửa sổ mới bắt đầu sớm hơn điểm kết thúc lần trước một chút, CVE không đổi sẽ được bỏ qua khi upsert
+WINDOW_OVERLAP = datetime.timedelta(minutes=15)
+
+# NVD trả 403 / 429 khi vượt giới hạn request
+SESSION = create_session(status_forcelist=(403, 429, 500, 502, 503, 504))
+
+
+def load_checkpoint():
+    try:
+        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def save_checkpoint(checkpoint):
+    tmp_path = CHECKPOINT_FILE.with_name(f"{CHECKPOINT_FILE.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, CHECKPOINT_FILE)
+
+def format_date(value: datetime.datetime):
+    return value.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000+00:00")
+
+def parse_date(value: str):
+    return datetime.datetime.fromisoformat(value).astimezone(datetime.timezone.utc)
+
+# Lấy một trang kết quả, trả về JSON của response
+def fetch_page(start: datetime.datetime, end: datetime.datetime, start_index, timeout=120):
+    params = {
+        "lastModStartDate": format_date(start),
+        "lastModEndDate": format_date(end),
+        "startIndex": start_index,
+        "resultsPerPage": NVD_API_PAGE_SIZE,
+    }
+    headers = {"apiKey": NVD_API_KEY} if NVD_API_KEY else {}
+    with SESSION.get(NVD_API_URL, params=params, headers=headers, timeout=timeout) as response:
+        response.raise_for_status()
+        return response.json()
+
+# Chia [start, end] thành các cửa sổ không dài hơn MAX_WINDOW
+def split_windows(start, end):
+    windows = []
+    while start < end:
+        windows.append((start, min(start + MAX_WINDOW, end)))
+        start = windows[-1][1]
+    return windows
+
+# Chuyển một CVE của API 2.0 ("vulnerabilities"[i]["cve"]) về item của feed 1.1 để dùng lại parse_cve
+def to_feed_item(cve):
+    descriptions = sorted(cve.get("descriptions", []), key=lambda d: d.get("lang") != "en")
+    weaknesses = sorted(cve.get("weaknesses", []), key=lambda w: w.get("type") != "Primary")
+    item = {
+        "cve": {
+            "CVE_data_meta": {"ID": cve.get("id", "")},
+            "problemtype": {"problemtype_data": [{"description": w.get("description", [])} for w in weaknesses]},
+            "description": {"description_data": [{"lang": d.get("lang"), "value": d.get("value", "")}
+                                                 for d in descriptions]},
+        },
+        "configurations": {"nodes": []},
+        "impact": {},
+        "lastModifiedDate": cve.get("lastModified"),
+    }
+
+    metrics = cve.get("metrics", {})
+    cvss_v3 = metrics.get("cvssMetricV31") or metrics.get("cvssMetricV30") or []
+    if cvss_v3:
+        metric = next((m for m in cvss_v3 if m.get("type") == "Primary"), cvss_v3[0])
+        item["impact"]["baseMetricV3"] = {
+            "cvssV3": metric.get("cvssData", {}),
+            "exploitabilityScore": metric.get("exploitabilityScore", 0.0),
+            "impactScore": metric.get("impactScore", 0.0),
+        }
+
+    # API 2.0 bọc các node trong từng configuration và đổi tên cpeMatch / criteria
+    for configuration in cve.get("configurations", []):
+        for node in configuration.get("nodes", []):
+            cpe_match = []
+            for match in node.get("cpeMatch", []):
+                converted = {"vulnerable": match.get("vulnerable"), "cpe23Uri": match.get("criteria", "")}
+                for key in ("versionStartIncluding", "versionStartExcluding",
+                            "versionEndIncluding", "versionEndExcluding"):
+                    if key in match:
+                        converted[key] = match[key]
+                cpe_match.append(converted)
+            item["configurations"]["nodes"].append(
+                {"operator": node.get("operator", "OR"), "children": [], "cpe_match": cpe_match})
+    return item
+
+# Lấy và upsert các CVE thay đổi từ lần chạy trước tới `now`. Trả về danh sách cve_id đã thay đổi.
+# Nếu bị lỗi giữa chừng, các lô đã upsert vẫn được giữ và lần chạy sau tiếp tục từ trang kế tiếp.
+def ingest_changes(now=None, rebuild_lookup=None):
+    start_time = time.time()
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    checkpoint = load_checkpoint()
+    pending = checkpoint.get("window")
+    if "last_mod_end" in checkpoint:
+        start = parse_date(checkpoint["last_mod_end"]) - WINDOW_OVERLAP
+    else:
+        start = now - datetime.timedelta(days=NVD_API_INITIAL_DAYS)
+
+    # Cửa sổ đang dở ở lần trước được làm tiếp trước, từ trang chưa xử lý
+    windows = []
+    if pending:
+        windows.append((parse_date(pending["start"]), parse_date(pending["end"]), pending["next_index"]))
+        start = max(start, parse_date(pending["end"]))
+    windows.extend((window_start, window_end, 0) for window_start, window_end in split_windows(start, now))
+
+    changed = []
+    fetched = 0
+    requests_made = 0
+    try:
+        for window_start, window_end, start_index in windows:
+            batch = []
+            while True:
+                if requests_made:
+                    time.sleep(NVD_API_DELAY)
+                page = fetch_page(window_start, window_end, start_index)
+                requests_made += 1
+                vulnerabilities = page.get("vulnerabilities", [])
+                batch.extend(to_feed_item(v["cve"]) for v in vulnerabilities if "cve" in v)
+                fetched += len(vulnerabilities)
+                start_index += len(vulnerabilities)
+                total = page.get("totalResults", 0)
+                print(f"[INFO] NVD API {format_date(window_start)} → {format_date(window_end)}: "
+                      f"{min(start_index, total)}/{total} CVE")
+                if not vulnerabilities or start_index >= total:
+                    break
+                if len(batch) >= NVD_API_BATCH:
+                    changed.extend(cve_scan.upsert_cve_items(batch, rebuild_lookup=False))
+                    batch = []
+                    # Các trang trước start_index đã nằm trong index
+                    checkpoint["window"] = {"start": format_date(window_start), "end": format_date(window_end),
+                                            "next_index": start_index}
+                    save_checkpoint(checkpoint)
+            if batch:
+                changed.extend(cve_scan.upsert_cve_items(batch, rebuild_lookup=False))
+            checkpoint.pop("window", None)
+            checkpoint["last_mod_end"] = format_date(window_end)
+            save_checkpoint(checkpoint)
+    except Exception as e:
+        print(f"[ERROR] Lỗi lấy dữ liệu từ NVD API: {e}. Lần chạy sau sẽ tiếp tục từ checkpoint.")
+
+    if changed:
+        if rebuild_lookup is None:
+            rebuild_lookup = cve_scan.CVE_LOOKUP_ENGINE == "table"
+        if rebuild_lookup:
+            cve_scan.build_cve_lookup_table(cve_scan.CVE_YEARS)
+    print(f"[INFO] NVD API: {fetched} CVE đã lấy, {len(changed)} CVE thay đổi, "
+          f"{requests_made} request trong {time.time() - start_time:.1f} giây")
+    return changed
+
+
+if __name__ == '__main__':
+    ingest_changes()
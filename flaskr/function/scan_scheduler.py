@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+
+# Hàng đợi URL cho các worker quét tự động: chia URL theo host, phát lần lượt xoay vòng giữa các host
+# (host có nhiều URL không chiếm hết worker) và giới hạn số URL của cùng một host được quét đồng thời.
+
+
+def url_host(url: str):
+    host = urlsplit(url if "://" in url else f"//{url}").hostname
+    return host or url.strip().lower()
+
+
+class HostFairQueue:
+    def __init__(self, items, per_host=1):
+        """
+        items: các bộ (url_id, url) cần quét.
+        per_host: số URL tối đa của một host được quét cùng lúc.
+        """
+        self.per_host = max(1, per_host)
+        self.condition = threading.Condition()
+        self.pending = OrderedDict()
+        for item in items:
+            self.pending.setdefault(url_host(item[1]), deque()).append(item)
+        self.active = {}
+        self.total = sum(len(items) for items in self.pending.values())
+
+    # Lấy URL kế tiếp theo vòng xoay host; chờ nếu mọi host còn URL đều đang đủ giới hạn.
+    # Trả về (host, item) hoặc None khi đã hết URL.
+    def acquire(self):
+        with self.condition:
+            while self.pending:
+                for host in self.pending:
+                    if self.active.get(host, 0) < self.per_host:
+                        break
+                else:
+                    self.condition.wait()
+                    continue
+                items = self.pending.pop(host)
+                item = items.popleft()
+                # Host vừa được phục vụ xuống cuối vòng
+                if items:
+                    self.pending[host] = items
+                self.active[host] = self.active.get(host, 0) + 1
+                return host, item
+            return None
+
+    def release(self, host):
+        with self.condition:
+            self.active[host] -= 1
+            self.condition.notify_all()
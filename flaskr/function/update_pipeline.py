@@ -0,0 +1,149 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from . import data_download
+from . import cve_scan
+from . import cpe_scan
+
+# Cập nhật toàn bộ theo kiểu pipeline: thread tải đưa từng feed đã xác minh SHA256 vào hàng đợi,
+# thread chính lấy ra và lập chỉ mục ngay, thay vì chờ tải xong tất cả rồi mới index.
+# Hàng đợi có giới hạn: khi bước index chậm hơn, thread tải bị chặn lại (backpressure).
+
+NVD_PIPELINE_QUEUE = int(os.getenv("NVD_PIPELINE_QUEUE", "2"))
+
+_DONE = object()
+
+
+class StageTimer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seconds = {}
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+
+# Trả về danh sách target có dữ liệu mới, giống complete_pull
+def run_complete_pipeline(force=False, download_workers=None, index_workers=None, unified=None):
+    start_time = time.time()
+    unified = cve_scan.CVE_UNIFIED_INDEX if unified is None else unified
+    index_workers = cve_scan.CVE_INDEX_WORKERS if index_workers is None else index_workers
+    timer = StageTimer()
+    ready = queue.Queue(maxsize=max(1, NVD_PIPELINE_QUEUE))
+    updated = []
+
+    # Đặt khi bước index lỗi: không còn ai lấy từ hàng đợi, thread tải không được chờ chỗ trống mãi
+    cancelled = threading.Event()
+
+    def offer(item):
+        while not cancelled.is_set():
+            try:
+                ready.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    # Gọi trong thread tải: chờ khi hàng đợi đầy là thời gian bước tải bị bước index giữ lại
+    def on_updated(target):
+        put_start = time.time()
+        offer(target)
+        timer.add("download_blocked", time.time() - put_start)
+
+    def produce():
+        download_start = time.time()
+        try:
+            updated.extend(data_download.pulling(data_download.complete_targets(), force, download_workers,
+                                                 on_updated))
+        finally:
+            timer.add("download", time.time() - download_start)
+            offer(_DONE)
+
+    # Process con phải được fork trước khi có thread tải, tránh kế thừa lock đang bị thread khác giữ
+    executor = None
+    if index_workers > 1:
+        executor = ProcessPoolExecutor(index_workers)
+        executor.submit(int).result()
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    indexed_years = []
+    cpe_indexed = False
+    in_flight = set()
+
+    def collect(futures):
+        for future in futures:
+            target, count, seconds = future.result()
+            cve_scan.report_index_time(target, count, seconds)
+            timer.add("index", seconds)
+            indexed_years.append(target)
+            data_download.mark_indexed([target])
+
+    try:
+        while True:
+            wait_start = time.time()
+            target = ready.get()
+            timer.add("index_idle", time.time() - wait_start)
+            if target is _DONE:
+                break
+            if target in cve_scan.CVE_YEARS:
+                if executor is None:
+                    index_start = time.time()
+                    cve_scan.report_index_time(*cve_scan.index_cve_target(target))
+                    timer.add("index", time.time() - index_start)
+                    indexed_years.append(target)
+                    data_download.mark_indexed([target])
+                else:
+                    # Không nhận thêm feed khi mọi process đều bận, để backpressure tới được bước tải
+                    if len(in_flight) >= index_workers:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    in_flight.add(executor.submit(cve_scan.index_cve_target, target, False))
+            elif target == "cpe":
+                index_start = time.time()
+                cpe_scan.indexing_cpe()
+                timer.add("index", time.time() - index_start)
+                cpe_indexed = True
+                data_download.mark_indexed(["cpe"])
+            # Feed modified/recent được upsert sau khi các năm đã được dựng lại
+        collect(in_flight)
+    except BaseException:
+        cancelled.set()
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    producer.join()
+
+    # Các bước sau khi tải xong giống indexing_full_cve: năm chưa có index, index gộp, modified/recent, bảng tra cứu
+    finish_start = time.time()
+    missing = [year for year in cve_scan.CVE_YEARS
+               if year not in indexed_years and not cve_scan.index_exists(str(year))]
+    if missing:
+        cve_scan.create_cve_index(missing)
+    # Index gộp đã có (kể cả dựng tay) được dựng lại theo các năm, vì tìm kiếm luôn ưu tiên nó
+    unified = unified or cve_scan.index_exists(cve_scan.UNIFIED_INDEX_NAME)
+    if unified and (indexed_years or missing or not cve_scan.index_exists(cve_scan.UNIFIED_INDEX_NAME)):
+        cve_scan.create_unified_cve_index(cve_scan.CVE_YEARS)
+    # Năm vừa dựng lại từ feed năm có thể cũ hơn modified/recent đã tải ở job 2 giờ trước: luôn áp dụng lại cả hai
+    if indexed_years or missing:
+        feeds = cve_scan.UPDATE_FEEDS
+    else:
+        feeds = [feed for feed in cve_scan.UPDATE_FEEDS if feed in updated]
+    changed = cve_scan.upsert_cve_feeds(feeds, rebuild_lookup=False) if feeds else []
+    # Feed modified/recent chỉ được ghi là đã index sau khi upsert xong
+    data_download.mark_indexed([feed for feed in feeds if feed in updated])
+    if indexed_years or missing or changed or not cve_scan.LOOKUP_TABLE_FILE.exists():
+        cve_scan.build_cve_lookup_table(cve_scan.CVE_YEARS)
+    if not cpe_indexed and not cpe_scan.cpe_index_exists():
+        cpe_scan.indexing_cpe()
+    timer.add("finish", time.time() - finish_start)
+
+    seconds = timer.seconds
+    total = time.time() - start_time
+    print(f"[INFO] Pipeline cập nhật: tổng {total:.1f} giây | tải {seconds.get('download', 0):.1f} giây "
+          f"(chờ hàng đợi {seconds.get('download_blocked', 0):.1f}) | index {seconds.get('index', 0):.1f} giây "
+          f"(chờ tải {seconds.get('index_idle', 0):.1f}) | hoàn tất {seconds.get('finish', 0):.1f} giây")
+    return updated
@@ -0,0 +1,85 @@
+from packaging.version import Version, InvalidVersion
+
+# Biên dịch dải version của NVD thành khoảng so sánh được, tính một lần lúc index
+# thay vì tạo packaging.Version cho mỗi lần check version khi tìm kiếm.
+
+PRE_RANK = {"a": 1, "b": 2, "rc": 3}
+
+# Khóa so sánh của một version: tuple thuần (int/str) có cùng thứ tự với packaging.Version,
+# pickle/marshal được để lưu vào index. Trả về None nếu version không hợp lệ.
+def version_key(version: str):
+    try:
+        v = Version(version)
+    except (InvalidVersion, TypeError):
+        return None
+    release = list(v.release)
+    while release and release[-1] == 0:
+        release.pop()
+    # Dev release không có pre/post đứng trước mọi pre release (-vô cực)
+    if v.pre is None and v.post is None and v.dev is not None:
+        pre = (0,)
+    elif v.pre is None:
+        pre = (4,)
+    else:
+        pre = (PRE_RANK[v.pre[0]], v.pre[1])
+    post = (0,) if v.post is None else (1, v.post)
+    dev = (1,) if v.dev is None else (0, v.dev)
+    local = ()
+    if v.local is not None:
+        local = tuple((1, int(part), "") if part.isdigit() else (0, 0, part) for part in v.local.split("."))
+    return (v.epoch, tuple(release), pre, post, dev, local)
+
+# Biên dịch dải version dạng verStartIncluding_verStartExcluding_verEndIncluding_verEndExcluding_isVulnerable
+# thành khoảng (lo, lo_inclusive, hi, hi_inclusive); lo = () là không có cận dưới, hi = None là không có cận trên.
+# Trả về None nếu dải không thể chứa version nào (không vulnerable, không có cận nào hoặc cận không hợp lệ).
+def compile_range(ver_range: str):
+    ver_range_detail = ver_range.split('_')
+    if ver_range_detail[4] == "false":
+        return None
+    if all(ver == "x" for ver in ver_range_detail[:4]):
+        return None
+    keys = [None if ver == "x" else version_key(ver) for ver in ver_range_detail[:4]]
+    if any(key is None and ver != "x" for key, ver in zip(keys, ver_range_detail[:4])):
+        return None
+    start_in, start_ex, end_in, end_ex = keys
+
+    lo, lo_inclusive = (), True
+    if start_in is not None:
+        lo, lo_inclusive = start_in, True
+    if start_ex is not None and (start_in is None or start_ex >= start_in):
+        lo, lo_inclusive = start_ex, False
+    hi, hi_inclusive = None, True
+    if end_in is not None:
+        hi, hi_inclusive = end_in, True
+    if end_ex is not None and (end_in is None or end_ex <= end_in):
+        hi, hi_inclusive = end_ex, False
+    return (lo, lo_inclusive, hi, hi_inclusive)
+
+# Biên dịch danh sách dải version của một CPE, sắp xếp theo cận dưới để truy vấn stabbing
+def compile_intervals(ver_ranges):
+    intervals = [interval for interval in map(compile_range, ver_ranges) if interval is not None]
+    return tuple(sorted(intervals, key=lambda interval: (interval[0], not interval[1])))
+
+# Biên dịch toàn bộ {cpe: [ver_range, ...]} của một CVE
+def compile_cpe_ranges(cpe_info: dict):
+    return {cpe: compile_intervals(ver_ranges) for cpe, ver_ranges in cpe_info.items()}
+
+def interval_contains(interval, key):
+    lo, lo_inclusive, hi, hi_inclusive = interval
+    if key < lo or (key == lo and not lo_inclusive):
+        return False
+    if hi is not None and (key > hi or (key == hi and not hi_inclusive)):
+        return False
+    return True
+
+# Truy vấn stabbing: có khoảng nào chứa key không. Các khoảng đã sắp theo cận dưới
+# nên dừng ngay khi gặp cận dưới lớn hơn key.
+def stab(intervals, key):
+    if key is None:
+        return False
+    for interval in intervals:
+        if interval[0] > key:
+            return False
+        if interval_contains(interval, key):
+            return True
+    return False
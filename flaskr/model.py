@@ -44,6 +44,19 @@ class Tech(db.Model):
     def __repr__(self):
         return f'<Tech {self.tech} {self.version}>'
 
+# Ghi nhớ CPE tổng quát đã được xác nhận cho tên công nghệ (tên Wappalyzer đã chuẩn hóa)
+# cpe_generation: generation của index CPE lúc ghi nhớ, khác với hiện tại thì phải kiểm tra lại
+class Tech_CPE(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    tech = db.Column(db.String(128), index=True, unique=True, nullable=False)
+    cpe = db.Column(db.Text, nullable=False)
+    hits = db.Column(db.Integer, default=0)
+    cpe_generation = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f'<Tech_CPE {self.tech} {self.cpe}>'
+
 class Tech_CVE(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     tech_id = db.Column(db.Integer, db.ForeignKey('tech.id'), nullable=False)
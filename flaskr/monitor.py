@@ -1,5 +1,8 @@
+import os
 import threading
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from flask import g
 from flaskr import create_app
 from flask import Blueprint, current_app, render_template, request, jsonify, session as ses
@@ -9,10 +12,17 @@ from flaskr import db, socketio
 from .function.send_email import send_mail
 from flaskr.function.url_monitor import check_url_status
 from flaskr.function.mode_scan import manual_scan as mscan
+from flaskr.function.cve_scan import create_cve_list_many, affected_cpes, cpe_product_key
+from flaskr.function.cpe_memo import learn_confirmed_results
 from flaskr.function.waf_monitor import stop_monitoring_waf_for_url, monitor_waf_for_url
+from flaskr.function.scan_scheduler import HostFairQueue
 
 monitor_threads = {}  # {url_id: (thread, stop_event)}
 
+# Số URL được quét tự động song song, và số URL của cùng một host được quét cùng lúc
+AUTO_SCAN_WORKERS = int(os.getenv("AUTO_SCAN_WORKERS", "4"))
+AUTO_SCAN_PER_HOST = int(os.getenv("AUTO_SCAN_PER_HOST", "1"))
+
 bp = Blueprint('monitor', __name__)
 
 @bp.route('/monitor', methods=['GET'])
@@ -44,10 +54,12 @@ def start_watchlist_threads():
 @login_required
 def add_to_watchlist():
     data = request.json
-    response, status_code = add_to_database(data)
+    # CPE ở đây do người dùng chọn trong danh sách ứng viên nên được ghi nhớ
+    response, status_code = add_to_database(data, learn_cpe=True)
     return response, status_code
     
-def add_to_database(data):
+# learn_cpe: ghi nhớ tech -> CPE, chỉ bật khi CPE đã được người dùng xác nhận (không phải top-1 tự động)
+def add_to_database(data, learn_cpe=False):
     global monitor_threads
     url = data.get('url')
     url_id = add_url(url)
@@ -80,6 +92,9 @@ def add_to_database(data):
                 waf_name = waf_instance[1]
                 waf_id = add_waf(url_id, waf_name, waf_manufacturer)
         db.session.commit()
+        # Ghi nhớ tech -> CPE đã xác nhận để các lần quét sau không phải tìm lại
+        if learn_cpe:
+            learn_confirmed_results(data.get('results'))
         if url_id not in monitor_threads:
             start_monitoring_for_url(url_id)
         return "Thành công!!!", 200
@@ -431,87 +446,170 @@ def set_is_read(alert_id):
 
 # Quét tự động 
 #####################################################################################
-def auto_scan():
+# Số cve_id mỗi truy vấn IN, tránh vượt giới hạn tham số của SQLite
+CVE_QUERY_CHUNK = 500
+
+# Các tech cần quét lại sau khi các CVE `cve_ids` thay đổi: tech có CPE (vendor/product) nằm trong cpe_list
+# của các CVE đó, cộng với tech đã gắn với các CVE đó (CVE có thể bỏ CPE của tech hoặc đổi điểm).
+# Trả về {url_id: {tech_id, ...}} theo URL_Tech.
+def rescan_targets(cve_ids):
+    cve_ids = sorted(set(cve_ids))
+    if not cve_ids:
+        return {}
+    products = affected_cpes(cve_ids)
+    tech_ids = {tech.id for tech in Tech.query.all() if cpe_product_key(tech.cpe) in products}
+    for i in range(0, len(cve_ids), CVE_QUERY_CHUNK):
+        tech_cves = Tech_CVE.query.join(CVE, CVE.id == Tech_CVE.cve_id).filter(
+            CVE.cve.in_(cve_ids[i:i + CVE_QUERY_CHUNK])).all()
+        tech_ids.update(tech_cve.tech_id for tech_cve in tech_cves)
+
+    targets = {}
+    for url_tech in URL_Tech.query.all():
+        if url_tech.tech_id in tech_ids:
+            targets.setdefault(url_tech.url_id, set()).add(url_tech.tech_id)
+    return targets
+
+# Các worker có thể cùng phát hiện một CVE mới: ghi CVE / association / alert lần lượt để add_cve không tạo trùng
+AUTO_SCAN_DB_LOCK = threading.Lock()
+
+# Quét một URL trong worker của auto_scan (đã ở trong app context riêng của worker), gửi cảnh báo nếu có thay đổi
+def auto_scan_url(app, url_id, url, cve_results, tech_ids=None):
+    new_cves, modified_cves = mscan(url_id, app, cve_results, tech_ids)
+
+    # Xử lý CVE mới
+    if new_cves:
+        title = f"Phát hiện {len(new_cves)} CVE mới!"
+        alert_type = 'new'
+        new_cve_ids = []
+        with AUTO_SCAN_DB_LOCK:
+            for cve_info, tech_id in new_cves:
+                cve_id = add_cve(*cve_info)
+                new_cve_ids.append(cve_id)
+                tech_cve_association(tech_id, cve_id)
+            alert_id = add_alert(url_id, alert_type, title, new_cve_ids)
+            db.session.commit()
+        socketio.emit('notification_push', {
+            'alert_id': alert_id,
+            'url_id': url_id,
+            'url': url,
+            'alert_type': alert_type,
+            'title': title,
+            'content': new_cve_ids
+        })
+        
+        # Gửi email khi phát hiện cve mới
+        subject = title
+        recipients=[user.username for user in User.query.all()]
+        send_mail(
+            subject=subject,
+            recipients=recipients,
+            template='mail/email_new_cve.html',
+            title=subject,
+            cves=new_cves
+        )
+    
+    # Xử lý CVE được chỉnh sửa
+    if modified_cves:
+        title = f"Phát hiện {len(modified_cves)} CVE được chỉnh sửa!"
+        alert_type = 'modified'
+        change_list = []
+        with AUTO_SCAN_DB_LOCK:
+            for cve_info, changes in modified_cves:
+                cve_name = cve_info[0] if isinstance(cve_info, (tuple, list)) else cve_info
+                change_list.append({
+                    "cve": cve_name,
+                    "changes": changes
+                })
+                cve_instance = CVE.query.filter_by(cve=cve_name).first()
+                if cve_instance:
+                    for field, values in changes.items():
+                        setattr(cve_instance, field, values['new'])
+            content = json.dumps(change_list, ensure_ascii=False)
+            alert_id = add_alert(url_id, alert_type, title, content)
+            db.session.commit()
+        socketio.emit('notification_push', {
+            'alert_id': alert_id,
+            'url_id': url_id,
+            'url': url,
+            'alert_type': alert_type,
+            'title': title,
+            'content': content
+        })
+        
+        # Gửi email khi phát hiện cve được chỉnh sửa
+        subject = title
+        recipients=[user.username for user in User.query.all()]
+        send_mail(
+            subject=subject,
+            recipients=recipients,
+            template='mail/email_modified_cve.html',
+            title=subject,
+            modifications=change_list
+        )
+
+# cve_ids: danh sách cve_id vừa thay đổi, chỉ quét lại các tech/URL bị ảnh hưởng. None = quét lại tất cả.
+# Các URL được chia cho AUTO_SCAN_WORKERS worker, xoay vòng giữa các host (HostFairQueue).
+def auto_scan(cve_ids=None, workers=None):
+    start_time = time.time()
+    workers = AUTO_SCAN_WORKERS if workers is None else workers
     try:
         app = current_app._get_current_object()
     except RuntimeError:
         app = create_app()
     
     with app.app_context():
-        # Lấy tất cả URL trong DB
-        urls = URL.query.all()
-        for url_obj in urls:
-            print(f'Bắt đầu quét" { url_obj.url }')
-            new_cves, modified_cves = mscan(url_obj.id, app)
-            
-            # Xử lý CVE mới
-            if new_cves:
-                title = f"Phát hiện {len(new_cves)} CVE mới!"
-                alert_type = 'new'
-                new_cve_ids = []
-                for cve_info, tech_id in new_cves:
-                    cve_id = add_cve(*cve_info)
-                    new_cve_ids.append(cve_id)
-                    tech_cve_association(tech_id, cve_id)
-                alert_id = add_alert(url_obj.id, alert_type, title, new_cve_ids)
-                db.session.commit()
-                socketio.emit('notification_push', {
-                    'alert_id': alert_id,
-                    'url_id': url_obj.id,
-                    'url': url_obj.url,
-                    'alert_type': alert_type,
-                    'title': title,
-                    'content': new_cve_ids
-                })
-                
-                # Gửi email khi phát hiện cve mới
-                subject = title
-                recipients=[user.username for user in User.query.all()]
-                send_mail(
-                    subject=subject,
-                    recipients=recipients,
-                    template='mail/email_new_cve.html',
-                    title=subject,
-                    cves=new_cves
-                )
-            
-            # Xử lý CVE được chỉnh sửa
-            if modified_cves:
-                title = f"Phát hiện {len(modified_cves)} CVE được chỉnh sửa!"
-                alert_type = 'modified'
-                change_list = []
-                for cve_info, changes in modified_cves:
-                    cve_name = cve_info[0] if isinstance(cve_info, (tuple, list)) else cve_info
-                    change_list.append({
-                        "cve": cve_name,
-                        "changes": changes
-                    })
-                    cve_instance = CVE.query.filter_by(cve=cve_name).first()
-                    if cve_instance:
-                        for field, values in changes.items():
-                            setattr(cve_instance, field, values['new'])
-                content = json.dumps(change_list, ensure_ascii=False)
-                alert_id = add_alert(url_obj.id, alert_type, title, content)
-                db.session.commit()
-                socketio.emit('notification_push', {
-                    'alert_id': alert_id,
-                    'url_id': url_obj.id,
-                    'url': url_obj.url,
-                    'alert_type': alert_type,
-                    'title': title,
-                    'content': content
-                })
-                
-                # Gửi email khi phát hiện cve được chỉnh sửa
-                subject = title
-                recipients=[user.username for user in User.query.all()]
-                send_mail(
-                    subject=subject,
-                    recipients=recipients,
-                    template='mail/email_modified_cve.html',
-                    title=subject,
-                    modifications=change_list
-                )
+        if cve_ids is None:
+            # Lấy tất cả URL trong DB
+            urls = URL.query.all()
+            targets = {}
+            techs = Tech.query.join(URL_Tech, URL_Tech.tech_id == Tech.id).all()
+        else:
+            targets = rescan_targets(cve_ids)
+            urls = URL.query.filter(URL.id.in_(targets)).all() if targets else []
+            techs = Tech.query.filter(Tech.id.in_(set().union(*targets.values()))).all() if targets else []
+            print(f"[INFO] {len(cve_ids)} CVE thay đổi: quét lại {len(techs)} tech trên {len(urls)}/{URL.query.count()} URL")
+
+        # Tìm CVE một lần cho mọi cặp (cpe, version) của các tech cần quét
+        cve_results = create_cve_list_many([(tech.cpe, tech.version) for tech in techs], 100)
+        # Worker chỉ nhận id và url, không dùng chung object ORM của session này
+        scan_queue = HostFairQueue([(url_obj.id, url_obj.url) for url_obj in urls], AUTO_SCAN_PER_HOST)
         db.session.remove()
+
+    progress_lock = threading.Lock()
+    progress = {"done": 0, "failed": 0}
+
+    def work():
+        while True:
+            acquired = scan_queue.acquire()
+            if acquired is None:
+                return
+            host, (url_id, url) = acquired
+            url_start = time.time()
+            print(f'Bắt đầu quét" { url }')
+            failed = False
+            try:
+                # Mỗi worker có app context riêng nên có session DB riêng, session được đóng khi thoát context
+                with app.app_context():
+                    auto_scan_url(app, url_id, url, cve_results, targets.get(url_id))
+            except Exception as e:
+                failed = True
+                print(f"[ERROR] Lỗi khi quét {url}: {e}")
+            finally:
+                scan_queue.release(host)
+            with progress_lock:
+                progress["done"] += 1
+                progress["failed"] += failed
+                print(f"[INFO] Quét tự động {progress['done']}/{scan_queue.total} URL "
+                      f"({url}: {time.time() - url_start:.1f} giây)")
+
+    workers = max(1, min(workers, scan_queue.total))
+    if workers == 1:
+        work()
+    else:
+        with ThreadPoolExecutor(workers) as executor:
+            for future in [executor.submit(work) for _ in range(workers)]:
+                future.result()
+    print(f"[INFO] Quét tự động {progress['done']} URL ({progress['failed']} lỗi) với {workers} worker "
+          f"trong {time.time() - start_time:.1f} giây")
 #####################################################################################
     
\ No newline at end of file
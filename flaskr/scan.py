@@ -1,10 +1,12 @@
 import subprocess, json, os, threading, tempfile
-from flask import Blueprint, flash, render_template, request, jsonify, current_app
+from flask import Blueprint, flash, redirect, render_template, request, jsonify, current_app, url_for
 from flaskr.auth import login_required
 from flaskr import socketio
 from flaskr.function.nuclei_scan import check_template_available, run_nuclei, analyze_results
-from flaskr.function.cpe_scan import search_cpe
-from flaskr.function.cve_scan import create_cve_list
+from flaskr.function.cpe_memo import resolve_cpe_many, rank_cpe_candidates, learn_from_tech_table
+from flaskr.model import Tech_CPE
+from flaskr import db
+from flaskr.function.cve_scan import create_cve_list_many, cve_cache_stats
 from flaskr.function.url_monitor import check_url_status
 from flaskr.function.waf_monitor import detect_waf
 from concurrent.futures import ThreadPoolExecutor
@@ -106,13 +108,10 @@ def stop_status():
 
 @bp.route('/cpe-check', methods=['POST'])
 def cpe_scan():
-    cpe_list = []
-    selected = request.json
-    for tech_info in selected:
-        tech = tech_info.get('tech')
-        version = tech_info.get('version')
-        cpe_result = search_cpe(tech, version, 5)
-        cpe_list.append((tech, version, cpe_result))
+    selected = [(tech_info.get('tech'), tech_info.get('version')) for tech_info in request.json]
+    # Tìm CPE cho tất cả tech được chọn trong một lần, vẫn hiện đủ ứng viên để người dùng chọn lại
+    cpe_results = rank_cpe_candidates(selected, 5)
+    cpe_list = [(tech, version, cpe_results[(tech, version)]) for tech, version in selected]
     return render_template('scan/cpe-scan.html', results=cpe_list)
 
 @bp.route('/cve-search', methods=['GET', 'POST'])
@@ -120,13 +119,11 @@ def cve_search():
     global scanning_url
     if request.method == 'POST':
         request_list = [value for key, value in request.form.items() if key.startswith('selected_cpe_')]
+        request_details = [item.split('|') for item in request_list]
+        cve_results = create_cve_list_many([(cpe, version) for _, cpe, version, *_ in request_details], 100)
         tech_results = []
-        for item in request_list:
-            request_detail = item.split('|')
-            tech = request_detail[0]
-            cpe = request_detail[1]
-            version = request_detail[2]
-            results = create_cve_list(cpe, version, 100)
+        for tech, cpe, version, *_ in request_details:
+            results = cve_results[(cpe, version)]
             tech_results.append({
                 'tech': tech,
                 'version': version,
@@ -137,6 +134,42 @@ def cve_search():
         return render_template('scan/cve-search.html', results=tech_results, url=scanning_url, wafs=list_wafs)
     return render_template('scan/cve-search.html')
 
+@bp.route('/cve-cache-stats', methods=['GET'])
+@login_required
+def cve_cache_stats_route():
+    return jsonify(cve_cache_stats())
+
+# Quản lý bộ nhớ tech -> CPE
+@bp.route('/cpe-memo', methods=['GET'])
+@login_required
+def cpe_memo():
+    memos = Tech_CPE.query.order_by(Tech_CPE.hits.desc(), Tech_CPE.tech).all()
+    return render_template('scan/cpe-memo.html', memos=memos)
+
+@bp.route('/cpe-memo/delete/<int:memo_id>', methods=['POST'])
+@login_required
+def cpe_memo_delete(memo_id):
+    memo = Tech_CPE.query.get(memo_id)
+    if memo:
+        db.session.delete(memo)
+        db.session.commit()
+    return redirect(url_for('scan.cpe_memo'))
+
+@bp.route('/cpe-memo/clear', methods=['POST'])
+@login_required
+def cpe_memo_clear():
+    Tech_CPE.query.delete()
+    db.session.commit()
+    flash('Đã xóa toàn bộ bộ nhớ CPE')
+    return redirect(url_for('scan.cpe_memo'))
+
+@bp.route('/cpe-memo/learn', methods=['POST'])
+@login_required
+def cpe_memo_learn():
+    count = learn_from_tech_table()
+    flash(f'Đã học {count} công nghệ từ bảng Tech')
+    return redirect(url_for('scan.cpe_memo'))
+
 @bp.route('/nuclei_scan', methods=['POST'])
 def nuclei_scan_route():
     global scanning_url
@@ -146,7 +179,6 @@ def nuclei_scan_route():
     return jsonify(results)
 
 def nuclei_scan(cves, scanning_url):
-    output_file = "scan-results.json"
     available_templates, missing_templates = check_template_available(cves)
     results = {}
 
@@ -155,8 +187,14 @@ def nuclei_scan(cves, scanning_url):
             results[template] = {
                 "status": "Có template nhưng không phát hiện lỗ hổng",
             }
-        run_nuclei(scanning_url, available_templates, output_file)
-        vulnerability_results = analyze_results(output_file, available_templates)
+        # Mỗi lần chạy ghi ra file riêng để các lần quét song song không đọc nhầm kết quả của nhau
+        fd, output_file = tempfile.mkstemp(prefix="nuclei-", suffix=".json")
+        os.close(fd)
+        try:
+            run_nuclei(scanning_url, available_templates, output_file)
+            vulnerability_results = analyze_results(output_file, available_templates)
+        finally:
+            os.remove(output_file)
         for template, status in vulnerability_results.items():
             if status == "Có tồn tại lỗ hổng":
                 results[template] = {
@@ -191,9 +229,18 @@ def quick_add():
     results = []
     app = current_app._get_current_object()
     with ThreadPoolExecutor(max_workers=5) as executor:  # Tùy chỉnh số lượng luồng (max_workers)
-        futures = [executor.submit(process_url, url, app) for url in urls]
-        for future in futures:
-            results.append(future.result())
+        # Bước 1-2 cho tất cả URL, sau đó tìm CPE một lần cho toàn bộ tech khác nhau của các URL
+        detected = list(executor.map(lambda url: detect_url(url, app), urls))
+        with app.app_context():
+            cpe_results = resolve_cpe_many(
+                [tuple(pair) for item in detected if "error" not in item for pair in item["techs"]], 1
+            )
+        futures = [
+            executor.submit(finish_url, item, app, cpe_results) if "error" not in item else None
+            for item in detected
+        ]
+        for item, future in zip(detected, futures):
+            results.append(future.result() if future else item)
     print(f">>>>>>>>>> Hoàn thành thêm {len(urls)} vào danh sách monitoring!!! <<<<<<<<<<")
     return jsonify({"message": "Processing completed", "results": results}), 200
 
@@ -205,6 +252,15 @@ def report_step():
     socketio.emit('global_progress', {'progress': pct})
 
 def process_url(url, app):
+    item = detect_url(url, app)
+    if "error" in item:
+        return item
+    with app.app_context():
+        cpe_results = resolve_cpe_many([tuple(pair) for pair in item["techs"]], 1)
+    return finish_url(item, app, cpe_results)
+
+# Bước 1-2: lấy WAF và công nghệ của URL
+def detect_url(url, app):
     url = url.strip()
     if not url:
         return {"url": url, "error": "URL is empty"}
@@ -226,28 +282,41 @@ def process_url(url, app):
                 if details.get('version'):
                     tech_with_versions.append([tech, details['version']])
             report_step()
+            return {"url": url, "wafs": list_wafs, "techs": tech_with_versions}
+
+        except Exception as e:
+            print(f"Đã xảy ra lỗi khi xử lý URL {url}: {e}")
+            return {"url": url, "error": str(e)}
+
+# Bước 3-6: tìm CVE, chạy Nuclei và thêm URL vào monitor, cpe_results là kết quả của resolve_cpe_many
+def finish_url(item, app, cpe_results):
+    url = item["url"]
+    list_wafs = item["wafs"]
 
+    with app.app_context():
+        try:
             # 3. Lấy CPE và CVE
             print(f"----------3. Tìm CPE và CVE-----------")
             results = []
-            for tech, version in tech_with_versions:
-                try:
-                    cpe_obj = search_cpe(tech, version, 1)
-                except Exception as e:
-                    print(f"Lỗi khi tìm CPE: {e}")
-                    continue
+            tech_cpes = []
+            for tech, version in item["techs"]:
+                cpe_obj = cpe_results.get((tech, version))
                 if not cpe_obj:
                     continue
                 _, cpe, _ = cpe_obj[0]
+                tech_cpes.append((tech, version, cpe))
 
-                raw_cves = create_cve_list(cpe, version, 100)
+            # Tìm CVE cho tất cả tech của URL trong một lần
+            cve_results = create_cve_list_many([(cpe, version) for _, version, cpe in tech_cpes], 100)
+            for tech, version, cpe in tech_cpes:
+                raw_cves = cve_results[(cpe, version)]
                 formatted_cves = []
-                for item in raw_cves:
-                    if isinstance(item, dict):
-                        formatted_cves.append(item)
+                for cve_item in raw_cves:
+                    if isinstance(cve_item, dict):
+                        formatted_cves.append(cve_item)
                     else:
                         (cve, cwe, desc, vec, baseScore,
-                        baseSeverity, explScore, impScore, *rest) = item + (None,) * (9 - len(item))
+                        baseSeverity, explScore, impScore, *rest) = cve_item + (None,) * (9 - len(cve_item))
                         formatted_cves.append({
                             "cve": cve,
                             "cwe": cwe,